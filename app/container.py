@@ -1,14 +1,29 @@
 from dependency_injector.containers import DeclarativeContainer, WiringConfiguration
-from dependency_injector.providers import Factory, Singleton
+from dependency_injector.providers import Object, Selector, Singleton
 
 from app.statistic_log.application.service.statistic import StatisticService
+from app.statistic_log.adapter.output.persistence.celery.statistic_celery import StatisticLogCeleryRepo
 from app.statistic_log.adapter.output.persistence.repository_adapter import StatisticRepositoryAdapter
-from app.statistic_log.adapter.output.persistence.sqlalchemy.statistic_sqlalchemy import StatisticLogSQLAlchemyRepo
+from app.statistic_log.adapter.output.persistence.sqlalchemy.statistic_sqlalchemy import (
+    StatisticLogSQLAlchemyQueryRepo,
+    StatisticLogSQLAlchemyRepo,
+)
+from core.config import config
 
 
 class Container(DeclarativeContainer):
     wiring_config = WiringConfiguration(packages=["app"])
 
-    statistic_log_repo = Singleton(StatisticLogSQLAlchemyRepo)
-    statistic_repo_adapter = Factory(StatisticRepositoryAdapter, statistic_repo=statistic_log_repo)
-    statistic_service = Factory(StatisticService, repository=statistic_repo_adapter)
+    statistic_log_repo = Selector(
+        Object(config.STATISTIC_INGESTION_MODE),
+        direct=Singleton(StatisticLogSQLAlchemyRepo),
+        celery=Singleton(StatisticLogCeleryRepo),
+    )
+    # Reads go to ClickHouse whichever way events are ingested
+    statistic_log_query_repo = Singleton(StatisticLogSQLAlchemyQueryRepo)
+    statistic_repo_adapter = Singleton(
+        StatisticRepositoryAdapter,
+        statistic_repo=statistic_log_repo,
+        query_repo=statistic_log_query_repo,
+    )
+    statistic_service = Singleton(StatisticService, repository=statistic_repo_adapter)
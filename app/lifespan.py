@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import FastAPI
+
+from app.statistic_log.adapter.output.persistence.row_encoder import statistic_log_encoder
+from app.statistic_log.domain.command import command_adapter
+from core.config import config
+from core.db.clickhouse_db import ClickHouse
+from core.db.clickhouse_session import dispose_connections, run_in_executor
+from core.db.init_clickhouse import verify_clickhouse_schema
+from core.helpers import serializer
+
+logger = logging.getLogger(__name__)
+
+# Event touching every field, so the first request runs already warm paths
+WARM_UP_EVENT = serializer.dumps(
+    {
+        "utc_timestamp": "2024-01-01T00:00:00Z",
+        "activity_type": "warm_up",
+        "user_id": "warm-up",
+        "msg_id": "warm-up",
+        "page_keywords": ["warm-up"],
+        "extra_data": {"integer": 1, "number": 1.5, "bool": True, "date": "2024-01-01T00:00:00Z"},
+    }
+)
+
+
+def warm_up_validators() -> None:
+    """Run one event through validation, encoding and JSON dumping"""
+    command = command_adapter.validate_json(WARM_UP_EVENT)
+    statistic_log_encoder.encode(command)
+    command_adapter.validate_python(serializer.loads(WARM_UP_EVENT))
+
+
+async def warm_up_clickhouse() -> None:
+    """Check the tables of every shard, leaving a pooled connection to each
+
+    Startup only reads the schema: tables are created and migrated by
+    ``python -m core.db.init_clickhouse``. An unreachable ClickHouse does
+    not stop startup: writes are spooled until it is back. Missing tables
+    or model columns do, since every insert would fail.
+    """
+    try:
+        problems = await asyncio.wait_for(
+            run_in_executor(verify_clickhouse_schema), config.STARTUP_WARMUP_TIMEOUT
+        )
+    except Exception:
+        logger.warning("ClickHouse is not reachable at startup", exc_info=True)
+        return
+    if problems:
+        raise RuntimeError(f"ClickHouse schema does not match the models: {'; '.join(problems)}")
+
+
+@asynccontextmanager
+async def lifespan(app_: FastAPI) -> AsyncIterator[None]:
+    """Warm the app up before serving, and drain it once the server stops accepting traffic
+
+    uvicorn runs the shutdown half on SIGTERM after it closed the listening
+    socket and finished in-flight requests, so the buffers no longer grow.
+    """
+    repo = app_.state.container.statistic_log_repo()
+    warm_up_validators()
+    await warm_up_clickhouse()
+    await repo.start()
+    yield
+    await repo.close(timeout=config.SHUTDOWN_DRAIN_TIMEOUT)
+    await ClickHouse.pool.close()
+    dispose_connections()
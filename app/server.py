@@ -1,13 +1,14 @@
 from fastapi import Depends, FastAPI, Request
 from fastapi.middleware import Middleware
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 
 from app.container import Container
+from app.lifespan import lifespan
 from app.statistic_log.adapter.input.api import router as statistic_router
 from core.config import config
 from core.exceptions import CustomException
 from core.fastapi.dependencies import Logging
+from core.fastapi.responses import FastJSONResponse
 from core.fastapi.middlewares import (
     AuthBackend,
     AuthenticationMiddleware,
@@ -19,6 +20,7 @@ from core.helpers.cache import Cache, CustomKeyMaker
 
 def init_routers(app_: FastAPI) -> None:
     container = Container()
+    app_.state.container = container
     app_.include_router(statistic_router)
 
 
@@ -26,9 +28,10 @@ def init_listeners(app_: FastAPI) -> None:
     # Exception handler
     @app_.exception_handler(CustomException)
     async def custom_exception_handler(request: Request, exc: CustomException):
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=exc.code,
             content={"error_code": exc.error_code, "message": exc.message},
+            headers=exc.headers,
         )
 
 
@@ -39,7 +42,7 @@ def on_auth_error(request: Request, exc: Exception):
         error_code = exc.error_code
         message = exc.message
 
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=status_code,
         content={"error_code": error_code, "message": message},
     )
@@ -70,10 +73,12 @@ def create_app() -> FastAPI:
         title="Hide",
         description="Hide API",
         version="1.0.0",
-        docs_url=None if config.ENV == "production" else "/docs",
-        redoc_url=None if config.ENV == "production" else "/redoc",
+        docs_url=None if config.ENV == "prod" else "/docs",
+        redoc_url=None if config.ENV == "prod" else "/redoc",
         dependencies=[Depends(Logging)],
+        default_response_class=FastJSONResponse,
         middleware=make_middleware(),
+        lifespan=lifespan,
     )
     init_routers(app_=app_)
     init_listeners(app_=app_)
@@ -1,6 +1,42 @@
+from datetime import datetime
+from typing import Any
+
 from pydantic import BaseModel, Field
 
 
 class StatisticLogResponse(BaseModel):
     status: str = Field(..., description="Status")
     status_code: int = Field(..., description="Status code")
+
+
+class StatisticLogItemStatus(BaseModel):
+    index: int = Field(..., description="Position of the item in the batch")
+    status: str = Field(..., description="Status")
+    status_code: int = Field(..., description="Status code")
+    message: str | None = Field(None, description="Validation error or outcome of the item")
+
+
+class StatisticLogBatchResponse(BaseModel):
+    status: str = Field(..., description="Status")
+    status_code: int = Field(..., description="Status code")
+    accepted: int = Field(..., description="Number of stored items")
+    duplicates: int = Field(0, description="Number of items already received")
+    rejected: int = Field(..., description="Number of invalid or unstored items")
+    items: list[StatisticLogItemStatus] = Field(..., description="Status of each item")
+
+
+class StatisticHealthResponse(BaseModel):
+    clickhouse_pool: dict[str, Any] = Field(..., description="ClickHouse connection pool statistics")
+    ingestion: dict[str, Any] = Field(..., description="Insert buffer and disk spool statistics")
+
+
+class StatisticLogListResponse(BaseModel):
+    count: int = Field(..., description="Number of returned events")
+    items: list[dict[str, Any]] = Field(..., description="Events, oldest first")
+
+
+class StatisticStatsResponse(BaseModel):
+    granularity: str = Field(..., description="Rollup the counts were read from")
+    start: datetime = Field(..., description="Start of the counted range (UTC), widened to the rollup")
+    end: datetime = Field(..., description="End of the counted range (UTC), exclusive")
+    items: list[dict[str, Any]] = Field(..., description="Events and distinct users per group")
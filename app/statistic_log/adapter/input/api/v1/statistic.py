@@ -1,27 +1,299 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, Literal
+
 from dependency_injector.wiring import Provide, inject
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 
 from app.container import Container
 from app.statistic_log.adapter.input.api.v1.request import StatisticLogRequest
-from app.statistic_log.adapter.input.api.v1.response import StatisticLogResponse
-from app.statistic_log.domain.command import CreateStatisticLogCommand
+from app.statistic_log.adapter.output.persistence.sqlalchemy.statistic_sqlalchemy import (
+    StatisticLogSQLAlchemyRepo,
+)
+from app.statistic_log.adapter.input.api.v1.response import (
+    StatisticHealthResponse,
+    StatisticLogBatchResponse,
+    StatisticLogItemStatus,
+    StatisticLogListResponse,
+    StatisticLogResponse,
+    StatisticStatsResponse,
+)
+from app.statistic_log.application.exception import (
+    BatchTooLargeException,
+    InvalidBatchBodyException,
+    InvalidLogBodyException,
+    InvalidStatsRangeException,
+)
+from app.statistic_log.adapter.output.persistence.rollup import GRANULARITIES, to_utc
+from app.statistic_log.domain.command import (
+    CreateStatisticLogCommand,
+    StatisticStatsQuery,
+    command_adapter,
+)
 from app.statistic_log.domain.usecase.statistic import StatisticLogUseCase
-from core.fastapi.dependencies import PermissionDependency
+from app.statistic_log.domain.vo.outcome import LogOutcome
+from core.config import config
+from core.db.clickhouse_db import clickhouse_manager
+from core.fastapi.dependencies import IsAuthenticated, PermissionDependency
+from core.helpers import serializer
 import uvicorn
 import logging
 logger = logging.getLogger('uvicorn.error')
 
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+# Retries of a request carrying the same key are stored once
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+# Status code and message of a valid batch item, by what became of it
+OUTCOME_STATUS = {
+    LogOutcome.ACCEPTED: (0, None),
+    LogOutcome.DUPLICATE: (0, "Already received"),
+    LogOutcome.FAILED: (1, "Rejected by storage"),
+}
+
+# Bodies are decoded by hand to negotiate the content type and validated
+# straight into commands, so the request schema is documented explicitly
+LOG_REQUEST_SCHEMA = StatisticLogRequest.model_json_schema()
+
 statistic_router = APIRouter()
 
 @statistic_router.post(
     "/log",
     response_model=StatisticLogResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                content_type: {"schema": LOG_REQUEST_SCHEMA}
+                for content_type in ("application/json", MSGPACK_CONTENT_TYPES[0])
+            },
+        }
+    },
 )
 @inject
 async def log(
-    request: StatisticLogRequest,
+    request: Request,
     usecase: StatisticLogUseCase = Depends(Provide[Container.statistic_service]),
 ):
-    command = CreateStatisticLogCommand(**request.model_dump())
+    command = await _parse_log_request(request)
+    idempotency_key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    if idempotency_key:
+        command.idempotency_key = idempotency_key
     await usecase.create_log(command=command)
-    return {"status_code": 0, "status": "Success"}
\ No newline at end of file
+    return {"status_code": 0, "status": "Success"}
+
+
+@statistic_router.post(
+    "/logs/batch",
+    response_model=StatisticLogBatchResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                content_type: {
+                    "schema": {"type": "array", "items": LOG_REQUEST_SCHEMA}
+                }
+                for content_type in (
+                    "application/json",
+                    NDJSON_CONTENT_TYPES[0],
+                    MSGPACK_CONTENT_TYPES[0],
+                )
+            },
+        }
+    },
+)
+@inject
+async def logs_batch(
+    request: Request,
+    usecase: StatisticLogUseCase = Depends(Provide[Container.statistic_service]),
+):
+    idempotency_key = request.headers.get(IDEMPOTENCY_KEY_HEADER)
+    commands = []
+    items = []
+    command_items = []
+    index = 0
+    async for payload in _iter_batch_payloads(request):
+        if index >= config.STATISTIC_BATCH_MAX_ITEMS:
+            raise BatchTooLargeException
+        try:
+            if isinstance(payload, bytes):
+                command = command_adapter.validate_json(payload)
+            else:
+                command = command_adapter.validate_python(payload)
+        except ValidationError as e:
+            items.append(
+                StatisticLogItemStatus(
+                    index=index,
+                    status="Failed",
+                    status_code=1,
+                    message=_format_validation_error(e),
+                )
+            )
+        else:
+            if idempotency_key:
+                command.idempotency_key = f"{idempotency_key}:{index}"
+            commands.append(command)
+            command_items.append(StatisticLogItemStatus(index=index, status="Success", status_code=0))
+            items.append(command_items[-1])
+        index += 1
+
+    outcomes = await usecase.create_logs(commands=commands)
+    for item, outcome in zip(command_items, outcomes):
+        item.status = outcome.value
+        item.status_code, item.message = OUTCOME_STATUS[outcome]
+    statuses = [item.status for item in items]
+    return {
+        "status_code": 0,
+        "status": "Success",
+        "accepted": statuses.count(LogOutcome.ACCEPTED.value),
+        "duplicates": statuses.count(LogOutcome.DUPLICATE.value),
+        "rejected": statuses.count(LogOutcome.FAILED.value),
+        "items": items,
+    }
+
+
+@statistic_router.get(
+    "/health",
+    response_model=StatisticHealthResponse,
+)
+@inject
+async def health(
+    repo: StatisticLogSQLAlchemyRepo = Depends(Provide[Container.statistic_log_repo]),
+):
+    return {
+        "clickhouse_pool": clickhouse_manager.pool_stats(),
+        "ingestion": repo.stats(),
+    }
+
+
+@statistic_router.get(
+    "/conversations/{conversation_id}/logs",
+    response_model=StatisticLogListResponse,
+    dependencies=[Depends(PermissionDependency([IsAuthenticated]))],
+)
+@inject
+async def conversation_logs(
+    conversation_id: str,
+    activity_type: str | None = Query(None, description="Only events of this activity type"),
+    limit: int = Query(100, ge=1, le=config.STATISTIC_LOOKUP_MAX_ROWS, description="Most events returned"),
+    usecase: StatisticLogUseCase = Depends(Provide[Container.statistic_service]),
+):
+    items = await usecase.get_conversation_logs(
+        conversation_id=conversation_id, activity_type=activity_type, limit=limit
+    )
+    return {"count": len(items), "items": items}
+
+
+@statistic_router.get(
+    "/messages/{msg_id}/logs",
+    response_model=StatisticLogListResponse,
+    dependencies=[Depends(PermissionDependency([IsAuthenticated]))],
+)
+@inject
+async def message_logs(
+    msg_id: str,
+    limit: int = Query(100, ge=1, le=config.STATISTIC_LOOKUP_MAX_ROWS, description="Most events returned"),
+    usecase: StatisticLogUseCase = Depends(Provide[Container.statistic_service]),
+):
+    items = await usecase.get_message_logs(msg_id=msg_id, limit=limit)
+    return {"count": len(items), "items": items}
+
+
+@statistic_router.get(
+    "/stats",
+    response_model=StatisticStatsResponse,
+    dependencies=[Depends(PermissionDependency([IsAuthenticated]))],
+)
+@inject
+async def stats(
+    start: datetime = Query(..., description="Start of the range, UTC unless an offset is given"),
+    end: datetime = Query(..., description="End of the range, exclusive"),
+    interval: Literal["minute", "hour", "day"] | None = Query(
+        None, description="Time bucket of the counts, totals over the range when omitted"
+    ),
+    group_by: list[Literal["activity_type", "agent_name", "extension_version"]] = Query(
+        ["activity_type"], description="Dimensions to count by"
+    ),
+    activity_type: str | None = Query(None),
+    agent_name: str | None = Query(None),
+    extension_version: str | None = Query(None),
+    usecase: StatisticLogUseCase = Depends(Provide[Container.statistic_service]),
+):
+    """Event counts read from the pre-aggregated rollups, never from raw events
+
+    The counts are approximate: the rollups count every inserted row,
+    including retries and replays later collapsed in statistic_log. Running
+    ``python -m core.db.init_clickhouse rollups <since>`` recounts them.
+    """
+    start, end = to_utc(start), to_utc(end)
+    if end <= start:
+        raise InvalidStatsRangeException
+    if interval is not None and (
+        (end - start).total_seconds() / GRANULARITIES[interval] > config.STATISTIC_STATS_MAX_BUCKETS
+    ):
+        raise InvalidStatsRangeException
+    query = StatisticStatsQuery(
+        start=start,
+        end=end,
+        interval=interval,
+        group_by=tuple(dict.fromkeys(group_by)),
+        activity_type=activity_type,
+        agent_name=agent_name,
+        extension_version=extension_version,
+    )
+    return await usecase.get_stats(query=query)
+
+
+def _content_type(request: Request) -> str:
+    return request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+async def _parse_log_request(request: Request) -> CreateStatisticLogCommand:
+    """Validate a single event body encoded as JSON or MessagePack into a command"""
+    body = await request.body()
+    try:
+        if _content_type(request) in MSGPACK_CONTENT_TYPES:
+            return command_adapter.validate_python(serializer.unpackb(body))
+        return command_adapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+        )
+    except ValueError:
+        raise InvalidLogBodyException
+
+
+async def _iter_batch_payloads(request: Request) -> AsyncIterator[Any]:
+    """Yield raw NDJSON lines or decoded JSON/MessagePack array items of a batch body"""
+    content_type = _content_type(request)
+    if content_type in NDJSON_CONTENT_TYPES:
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if pending.strip():
+            yield pending
+        return
+
+    try:
+        if content_type in MSGPACK_CONTENT_TYPES:
+            payloads = serializer.unpackb(await request.body())
+        else:
+            payloads = serializer.loads(await request.body())
+    except ValueError:
+        raise InvalidBatchBodyException
+    if not isinstance(payloads, list):
+        raise InvalidBatchBodyException
+    for payload in payloads:
+        yield payload
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(loc) for loc in err['loc']) or 'body'}: {err['msg']}"
+        for err in error.errors()
+    )
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List
+
+from fastapi import HTTPException
+from kombu.exceptions import ChannelError, KombuError, OperationalError
+
+from app.statistic_log.adapter.output.persistence.row_encoder import row_id
+from app.statistic_log.application.exception import IngestionOverloadedException
+from app.statistic_log.domain.command import CreateStatisticLogCommand
+from app.statistic_log.domain.vo.outcome import LogOutcome
+from celery_task.tasks.statistic import ingest_statistic_logs
+from core.config import config
+from core.db.clickhouse_buffer import InsertBuffer
+from core.db.clickhouse_session import run_in_executor
+from core.db.clickhouse_spool import Spool
+from core.helpers.admission import AdmissionControl
+from core.helpers.dedup import RecentKeys
+
+logger = logging.getLogger(__name__)
+
+
+def broker_unavailable(exc: BaseException) -> bool:
+    """Whether publishing failed because the broker could not be reached"""
+    return isinstance(exc, (OperationalError, OSError))
+
+
+class StatisticLogCeleryRepo:
+    """Hand accepted events to the celery_task ingestion workers
+
+    The API only validates and enqueues: single events are grouped by an
+    InsertBuffer and batches are split into chunks of
+    ``CELERY_INGEST_CHUNK_SIZE`` events, so each task is one worker insert.
+
+    The row id and arrival time of each event are fixed here, before
+    enqueueing, so a task delivered again writes the same rows. Events the
+    broker does not take are spooled to disk and published again later,
+    as the direct repo does with failed inserts.
+
+    Admission counts the tasks waiting in the broker queue as full chunks,
+    read every ``CELERY_BACKLOG_INTERVAL`` seconds, on top of the events
+    buffered or being published.
+    """
+
+    def __init__(self, task=ingest_statistic_logs):
+        self.task = task
+        self.chunk_size = config.CELERY_INGEST_CHUNK_SIZE
+        self.spool = (
+            Spool(
+                directory=config.CELERY_SPOOL_DIR,
+                segment_bytes=config.SPOOL_SEGMENT_BYTES,
+                max_attempts=config.SPOOL_MAX_ATTEMPTS,
+                unavailable=broker_unavailable,
+                retryable=broker_unavailable,
+            )
+            if config.SPOOL_ENABLED
+            else None
+        )
+        self.buffer = InsertBuffer(
+            flush=self._publish,
+            max_rows=self.chunk_size,
+            max_bytes=config.CLICK_HOUSE_BATCH_MAX_BYTES,
+            linger=config.CLICK_HOUSE_FLUSH_INTERVAL,
+        )
+        self.admission = AdmissionControl(
+            high_watermark=config.INGESTION_HIGH_WATERMARK,
+            low_watermark=config.INGESTION_LOW_WATERMARK,
+        )
+        self.recent_keys = (
+            RecentKeys(config.STATISTIC_DEDUP_CACHE_SIZE)
+            if config.STATISTIC_DEDUP_CACHE_SIZE > 0
+            else None
+        )
+        self.enqueued_tasks = 0
+        self.backlog_tasks = 0
+        self._inflight_events = 0
+        self._backlog_watcher: asyncio.Task | None = None
+
+    async def create_log(self, *, data) -> None:
+        """Queue a log entry for the next ingest task"""
+        self._admit()
+        if self._is_duplicate(data):
+            return
+        await self.buffer.put(self._event(data))
+
+    async def create_logs(self, *, data: List) -> List[LogOutcome]:
+        """Enqueue many log entries, chunk by chunk
+
+        Returns:
+            List[LogOutcome]: outcome of each entry; entries of chunks that
+            could never be published were dead-lettered and are ``FAILED``
+        """
+        if not data:
+            return []
+        self._admit()
+        outcomes = [
+            LogOutcome.DUPLICATE if self._is_duplicate(item) else LogOutcome.ACCEPTED
+            for item in data
+        ]
+        fresh = [index for index, outcome in enumerate(outcomes) if outcome is LogOutcome.ACCEPTED]
+        if not fresh:
+            return outcomes
+        events = [self._event(data[index]) for index in fresh]
+        try:
+            rejected = await self._publish(events)
+        except (KombuError, OSError) as e:
+            raise HTTPException(status_code=500, detail=f"Enqueue error: {str(e)}")
+        if rejected:
+            rejected_ids = {event["id"] for event in rejected}
+            for index, event in zip(fresh, events):
+                if event["id"] in rejected_ids:
+                    outcomes[index] = LogOutcome.FAILED
+            self._forget_events(rejected)
+        return outcomes
+
+    async def start(self) -> None:
+        """Start watching the broker backlog and publishing spooled events"""
+        if self._backlog_watcher is None:
+            self._backlog_watcher = asyncio.get_running_loop().create_task(self._watch_backlog())
+        if self.spool is not None:
+            self.spool.start(
+                self._enqueue,
+                interval=config.SPOOL_DRAIN_INTERVAL,
+                batch_rows=config.SPOOL_DRAIN_BATCH_ROWS,
+            )
+
+    async def close(self, timeout: float | None = None) -> None:
+        """Enqueue the events still buffered, giving up after ``timeout`` seconds
+
+        Events still being published at the deadline are spooled, so the
+        next process publishes them again.
+        """
+        if timeout is None:
+            await self.buffer.flush()
+        else:
+            leftover = await self.buffer.drain(timeout)
+            if leftover and self.spool is not None:
+                self.spool.append(leftover)
+            elif leftover:
+                logger.error("Shutdown deadline passed with %d events not enqueued", len(leftover))
+        if self._backlog_watcher is not None:
+            self._backlog_watcher.cancel()
+            self._backlog_watcher = None
+        if self.spool is not None:
+            await self.spool.stop()
+
+    @property
+    def depth(self) -> int:
+        """Events buffered, being published, or waiting in the broker queue"""
+        return len(self.buffer) + self._inflight_events + self.backlog_tasks * self.chunk_size
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "admission": self.admission.stats(),
+            "dedup": self.recent_keys.stats() if self.recent_keys is not None else None,
+            "buffer": self.buffer.stats(),
+            "enqueued_tasks": self.enqueued_tasks,
+            "backlog_tasks": self.backlog_tasks,
+            "spool": self.spool.stats() if self.spool is not None else None,
+        }
+
+    async def _publish(self, events: List[dict]) -> List[dict]:
+        """Enqueue events chunk by chunk, spooling the chunks the broker did not take
+
+        Returns:
+            List[dict]: events of the chunks that failed for another reason,
+            now dead-lettered
+        """
+        rejected = []
+        self._inflight_events += len(events)
+        try:
+            for start in range(0, len(events), self.chunk_size):
+                chunk = events[start:start + self.chunk_size]
+                try:
+                    await self._enqueue(chunk)
+                except Exception as e:
+                    if self.spool is None:
+                        self._forget_events(events[start:])
+                        raise
+                    if not broker_unavailable(e):
+                        self.spool.dead_letter(chunk, e)
+                        rejected.extend(chunk)
+                        continue
+                    logger.warning("Publishing failed, spooling %d events", len(events) - start, exc_info=True)
+                    self.spool.append(events[start:])
+                    break
+        finally:
+            self._inflight_events -= len(events)
+        return rejected
+
+    async def _enqueue(self, events: List[dict]) -> None:
+        # Publishing blocks on the broker connection
+        for start in range(0, len(events), self.chunk_size):
+            await run_in_executor(self.task.apply_async, (events[start:start + self.chunk_size],))
+            self.enqueued_tasks += 1
+
+    async def _watch_backlog(self) -> None:
+        while True:
+            try:
+                self.backlog_tasks = await run_in_executor(self._queue_length)
+            except Exception:
+                logger.warning("Could not read the backlog of %s", config.CELERY_INGEST_QUEUE, exc_info=True)
+            await asyncio.sleep(config.CELERY_BACKLOG_INTERVAL)
+
+    def _queue_length(self) -> int:
+        with self.task.app.connection_for_write() as conn:
+            try:
+                declared = conn.default_channel.queue_declare(queue=config.CELERY_INGEST_QUEUE, passive=True)
+            except ChannelError:
+                # No worker declared the queue yet
+                return 0
+        return declared.message_count
+
+    @staticmethod
+    def _event(data) -> dict:
+        event = data.to_dict()
+        event["id"] = row_id(data.dedup_key(), data.utc_timestamp)
+        event["received_at"] = datetime.utcnow().isoformat()
+        return event
+
+    def _is_duplicate(self, data) -> bool:
+        if self.recent_keys is None:
+            return False
+        key = data.dedup_key()
+        return key is not None and self.recent_keys.seen(key)
+
+    def _forget_events(self, events: List[dict]) -> None:
+        if self.recent_keys is None:
+            return
+        for event in events:
+            key = CreateStatisticLogCommand.from_dict(event).dedup_key()
+            if key is not None:
+                self.recent_keys.discard(key)
+
+    def _admit(self) -> None:
+        if not self.admission.admit(self.depth):
+            raise IngestionOverloadedException(
+                headers={"Retry-After": str(config.INGESTION_RETRY_AFTER)}
+            )
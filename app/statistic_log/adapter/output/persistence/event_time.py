@@ -0,0 +1,64 @@
+from datetime import date, datetime
+from functools import lru_cache
+
+import ciso8601
+import pytz
+
+TIME_COLUMNS = ("utc_timestamp", "local_timestamp", "local_date")
+
+
+@lru_cache(maxsize=1024)
+def time_zone_for(name: str | None) -> pytz.BaseTzInfo | None:
+    """pytz zone of an IANA name, looked up once per name; None when unknown"""
+    if not name:
+        return None
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError:
+        return None
+
+
+def parse_timestamp(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        return ciso8601.parse_datetime(value)
+    except ValueError:
+        return None
+
+
+def event_times(
+    utc_timestamp: str | None,
+    local_timestamp: str | None,
+    time_zone: str | None,
+    received_at: datetime | None = None,
+) -> tuple[datetime, datetime, date]:
+    """Return the UTC time, the user's wall clock time and the user's date of an event
+
+    Both times are naive: the UTC one is normalized from any offset it was
+    sent with, and the local one keeps the wall clock as written. A missing
+    side is derived from the other through ``time_zone``; without any usable
+    time the event is stamped with its arrival time, ``received_at`` when
+    the caller recorded it, now otherwise.
+    """
+    utc = parse_timestamp(utc_timestamp)
+    local = parse_timestamp(local_timestamp)
+    zone = time_zone_for(time_zone)
+
+    if utc is not None:
+        if utc.tzinfo is not None:
+            utc = utc.astimezone(pytz.utc).replace(tzinfo=None)
+    elif local is not None and local.tzinfo is not None:
+        utc = local.astimezone(pytz.utc).replace(tzinfo=None)
+    elif local is not None and zone is not None:
+        utc = zone.localize(local).astimezone(pytz.utc).replace(tzinfo=None)
+    else:
+        utc = received_at or datetime.utcnow()
+
+    if local is not None:
+        local = local.replace(tzinfo=None)
+    elif zone is not None:
+        local = pytz.utc.localize(utc).astimezone(zone).replace(tzinfo=None)
+    else:
+        local = utc
+    return utc, local, local.date()
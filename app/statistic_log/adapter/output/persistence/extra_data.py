@@ -0,0 +1,101 @@
+import math
+from datetime import datetime
+from typing import Any
+
+import ciso8601
+
+# Exact type dispatch: bool must not be caught by an isinstance(int) check
+_SCALAR_TYPES = {
+    bool: "bool",
+    int: "integer",
+    float: "number",
+    datetime: "date",
+}
+
+# Ranges of the integer_values Array(Int32), number_values Array(Float32)
+# and date_values Array(DateTime) columns. A value outside them makes the
+# driver reject the whole insert, so such values are stored as strings;
+# the date bounds keep a day of margin for the server time zone.
+INTEGER_RANGE = (-(2**31), 2**31 - 1)
+FLOAT32_MAX = 3.4028234663852886e38
+DATE_RANGE = (datetime(1970, 1, 2), datetime(2106, 2, 6))
+
+TYPED_COLUMNS = tuple(
+    f"{value_type}_{part}"
+    for value_type in ("string", "integer", "number", "bool", "date")
+    for part in ("names", "values")
+)
+
+
+def looks_like_datetime(value: str) -> bool:
+    """Cheap shape check for ``YYYY-MM-DD HH:MM:SS`` before parsing"""
+    return (
+        len(value) == 19
+        and value[10] == " "
+        and value[4] == "-"
+        and value[7] == "-"
+        and value[13] == ":"
+        and value[16] == ":"
+    )
+
+
+def _fits(value_type: str, value: Any) -> bool:
+    if value_type == "integer":
+        return INTEGER_RANGE[0] <= value <= INTEGER_RANGE[1]
+    if value_type == "number":
+        return not math.isfinite(value) or abs(value) <= FLOAT32_MAX
+    if value_type == "date":
+        return DATE_RANGE[0] <= value.replace(tzinfo=None) <= DATE_RANGE[1]
+    return True
+
+
+def classify_value(value: Any) -> tuple[str, Any]:
+    """Return the column type of an ``extra_data`` value and the value to store
+
+    Strings are dates only when they have the ``%Y-%m-%d %H:%M:%S`` shape and
+    parse with ciso8601. The parsed datetime is returned so callers never
+    parse twice. Values out of the range of their column are strings.
+    """
+    value_type = _SCALAR_TYPES.get(type(value))
+    if value_type is not None:
+        if _fits(value_type, value):
+            return value_type, value
+        return "string", str(value)
+
+    if isinstance(value, str):
+        if looks_like_datetime(value):
+            try:
+                parsed = ciso8601.parse_datetime(value)
+            except ValueError:
+                pass
+            else:
+                if _fits("date", parsed):
+                    return "date", parsed
+        return "string", value
+
+    # Subclasses of the scalar types and anything else
+    if isinstance(value, bool):
+        return "bool", bool(value)
+    if isinstance(value, int):
+        return classify_value(int(value))
+    if isinstance(value, float):
+        return classify_value(float(value))
+    if isinstance(value, datetime):
+        return ("date", value) if _fits("date", value) else ("string", str(value))
+    return "string", str(value)
+
+
+def fill_extra_data(record: dict, extra_data: dict | None) -> dict:
+    """Append every non-null ``extra_data`` entry to its typed columns"""
+    for key, value in (extra_data or {}).items():
+        if value is None:
+            continue
+        value_type, converted = classify_value(value)
+        record[f"{value_type}_names"].append(str(key))
+        record[f"{value_type}_values"].append(converted)
+    return record
+
+
+def typed_columns(extra_data: dict | None) -> dict[str, list]:
+    """Return fresh ``<type>_names``/``<type>_values`` columns for ``extra_data``"""
+    return fill_extra_data({name: [] for name in TYPED_COLUMNS}, extra_data)
@@ -1,9 +1,28 @@
-from app.statistic_log.domain.repository.statistic import StatisticRepo
+from app.statistic_log.domain.command import StatisticStatsQuery
+from app.statistic_log.domain.repository.statistic import StatisticQueryRepo, StatisticRepo
+from app.statistic_log.domain.vo.outcome import LogOutcome
 
 
 class StatisticRepositoryAdapter:
-    def __init__(self, *, statistic_repo: StatisticRepo):
+    def __init__(self, *, statistic_repo: StatisticRepo, query_repo: StatisticQueryRepo | None = None):
         self.statistic_repo = statistic_repo
+        self.query_repo = query_repo
 
     async def create_log(self, *, data) -> None:
         await self.statistic_repo.create_log(data=data)
+
+    async def create_logs(self, *, data: list) -> list[LogOutcome]:
+        return await self.statistic_repo.create_logs(data=data)
+
+    async def find_by_conversation_id(
+        self, *, conversation_id: str, activity_type: str | None, limit: int
+    ) -> list[dict]:
+        return await self.query_repo.find_by_conversation_id(
+            conversation_id, activity_type=activity_type, limit=limit
+        )
+
+    async def find_by_msg_id(self, *, msg_id: str, limit: int) -> list[dict]:
+        return await self.query_repo.find_by_msg_id(msg_id, limit=limit)
+
+    async def stats(self, *, query: StatisticStatsQuery) -> dict:
+        return await self.query_repo.stats(query)
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Table, func, select
+from sqlalchemy.sql import Select
+
+from app.statistic_log.domain.command import StatisticStatsQuery
+from core.db.clickhouse_models import ROLLUP_DIMENSIONS, STATISTIC_LOG_ROLLUPS, rollup_of
+
+# Bucket width in seconds of each rollup granularity
+GRANULARITIES = {rollup_of(table).granularity: rollup_of(table).seconds for table in STATISTIC_LOG_ROLLUPS}
+
+
+def to_utc(value: datetime) -> datetime:
+    """Naive UTC datetime; naive input is taken as UTC already"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _epoch_seconds(value: datetime) -> int:
+    return int(value.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _is_aligned(value: datetime, seconds: int) -> bool:
+    # The epoch seconds drop the fraction, so a fractional time is never aligned
+    return not value.microsecond and _epoch_seconds(value) % seconds == 0
+
+
+def pick_rollup(start: datetime, end: datetime, interval: str | None = None) -> tuple[Table, datetime, datetime]:
+    """Coarsest rollup answering the range, and the range it covers
+
+    A rollup answers a range when both ends fall on its bucket boundaries
+    and its buckets are no wider than ``interval``. The minute rollup
+    answers any range, widened to whole minutes.
+    """
+    start, end = to_utc(start), to_utc(end)
+    for table in STATISTIC_LOG_ROLLUPS:
+        seconds = rollup_of(table).seconds
+        if interval is not None and seconds > GRANULARITIES[interval]:
+            continue
+        if _is_aligned(start, seconds) and _is_aligned(end, seconds):
+            return table, start, end
+    table = STATISTIC_LOG_ROLLUPS[-1]
+    seconds = rollup_of(table).seconds
+    start -= timedelta(seconds=_epoch_seconds(start) % seconds, microseconds=start.microsecond)
+    if not _is_aligned(end, seconds):
+        end += timedelta(seconds=seconds - _epoch_seconds(end) % seconds, microseconds=-end.microsecond)
+    return table, start, end
+
+
+def stats_select(table: Table, query: StatisticStatsQuery, start: datetime, end: datetime) -> Select:
+    """Events and distinct users of a rollup over ``[start, end)``, grouped as ``query`` asks"""
+    keys = [table.c[name] for name in query.group_by]
+    if query.interval is not None:
+        bucket_function = next(
+            rollup_of(rollup).bucket_function
+            for rollup in STATISTIC_LOG_ROLLUPS
+            if rollup_of(rollup).granularity == query.interval
+        )
+        keys.insert(0, getattr(func, bucket_function)(table.c.bucket).label("time"))
+    statement = (
+        select(*keys, func.sum(table.c.events).label("events"), func.uniqMerge(table.c.users).label("users"))
+        .where(table.c.bucket >= start, table.c.bucket < end)
+    )
+    for name in ROLLUP_DIMENSIONS:
+        value = getattr(query, name)
+        if value is not None:
+            statement = statement.where(table.c[name] == value)
+    if keys:
+        statement = statement.group_by(*keys).order_by(*keys)
+    return statement
@@ -0,0 +1,115 @@
+import uuid
+from dataclasses import fields
+from typing import Any, Callable, Iterable, Sequence
+
+from clickhouse_sqlalchemy import types
+from sqlalchemy import Table
+
+from app.statistic_log.adapter.output.persistence.event_time import (
+    TIME_COLUMNS,
+    event_times,
+    parse_timestamp,
+)
+from app.statistic_log.adapter.output.persistence.extra_data import (
+    TYPED_COLUMNS,
+    typed_columns,
+)
+from app.statistic_log.domain.command import CreateStatisticLogCommand
+from core.db.clickhouse_models import StatisticLog
+from core.helpers.event_id import derived_uuid, uuid7
+from core.helpers.serializer import dump_model
+
+# Namespace of the ids of keyed events without a timestamp
+ROW_ID_NAMESPACE = uuid.UUID("5d0c3a4e-8f1b-4f7e-9a3c-2b6d8e1f0a47")
+
+
+def row_id(dedup_key: str | None, utc_timestamp: str | None = None) -> str:
+    """Time-ordered row id, stable for events with a dedup key
+
+    Events without a key get a UUIDv7 of their arrival time. Keyed events
+    derive theirs from the client timestamp and the key, so they sort by
+    time as well and client retries collapse on the same sorting key. A
+    keyed event without a parsable timestamp falls back to a name based
+    uuid5, but each retry of it is stamped with its own arrival time,
+    which is in the sorting key too: such retries do not collapse and are
+    only dropped by the dedup cache of the process that receives them.
+    """
+    if dedup_key is None:
+        return uuid7()
+    at = parse_timestamp(utc_timestamp)
+    if at is not None:
+        return derived_uuid(at, dedup_key)
+    return str(uuid.uuid5(ROW_ID_NAMESPACE, dedup_key))
+
+
+class RowEncoder:
+    """Turn commands into positional rows ordered like the columns of a table.
+
+    The encoding function is generated once from the table definition, so
+    each event costs one tuple instead of a record dict the driver re-reads
+    by key. Columns matching a command field take the field value, falling
+    back to ``""`` or ``[]`` when it is empty; ``id``, ``_source``, the
+    parsed event times and the typed ``extra_data`` columns are derived
+    from the whole command. ``id`` and the arrival time of events without
+    a usable timestamp can be passed in when they were fixed earlier, so a
+    re-encoded event gives the same row. A column the encoder cannot fill
+    is reported when the encoder is built.
+    """
+
+    def __init__(self, table: Table, fields: Iterable[str]):
+        self.table = table.name
+        self.columns = tuple(column.name for column in table.columns)
+        self.source_index = self.columns.index("_source")
+        self.encode: Callable[..., tuple] = self._compile(table, set(fields))
+
+    def encode_many(self, items: Iterable[Any]) -> list[tuple]:
+        encode = self.encode
+        return [encode(item) for item in items]
+
+    def to_columns(self, rows: Sequence[tuple]) -> dict[str, tuple]:
+        """Transpose encoded rows into column slots keyed by column name"""
+        return dict(zip(self.columns, zip(*rows)))
+
+    def to_dict(self, row: tuple) -> dict:
+        return dict(zip(self.columns, row))
+
+    def _compile(self, table: Table, fields: set[str]) -> Callable[[Any], tuple]:
+        values = []
+        for column in table.columns:
+            name = column.name
+            if name == "id":
+                values.append("_row_id(data.dedup_key(), data.utc_timestamp) if row_id is None else row_id")
+            elif name == "_source":
+                values.append("_dump_model(data)")
+            elif name in TYPED_COLUMNS:
+                values.append(f"typed[{name!r}]")
+            elif name in TIME_COLUMNS:
+                values.append(f"times[{TIME_COLUMNS.index(name)}]")
+            elif name in fields:
+                default = "[]" if isinstance(column.type, types.Array) else '""'
+                values.append(f"data.{name} or {default}")
+            else:
+                raise ValueError(f"no value for column {table.name}.{name}")
+
+        source = "def encode(data, row_id=None, received_at=None):\n"
+        source += "    typed = _typed_columns(data.extra_data)\n"
+        source += (
+            "    times = _event_times(data.utc_timestamp, data.local_timestamp, data.time_zone, received_at)\n"
+        )
+        source += "    return (\n"
+        source += "".join(f"        {value},\n" for value in values)
+        source += "    )\n"
+
+        namespace = {
+            "_row_id": row_id,
+            "_dump_model": dump_model,
+            "_typed_columns": typed_columns,
+            "_event_times": event_times,
+        }
+        exec(compile(source, f"<row encoder for {table.name}>", "exec"), namespace)
+        return namespace["encode"]
+
+
+statistic_log_encoder = RowEncoder(
+    StatisticLog.__table__, [field.name for field in fields(CreateStatisticLogCommand)]
+)
@@ -1,95 +1,263 @@
+from clickhouse_driver.errors import Error as ClickHouseError
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import select, func
+from sqlalchemy import Engine, select, func
 from fastapi import HTTPException
-from core.db.clickhouse_session import session
-from core.db.clickhouse_models import StatisticLog
-import uuid
-import json
+from app.statistic_log.adapter.output.persistence.row_encoder import statistic_log_encoder
+from app.statistic_log.application.exception import IngestionOverloadedException
+from core.config import config
+from core.db.clickhouse_buffer import InsertBuffer
+from core.db.clickhouse_errors import is_retryable
+from core.db.clickhouse_spool import Spool
+from core.db.clickhouse_session import (
+    clickhouse_shards,
+    fan_out,
+    insert_columns,
+    run_in_executor,
+)
+from core.db.clickhouse_models import StatisticLog, rollup_of
+from app.statistic_log.adapter.output.persistence.rollup import pick_rollup, stats_select
+from app.statistic_log.domain.command import StatisticStatsQuery
+from app.statistic_log.domain.repository.statistic import StatisticQueryRepo
+from app.statistic_log.domain.vo.outcome import LogOutcome
+from core.helpers.admission import AdmissionControl
+from core.helpers.dedup import RecentKeys
 from datetime import datetime
 from typing import Any, List
+import asyncio
 import logging
 from fastapi import Depends
 
+logger = logging.getLogger(__name__)
+
+# Rows are routed to their shard by user_id
+SHARD_KEY_INDEX = statistic_log_encoder.columns.index("user_id")
+ROW_ID_INDEX = statistic_log_encoder.columns.index("id")
+
+
+def _fetch_all(engine: Engine, query) -> List[dict]:
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(query)]
+
+
+def _fetch_scalar(engine: Engine, query) -> Any:
+    with engine.connect() as conn:
+        return conn.execute(query).scalar()
+
 
 class StatisticLogSQLAlchemyRepo:
     def __init__(self):
-        pass
+        self.shards = clickhouse_shards
+        self.spool = (
+            Spool(
+                directory=config.SPOOL_DIR,
+                segment_bytes=config.SPOOL_SEGMENT_BYTES,
+                max_attempts=config.SPOOL_MAX_ATTEMPTS,
+            )
+            if config.SPOOL_ENABLED
+            else None
+        )
+        self.buffer = InsertBuffer(
+            flush=self._write_rows,
+            max_rows=config.CLICK_HOUSE_BATCH_SIZE,
+            max_bytes=config.CLICK_HOUSE_BATCH_MAX_BYTES,
+            linger=config.CLICK_HOUSE_FLUSH_INTERVAL,
+        )
+        self.admission = AdmissionControl(
+            high_watermark=config.INGESTION_HIGH_WATERMARK,
+            low_watermark=config.INGESTION_LOW_WATERMARK,
+        )
+        self.recent_keys = (
+            RecentKeys(config.STATISTIC_DEDUP_CACHE_SIZE)
+            if config.STATISTIC_DEDUP_CACHE_SIZE > 0
+            else None
+        )
+        self._inflight_rows = 0
 
     async def create_log(self, *, data) -> None:
-        """Create a new log entry in ClickHouse"""
-        types_map = ["string", "integer", "number", "bool", "date"]
+        """Queue a new log entry for the next batched insert into ClickHouse"""
+        self._admit()
+        if self._is_duplicate(data):
+            return
+        row = statistic_log_encoder.encode(data)
+        await self.buffer.put(row, size=len(row[statistic_log_encoder.source_index]))
+
+    async def create_logs(self, *, data: List) -> List[LogOutcome]:
+        """Write many log entries to ClickHouse with a single insert
+
+        Returns:
+            List[LogOutcome]: outcome of each entry; entries ClickHouse
+            rejected were dead-lettered and are ``FAILED``
+        """
+        if not data:
+            return []
+        self._admit()
+        outcomes = [
+            LogOutcome.DUPLICATE if self._is_duplicate(item) else LogOutcome.ACCEPTED
+            for item in data
+        ]
+        fresh = [index for index, outcome in enumerate(outcomes) if outcome is LogOutcome.ACCEPTED]
+        if not fresh:
+            return outcomes
+        rows = statistic_log_encoder.encode_many(data[index] for index in fresh)
         try:
-            record_data = {
-                "id": str(uuid.uuid4()),
-                "local_timestamp": data.local_timestamp if data.local_timestamp else "",
-                "time_zone": data.time_zone if data.time_zone else "",
-                "utc_timestamp": data.utc_timestamp if data.utc_timestamp else "",
-                "user_id": data.user_id if data.user_id else "",
-                "conversation_id": data.conversation_id if data.conversation_id else "",
-                "msg_id": data.msg_id if data.msg_id else "",
-                "activity_type": data.activity_type if data.activity_type else "",
-                "detail": data.detail if data.detail else "",
-                "_source": json.dumps(data.to_dict()),
-                "current_url": data.current_url if data.current_url else "",
-                "page_title": data.page_title if data.page_title else "",
-                "page_description": (
-                    data.page_description if data.page_description else ""
-                ),
-                "page_keywords": data.page_keywords if data.page_keywords else [],
-                "user_agent": data.user_agent if data.user_agent else "",
-                "extension_version": (
-                    data.extension_version if data.extension_version else ""
-                ),
-                "agent_name": data.agent_name if data.agent_name else "",
-                "agent_version": data.agent_version if data.agent_version else "",
-                "string_names": [],
-                "string_values": [],
-                "integer_names": [],
-                "integer_values": [],
-                "number_names": [],
-                "number_values": [],
-                "bool_names": [],
-                "bool_values": [],
-                "date_names": [],
-                "date_values": [],
-            }
-            logging.info(f"Creating log with data: {record_data}")
-            extra_data = getattr(data, "extra_data", {}) or {}
-            for key, value in extra_data.items():
-                if value is not None:
-                    value_type = self._determine_type(value)
-                    if value_type in types_map:
-                        record_data[f"{value_type}_names"].append(str(key))
-                        record_data[f"{value_type}_values"].append(
-                            self._convert_value_for_type(value, value_type)
-                        )
-            session.execute(StatisticLog.__table__.insert(), [record_data])
-        except SQLAlchemyError as e:
+            rejected = await self._write_rows(rows)
+        except (SQLAlchemyError, ClickHouseError) as e:
+            self._forget([data[index] for index in fresh])
             raise HTTPException(
                 status_code=500, detail=f"ClickHouse insert error: {str(e)}"
             )
+        if rejected:
+            rejected_ids = {row[ROW_ID_INDEX] for row in rejected}
+            for index, row in zip(fresh, rows):
+                if row[ROW_ID_INDEX] in rejected_ids:
+                    outcomes[index] = LogOutcome.FAILED
+            self._forget([data[index] for index in fresh if outcomes[index] is LogOutcome.FAILED])
+        return outcomes
+
+    async def start(self) -> None:
+        """Start replaying rows spooled by this or a previous process"""
+        if self.spool is not None:
+            self.spool.start(
+                self._insert_rows,
+                interval=config.SPOOL_DRAIN_INTERVAL,
+                batch_rows=config.SPOOL_DRAIN_BATCH_ROWS,
+            )
+
+    async def close(self, timeout: float | None = None) -> None:
+        """Flush buffered rows and stop the spool drainer
+
+        With a ``timeout``, rows still being written at the deadline are
+        spooled so the next process replays them; rows that did reach
+        ClickHouse as well keep their id and collapse with the replay in
+        statistic_log, but are counted twice by the rollups until these are
+        rebuilt.
+        """
+        if timeout is None:
+            await self.buffer.flush()
+        else:
+            leftover = await self.buffer.drain(timeout)
+            if leftover and self.spool is not None:
+                self.spool.append(leftover)
+            elif leftover:
+                logger.error("Shutdown deadline passed with %d rows unwritten", len(leftover))
+        if self.spool is not None:
+            await self.spool.stop()
+
+    @property
+    def depth(self) -> int:
+        """Rows buffered or being written to ClickHouse"""
+        return len(self.buffer) + self._inflight_rows
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "admission": self.admission.stats(),
+            "dedup": self.recent_keys.stats() if self.recent_keys is not None else None,
+            "buffer": self.buffer.stats(),
+            "spool": self.spool.stats() if self.spool is not None else None,
+        }
+
+    async def _write_rows(self, rows: List[tuple]) -> List[tuple]:
+        """Insert a batch shard by shard, spooling the rows of failed shards to disk
+
+        Returns:
+            List[tuple]: rows ClickHouse rejected, now dead-lettered
+        """
+        self._inflight_rows += len(rows)
+        try:
+            rejected = await asyncio.gather(
+                *(
+                    self._write_shard(engine, shard_rows)
+                    for engine, shard_rows in self.shards.partition(rows, SHARD_KEY_INDEX)
+                )
+            )
         finally:
-            session.close()
+            self._inflight_rows -= len(rows)
+        return [row for shard_rejected in rejected for row in shard_rejected]
 
-    def find_by_user_id(self, user_id: str) -> List[StatisticLog]:
+    async def _write_shard(self, engine: Engine, rows: List[tuple]) -> List[tuple]:
         try:
-            result = self.session.execute(
-                select(StatisticLog).where(StatisticLog.user_id == user_id)
+            await self._insert_shard(engine, rows)
+        except Exception as e:
+            if self.spool is None:
+                raise
+            if is_retryable(e):
+                logger.warning("ClickHouse insert failed, spooling %d rows", len(rows), exc_info=True)
+                self.spool.append(rows)
+                return []
+            # Replaying rows the driver or the server rejected would fail
+            # the same way and hold up the rows spooled after them. The
+            # batch is halved until the rejected rows are isolated, so only
+            # those are dead-lettered
+            if len(rows) == 1:
+                self.spool.dead_letter(rows, e)
+                return rows
+            middle = len(rows) // 2
+            head = await self._write_shard(engine, rows[:middle])
+            return head + await self._write_shard(engine, rows[middle:])
+        return []
+
+    def _is_duplicate(self, data) -> bool:
+        if self.recent_keys is None:
+            return False
+        key = data.dedup_key()
+        return key is not None and self.recent_keys.seen(key)
+
+    def _forget(self, data: List) -> None:
+        if self.recent_keys is None:
+            return
+        for item in data:
+            key = item.dedup_key()
+            if key is not None:
+                self.recent_keys.discard(key)
+
+    def _admit(self) -> None:
+        if not self.admission.admit(self.depth):
+            raise IngestionOverloadedException(
+                headers={"Retry-After": str(config.INGESTION_RETRY_AFTER)}
+            )
+
+    async def _insert_rows(self, rows: List[tuple]) -> None:
+        """Write a batch of encoded rows, one columnar insert per shard in parallel"""
+        await asyncio.gather(
+            *(
+                self._insert_shard(engine, shard_rows)
+                for engine, shard_rows in self.shards.partition(rows, SHARD_KEY_INDEX)
             )
-            return list(result.scalars().all())
-        except SQLAlchemyError as e:
+        )
+
+    async def _insert_shard(self, engine: Engine, rows: List[tuple]) -> None:
+        await run_in_executor(
+            insert_columns,
+            statistic_log_encoder.table,
+            statistic_log_encoder.to_columns(rows),
+            engine,
+        )
+
+    async def find_by_user_id(self, user_id: str) -> List[dict]:
+        """Logs of a user, read from every shard
+
+        Reads fan out instead of following the hash ring so that rows written
+        before shards were added are still found.
+        """
+        query = select(StatisticLog.__table__).where(StatisticLog.user_id == user_id)
+        try:
+            results = await fan_out(self.shards, _fetch_all, query)
+        except (SQLAlchemyError, ClickHouseError) as e:
             raise HTTPException(status_code=500, detail=f"Query error: {str(e)}")
+        return [row for rows in results for row in rows]
 
-    def count_by_user_id(self, user_id: str) -> int:
+    async def count_by_user_id(self, user_id: str) -> int:
+        query = (
+            select(func.count())
+            .select_from(StatisticLog.__table__)
+            .where(StatisticLog.user_id == user_id)
+        )
         try:
-            result = self.session.execute(
-                select(func.count(StatisticLog.id)).where(
-                    StatisticLog.user_id == user_id
-                )
-            )
-            return result.scalar() or 0
-        except SQLAlchemyError as e:
+            counts = await fan_out(self.shards, _fetch_scalar, query)
+        except (SQLAlchemyError, ClickHouseError) as e:
             raise HTTPException(status_code=500, detail=f"Count error: {str(e)}")
+        return sum(count or 0 for count in counts)
 
     def _safe_get_string(self, value: Any) -> str:
         return str(value) if value is not None else ""
@@ -109,36 +277,66 @@ class StatisticLogSQLAlchemyRepo:
             return [str(v) for v in value]
         return []
 
-    def _determine_type(self, value: Any) -> str:
-        if isinstance(value, bool):
-            return "bool"
-        elif isinstance(value, int):
-            return "integer"
-        elif isinstance(value, float):
-            return "number"
-        elif isinstance(value, str):
-            try:
-                datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
-                return "date"
-            except:
-                return "string"
-        elif isinstance(value, datetime):
-            return "date"
-        return "string"
-
-    def _convert_value_for_type(self, value: Any, value_type: str) -> Any:
+
+class StatisticLogSQLAlchemyQueryRepo(StatisticQueryRepo):
+    """Event lookups by conversation and message, and stats from the rollups
+
+    Neither column is in the sorting key of statistic_log; the lookups rely
+    on its bloom filter skip indexes to read only the granules that may
+    hold the value. Like ``find_by_user_id`` every read fans out to all
+    shards.
+    """
+
+    def __init__(self):
+        self.shards = clickhouse_shards
+
+    async def find_by_conversation_id(
+        self, conversation_id: str, *, activity_type: str | None = None, limit: int
+    ) -> List[dict]:
+        query = select(StatisticLog.__table__).where(StatisticLog.conversation_id == conversation_id)
+        if activity_type is not None:
+            query = query.where(StatisticLog.activity_type == activity_type)
+        return await self._lookup(query, limit)
+
+    async def find_by_msg_id(self, msg_id: str, *, limit: int) -> List[dict]:
+        query = select(StatisticLog.__table__).where(StatisticLog.msg_id == msg_id)
+        return await self._lookup(query, limit)
+
+    async def _lookup(self, query, limit: int) -> List[dict]:
+        """Oldest ``limit`` rows of ``query`` over all shards
+
+        Retries not yet collapsed by ReplacingMergeTree share an id and are
+        returned once.
+        """
+        query = query.order_by(StatisticLog.utc_timestamp).limit(limit)
         try:
-            if value_type == "integer":
-                return int(value)
-            elif value_type == "number":
-                return float(value)
-            elif value_type == "bool":
-                return bool(value)
-            elif value_type == "date":
-                if isinstance(value, str):
-                    return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
-                return value
+            results = await fan_out(self.shards, _fetch_all, query)
+        except (SQLAlchemyError, ClickHouseError) as e:
+            raise HTTPException(status_code=500, detail=f"Query error: {str(e)}")
+        rows = {row["id"]: row for rows in results for row in rows}
+        return sorted(rows.values(), key=lambda row: row["utc_timestamp"])[:limit]
+
+    async def stats(self, query: StatisticStatsQuery) -> dict:
+        """Events and distinct users from the coarsest rollup answering ``query``
+
+        Shards hold different users, so their counts add up.
+        """
+        table, start, end = pick_rollup(query.start, query.end, query.interval)
+        try:
+            results = await fan_out(self.shards, _fetch_all, stats_select(table, query, start, end))
+        except (SQLAlchemyError, ClickHouseError) as e:
+            raise HTTPException(status_code=500, detail=f"Query error: {str(e)}")
+        items = {}
+        for row in (row for rows in results for row in rows):
+            key = tuple(value for name, value in row.items() if name not in ("events", "users"))
+            if key in items:
+                items[key]["events"] += row["events"]
+                items[key]["users"] += row["users"]
             else:
-                return str(value)
-        except:
-            return str(value)
+                items[key] = row
+        return {
+            "granularity": rollup_of(table).granularity,
+            "start": start,
+            "end": end,
+            "items": [items[key] for key in sorted(items)],
+        }
@@ -17,3 +17,33 @@ class UserNotFoundException(CustomException):
     code = 404
     error_code = "USER__NOT_FOUND"
     message = "user not found"
+
+
+class InvalidLogBodyException(CustomException):
+    code = 400
+    error_code = "STATISTIC__INVALID_BODY"
+    message = "body must be a JSON or MessagePack object"
+
+
+class InvalidBatchBodyException(CustomException):
+    code = 400
+    error_code = "STATISTIC__INVALID_BATCH_BODY"
+    message = "batch body must be a JSON array, NDJSON stream or MessagePack array"
+
+
+class BatchTooLargeException(CustomException):
+    code = 413
+    error_code = "STATISTIC__BATCH_TOO_LARGE"
+    message = "too many items in batch"
+
+
+class IngestionOverloadedException(CustomException):
+    code = 503
+    error_code = "STATISTIC__INGESTION_OVERLOADED"
+    message = "ingestion queue is full, retry later"
+
+
+class InvalidStatsRangeException(CustomException):
+    code = 400
+    error_code = "STATISTIC__INVALID_STATS_RANGE"
+    message = "stats range must end after it starts and span at most STATISTIC_STATS_MAX_BUCKETS intervals"
@@ -1,6 +1,7 @@
 from app.statistic_log.adapter.output.persistence.repository_adapter import StatisticRepositoryAdapter
-from app.statistic_log.domain.command import CreateStatisticLogCommand
+from app.statistic_log.domain.command import CreateStatisticLogCommand, StatisticStatsQuery
 from app.statistic_log.domain.usecase.statistic import StatisticLogUseCase
+from app.statistic_log.domain.vo.outcome import LogOutcome
 from core.db import Transactional
 from core.helpers.token import TokenHelper
 
@@ -10,4 +11,20 @@ class StatisticService(StatisticLogUseCase):
         self.repository = repository
 
     async def create_log(self, *, command: CreateStatisticLogCommand) -> None:
-        await self.repository.create_log(data=command)
\ No newline at end of file
+        await self.repository.create_log(data=command)
+
+    async def create_logs(self, *, commands: list[CreateStatisticLogCommand]) -> list[LogOutcome]:
+        return await self.repository.create_logs(data=commands)
+
+    async def get_conversation_logs(
+        self, *, conversation_id: str, activity_type: str | None, limit: int
+    ) -> list[dict]:
+        return await self.repository.find_by_conversation_id(
+            conversation_id=conversation_id, activity_type=activity_type, limit=limit
+        )
+
+    async def get_message_logs(self, *, msg_id: str, limit: int) -> list[dict]:
+        return await self.repository.find_by_msg_id(msg_id=msg_id, limit=limit)
+
+    async def get_stats(self, *, query: StatisticStatsQuery) -> dict:
+        return await self.repository.stats(query=query)
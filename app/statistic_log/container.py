@@ -3,7 +3,10 @@ from dependency_injector.providers import Factory, Singleton
 
 from app.statistic_log.adapter.output.persistence.repository_adapter import StatisticRepositoryAdapter
 from app.statistic_log.adapter.output.persistence.sqlalchemy.statistic import StatisticLogRepo
-from app.statistic_log.adapter.output.persistence.sqlalchemy.statistic_sqlalchemy import StatisticLogSQLAlchemyRepo
+from app.statistic_log.adapter.output.persistence.sqlalchemy.statistic_sqlalchemy import (
+    StatisticLogSQLAlchemyQueryRepo,
+    StatisticLogSQLAlchemyRepo,
+)
 from app.statistic_log.application.service.statistic import StatisticService
 
 
@@ -15,10 +18,12 @@ class StatisticContainer(DeclarativeContainer):
     
     # Option 2: Use the new SQLAlchemy-based repository (recommended)
     statistic_log_sqlalchemy_repo = Singleton(StatisticLogSQLAlchemyRepo)
+    statistic_log_query_repo = Singleton(StatisticLogSQLAlchemyQueryRepo)
     
     # Use SQLAlchemy repository by default
     statistic_repository_adapter = Factory(
         StatisticRepositoryAdapter,
         statistic_repo=statistic_log_sqlalchemy_repo,
+        query_repo=statistic_log_query_repo,
     )
     statistic_service = Factory(StatisticService, repository=statistic_repository_adapter)
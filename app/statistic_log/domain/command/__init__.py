@@ -1,6 +1,8 @@
-from typing import List, Dict, Any, Optional
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Annotated, List, Dict, Any, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 class StatisticData(BaseModel):
@@ -11,31 +13,74 @@ class StatisticData(BaseModel):
                                                description="An array of strings representing all text on the page")
 
     def to_dict(self) -> dict:
-        return self.dict()
-
-
-class CreateStatisticLogCommand(BaseModel):
-    local_timestamp: Optional[str] = Field(None, description="Time local of log")
-    time_zone: Optional[str] = Field(None, description="Timezone of log")
-    utc_timestamp: Optional[str] = Field(None, description="UTC Timestamp of log")
-    activity_type: Optional[str] = Field(None, description="Activity type")
-    detail: Optional[str] = Field(None, description="Detail log")
-    user_id: Optional[str] = Field(None, description="Id of User")
-    conversation_id: Optional[str] = Field(None, description="Id of conversation")
-    msg_id: Optional[str] = Field(None, description="ID of message")
-    extension_version: Optional[str] = Field(None, description="Version of chatbot")
-    user_agent: Optional[str] = Field(None, description="User context")
-    agent_name: Optional[str] = Field(None, description="User context")
-    agent_version: Optional[str] = Field(None, description="User context")
-    current_url: Optional[str] = Field(None, description="URL of browser when User sends a message")
-    page_title: Optional[str] = Field(None, description="Page title")
-    page_description: Optional[str] = Field(None, description="Description of current page")
-    page_keywords: Optional[List[str]] = Field(None,
-                                               description="An array of strings representing all text on the page")
-    extra_data: Optional[Dict[str,Any]]= Field(None,
-                                               description="Extra data from request")
+        return self.model_dump()
+
+
+@dataclass(slots=True)
+class CreateStatisticLogCommand:
+    """Event to store, validated once from the request body by ``command_adapter``"""
+
+    local_timestamp: Optional[str] = None
+    time_zone: Optional[str] = None
+    utc_timestamp: Optional[str] = None
+    activity_type: Optional[str] = None
+    detail: Optional[str] = None
+    user_id: Optional[str] = None
+    conversation_id: Optional[str] = None
+    msg_id: Optional[str] = None
+    extension_version: Optional[str] = None
+    user_agent: Optional[str] = None
+    agent_name: Optional[str] = None
+    agent_version: Optional[str] = None
+    current_url: Optional[str] = None
+    page_title: Optional[str] = None
+    page_description: Optional[str] = None
+    page_keywords: Optional[List[str]] = None
+    extra_data: Optional[Dict[str, Any]] = None
+    # Set from the Idempotency-Key header, never from the body, and left out
+    # of the JSON dump stored in ``_source``
+    idempotency_key: Annotated[Optional[str], Field(exclude=True)] = field(default=None, init=False)
 
     def to_dict(self) -> dict:
-        # Use `dict` to serialize and ensure nested objects are converted properly
-        data = self.dict()
-        return data
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CreateStatisticLogCommand":
+        """Command back from ``to_dict``, ignoring keys that are not fields"""
+        command = cls(**{name: data[name] for name in _INIT_FIELDS if name in data})
+        command.idempotency_key = data.get("idempotency_key")
+        return command
+
+    def dedup_key(self) -> Optional[str]:
+        """Key identical for a client retry of this event, None if it has no identity
+
+        A message produces several activities, so ``msg_id`` alone does not
+        identify an event: the activity type, user and client timestamp are
+        part of the key.
+        """
+        if self.idempotency_key:
+            return self.idempotency_key
+        if not self.msg_id:
+            return None
+        return "|".join(
+            (self.msg_id, self.activity_type or "", self.user_id or "", self.utc_timestamp or "")
+        )
+
+
+_INIT_FIELDS = tuple(f.name for f in fields(CreateStatisticLogCommand) if f.init)
+
+# Validates request bodies straight into commands, and dumps them to JSON
+command_adapter = TypeAdapter(CreateStatisticLogCommand)
+
+
+@dataclass(slots=True)
+class StatisticStatsQuery:
+    """Event counts between ``start`` and ``end`` (UTC), per ``interval`` when given"""
+
+    start: datetime
+    end: datetime
+    interval: Optional[str] = None
+    group_by: tuple[str, ...] = ("activity_type",)
+    activity_type: Optional[str] = None
+    agent_name: Optional[str] = None
+    extension_version: Optional[str] = None
@@ -1,7 +1,30 @@
 from abc import ABC, abstractmethod
 
+from app.statistic_log.domain.command import StatisticStatsQuery
+from app.statistic_log.domain.vo.outcome import LogOutcome
+
 
 class StatisticRepo(ABC):
     @abstractmethod
     async def create_log(self, *, data) -> None:
         """Save log"""
+
+    @abstractmethod
+    async def create_logs(self, *, data: list) -> list[LogOutcome]:
+        """Save many logs with one insert, returning the outcome of each"""
+
+
+class StatisticQueryRepo(ABC):
+    @abstractmethod
+    async def find_by_conversation_id(
+        self, conversation_id: str, *, activity_type: str | None = None, limit: int
+    ) -> list[dict]:
+        """Events of a conversation, oldest first"""
+
+    @abstractmethod
+    async def find_by_msg_id(self, msg_id: str, *, limit: int) -> list[dict]:
+        """Events of a message, oldest first"""
+
+    @abstractmethod
+    async def stats(self, query: StatisticStatsQuery) -> dict:
+        """Event counts from the pre-aggregated rollups"""
@@ -1,10 +1,29 @@
 import json
 from abc import ABC, abstractmethod
 
-from app.statistic_log.domain.command import CreateStatisticLogCommand
+from app.statistic_log.domain.command import CreateStatisticLogCommand, StatisticStatsQuery
+from app.statistic_log.domain.vo.outcome import LogOutcome
 
 
 class StatisticLogUseCase(ABC):
     @abstractmethod
     async def create_log(self, *, command: CreateStatisticLogCommand) -> None:
         """Create log"""
+
+    @abstractmethod
+    async def create_logs(self, *, commands: list[CreateStatisticLogCommand]) -> list[LogOutcome]:
+        """Create many logs, returning the outcome of each"""
+
+    @abstractmethod
+    async def get_conversation_logs(
+        self, *, conversation_id: str, activity_type: str | None, limit: int
+    ) -> list[dict]:
+        """Get logs of a conversation"""
+
+    @abstractmethod
+    async def get_message_logs(self, *, msg_id: str, limit: int) -> list[dict]:
+        """Get logs of a message"""
+
+    @abstractmethod
+    async def get_stats(self, *, query: StatisticStatsQuery) -> dict:
+        """Get event counts"""
@@ -0,0 +1,9 @@
+from enum import Enum
+
+
+class LogOutcome(Enum):
+    """What became of one event of a batch"""
+
+    ACCEPTED = "Success"
+    DUPLICATE = "Duplicate"
+    FAILED = "Failed"
@@ -0,0 +1,56 @@
+"""Query runners shared by the benchmarks that need a ClickHouse engine
+
+Benchmarks run against the configured ClickHouse server, or in process
+with chdb when it is installed.
+"""
+import time
+from typing import Callable
+
+from core.config import config
+
+# Runs a query and returns (result rows, seconds)
+Runner = Callable[[str], tuple[list, float]]
+
+
+def server_runner(database: str | None = None) -> Runner:
+    """Runner on the configured server, in ``database`` instead of the app's when given"""
+    from clickhouse_driver import Client
+
+    options = dict(
+        host=config.CLICK_HOUSE_HOST,
+        port=config.CLICK_HOUSE_PORT,
+        user=config.CLICK_HOUSE_USER,
+        password=config.CLICK_HOUSE_PASSWORD,
+    )
+    if database is not None:
+        Client(**options).execute(f"CREATE DATABASE IF NOT EXISTS {database}")
+    client = Client(database=database or config.CLICK_HOUSE_DB, **options)
+
+    def run(sql: str) -> tuple[list, float]:
+        started = time.perf_counter()
+        rows = client.execute(sql)
+        return rows, time.perf_counter() - started
+
+    return run
+
+
+def chdb_runner() -> Runner:
+    from chdb import session
+
+    sess = session.Session()
+    sess.query("CREATE DATABASE IF NOT EXISTS bench ENGINE = Atomic")
+    sess.query("USE bench")
+
+    def run(sql: str) -> tuple[list, float]:
+        started = time.perf_counter()
+        result = sess.query(sql, "TabSeparated")
+        elapsed = time.perf_counter() - started
+        return [line.split("\t") for line in str(result).splitlines()], elapsed
+
+    return run
+
+
+def rows_read(run: Runner, sql: str) -> int:
+    # database, table, parts, rows, marks per table read
+    rows, _ = run(f"EXPLAIN ESTIMATE {sql}")
+    return sum(int(row[3]) for row in rows)
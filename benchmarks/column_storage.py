@@ -0,0 +1,93 @@
+"""Compare statistic_log storage and scans with plain columns and with the model's column types.
+
+The plain table is the model table with every ``LowCardinality`` unwrapped
+and no column codecs, so it stores what the previous schema did under the
+same layout. Both tables get the same generated events; the bytes per row
+on disk come from ``system.columns`` and each aggregation is run
+``--repeat`` times, keeping the best time.
+
+Runs against the configured ClickHouse server, or in process with chdb
+when ``--chdb`` is given and chdb is installed.
+
+Usage:
+    python -m benchmarks.column_storage --rows 2000000 [--chdb]
+"""
+import argparse
+import re
+
+from benchmarks.clickhouse import Runner, chdb_runner, server_runner
+from benchmarks.fixtures import insert_events
+from core.db.clickhouse_models import StatisticLog
+from core.db.init_clickhouse import table_ddl
+
+PLAIN = "statistic_log_bench_plain"
+TYPED = "statistic_log_bench_typed"
+
+QUERIES = {
+    "events by activity and agent": (
+        "SELECT activity_type, agent_name, count() FROM {table} GROUP BY activity_type, agent_name"
+    ),
+    "users by extension version": (
+        "SELECT extension_version, uniq(user_id) FROM {table} GROUP BY extension_version"
+    ),
+    "daily events by time zone": (
+        "SELECT toDate(utc_timestamp) AS day, time_zone, count() FROM {table} GROUP BY day, time_zone"
+    ),
+    "send_message by user agent": (
+        "SELECT user_agent, count() FROM {table} WHERE activity_type = 'send_message' GROUP BY user_agent"
+    ),
+}
+
+
+def plain_ddl(name: str) -> str:
+    ddl = table_ddl(StatisticLog.__table__, name)
+    ddl = re.sub(r"LowCardinality\((\w+)\)", r"\1", ddl)
+    return re.sub(r" CODEC\((?:[^()]|\([^()]*\))*\)", "", ddl)
+
+
+def load(run: Runner, n_rows: int) -> None:
+    for name in (PLAIN, TYPED):
+        run(f"DROP TABLE IF EXISTS {name}")
+    run(plain_ddl(PLAIN))
+    run(table_ddl(StatisticLog.__table__, TYPED))
+    insert_events(run, PLAIN, n_rows)
+    run(f"INSERT INTO {TYPED} SELECT * FROM {PLAIN}")
+    run(f"OPTIMIZE TABLE {PLAIN} FINAL")
+    run(f"OPTIMIZE TABLE {TYPED} FINAL")
+
+
+def column_bytes(run: Runner, table: str) -> dict[str, int]:
+    rows, _ = run(
+        "SELECT name, data_compressed_bytes FROM system.columns "
+        f"WHERE database = currentDatabase() AND table = '{table}'"
+    )
+    return {name: int(size) for name, size in rows}
+
+
+def main(n_rows: int, repeat: int, use_chdb: bool) -> None:
+    run = chdb_runner() if use_chdb else server_runner()
+    load(run, n_rows)
+    plain, typed = column_bytes(run, PLAIN), column_bytes(run, TYPED)
+    print(f"{n_rows} rows, compressed bytes per row")
+    print(f"{'column':<24}{'plain':>10}{'typed':>10}")
+    for name in plain:
+        print(f"{name:<24}{plain[name] / n_rows:>10.2f}{typed[name] / n_rows:>10.2f}")
+    print(f"{'total':<24}{sum(plain.values()) / n_rows:>10.2f}{sum(typed.values()) / n_rows:>10.2f}")
+    print()
+    print(f"{'query':<32}{'plain ms':>10}{'typed ms':>10}")
+    for name, query in QUERIES.items():
+        timings = [
+            min(run(query.format(table=table))[1] for _ in range(repeat)) * 1000 for table in (PLAIN, TYPED)
+        ]
+        print(f"{name:<32}{timings[0]:>10.1f}{timings[1]:>10.1f}")
+    for name in (PLAIN, TYPED):
+        run(f"DROP TABLE IF EXISTS {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chdb", action="store_true")
+    args = parser.parse_args()
+    main(args.rows, args.repeat, args.chdb)
@@ -0,0 +1,71 @@
+"""Compare uuid4 and time-ordered event ids: generation cost and merge locality.
+
+Generation is timed for uuid4, the UUIDv7 generator and the UUIDv8 ids
+derived from an event's timestamp and dedup key.
+
+Merge locality is simulated for a table ordered by id receiving inserts of
+``--part-rows`` events: for every new part it counts the earlier parts
+whose id range overlaps it, which a merge has to interleave row by row,
+and the share of the table's sort order the part spans. With random ids
+every part overlaps every other one; with time-ordered ids parts line up.
+
+Usage:
+    python -m benchmarks.event_ids --ids 200000 --parts 50 --part-rows 2000
+"""
+import argparse
+import bisect
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable
+
+from app.statistic_log.adapter.output.persistence.row_encoder import row_id
+from core.helpers.event_id import derived_uuid, uuid7
+
+
+def bench(make_id: Callable[[int], str], n_ids: int) -> float:
+    started = time.perf_counter()
+    for i in range(n_ids):
+        make_id(i)
+    return (time.perf_counter() - started) / n_ids
+
+
+def merge_locality(make_id: Callable[[int], str], n_parts: int, part_rows: int) -> tuple[float, float]:
+    """Mean number of overlapping earlier parts and mean span of a new part"""
+    ranges: list[tuple[str, str]] = []
+    table: list[str] = []
+    overlaps = spans = 0.0
+    for part in range(n_parts):
+        ids = sorted(make_id(part * part_rows + i) for i in range(part_rows))
+        low, high = ids[0], ids[-1]
+        overlaps += sum(1 for start, end in ranges if start <= high and low <= end)
+        ranges.append((low, high))
+        table = sorted(table + ids)
+        spans += (bisect.bisect_right(table, high) - bisect.bisect_left(table, low)) / len(table)
+    return overlaps / n_parts, spans / n_parts
+
+
+def main(n_ids: int, n_parts: int, part_rows: int) -> None:
+    start = datetime(2024, 1, 1)
+    # Client timestamps have second precision, a few events per second
+    timestamps = [(start + timedelta(seconds=i // 4)).strftime("%Y-%m-%d %H:%M:%S") for i in range(n_ids)]
+    cases = {
+        "uuid4": lambda i: str(uuid.uuid4()),
+        "uuid7": lambda i: uuid7(),
+        "derived uuid8": lambda i: derived_uuid(start + timedelta(milliseconds=i), f"msg-{i}"),
+        "row_id keyed": lambda i: row_id(f"msg-{i}", timestamps[i % n_ids]),
+    }
+    print(f"{'id':<16}{'us/id':>8}{'overlapping parts':>20}{'part span':>12}")
+    for name, make_id in cases.items():
+        cost = bench(make_id, n_ids)
+        overlaps, span = merge_locality(make_id, n_parts, part_rows)
+        print(f"{name:<16}{cost * 1e6:>8.2f}{overlaps:>20.1f}{span:>12.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ids", type=int, default=200000)
+    parser.add_argument("--parts", type=int, default=50)
+    parser.add_argument("--part-rows", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.ids, args.parts, args.part_rows)
@@ -0,0 +1,105 @@
+"""Measure the per-event cost of typing ``extra_data`` values.
+
+The baseline is the previous repository code, which ran ``datetime.strptime``
+inside try/except for every string and parsed dates a second time to convert
+them. It is compared with ``fill_extra_data``.
+
+Usage:
+    python -m benchmarks.extra_data_types --events 50000
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import Any
+
+from app.statistic_log.adapter.output.persistence.extra_data import fill_extra_data
+from benchmarks.fixtures import make_events
+
+
+def legacy_determine_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    elif isinstance(value, int):
+        return "integer"
+    elif isinstance(value, float):
+        return "number"
+    elif isinstance(value, str):
+        try:
+            datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+            return "date"
+        except ValueError:
+            return "string"
+    elif isinstance(value, datetime):
+        return "date"
+    return "string"
+
+
+def legacy_convert_value_for_type(value: Any, value_type: str) -> Any:
+    try:
+        if value_type == "integer":
+            return int(value)
+        elif value_type == "number":
+            return float(value)
+        elif value_type == "bool":
+            return bool(value)
+        elif value_type == "date":
+            if isinstance(value, str):
+                return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+            return value
+        else:
+            return str(value)
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def legacy_fill_extra_data(record: dict, extra_data: dict) -> dict:
+    for key, value in extra_data.items():
+        if value is not None:
+            value_type = legacy_determine_type(value)
+            record[f"{value_type}_names"].append(str(key))
+            record[f"{value_type}_values"].append(
+                legacy_convert_value_for_type(value, value_type)
+            )
+    return record
+
+
+def empty_record() -> dict:
+    record = {}
+    for value_type in ("string", "integer", "number", "bool", "date"):
+        record[f"{value_type}_names"] = []
+        record[f"{value_type}_values"] = []
+    return record
+
+
+def bench(fill, events: list[dict]) -> tuple[float, list[dict]]:
+    records = [empty_record() for _ in events]
+    started = time.perf_counter()
+    for record, event in zip(records, events):
+        fill(record, event)
+    return time.perf_counter() - started, records
+
+
+def main(n_events: int) -> None:
+    events = [event["extra_data"] for event in make_events(n_events)]
+    # Add the string shapes seen in production: ids, urls and free text
+    for i, event in enumerate(events):
+        event["session_id"] = f"session-{i % 97}"
+        event["button_label"] = "Summarize this page"
+        event["published_at"] = "2024-03-18 09:15:00"
+
+    legacy_elapsed, legacy_records = bench(legacy_fill_extra_data, events)
+    elapsed, records = bench(fill_extra_data, events)
+    assert records == legacy_records
+
+    n_values = sum(len(event) for event in events)
+    print(f"typed {n_events} events, {n_values / n_events:.0f} extra_data values/event")
+    print(f"strptime  : {legacy_elapsed / n_events * 1e6:6.2f} us/event")
+    print(f"ciso8601  : {elapsed / n_events * 1e6:6.2f} us/event")
+    print(f"speedup   : {legacy_elapsed / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50000)
+    args = parser.parse_args()
+    main(args.events)
@@ -0,0 +1,70 @@
+"""Synthetic extension events shared by the benchmarks"""
+import random
+from datetime import datetime, timedelta
+
+ACTIVITY_TYPES = ["open_chat", "send_message", "receive_message", "copy_answer", "close_chat"]
+AGENTS = [("Chrome", "124.0"), ("Edge", "123.0"), ("Firefox", "125.0")]
+WORDS = "statistic event browser extension chatbot message page keyword summary answer".split()
+
+
+def make_event(i: int, *, seed: int = 0) -> dict:
+    """Return a StatisticLogRequest-shaped payload for event ``i``"""
+    rnd = random.Random(seed * 1_000_003 + i)
+    utc = datetime(2024, 1, 1) + timedelta(seconds=i * 7)
+    agent_name, agent_version = rnd.choice(AGENTS)
+    return {
+        "local_timestamp": (utc + timedelta(hours=7)).strftime("%Y-%m-%d %H:%M:%S"),
+        "time_zone": "Asia/Ho_Chi_Minh",
+        "utc_timestamp": utc.strftime("%Y-%m-%d %H:%M:%S"),
+        "activity_type": rnd.choice(ACTIVITY_TYPES),
+        "detail": "detail of the event",
+        "user_id": f"user-{rnd.randrange(1000)}",
+        "conversation_id": f"conversation-{rnd.randrange(20000)}",
+        "msg_id": f"msg-{i}",
+        "extension_version": "1.4.2",
+        "user_agent": f"Mozilla/5.0 {agent_name}/{agent_version}",
+        "agent_name": agent_name,
+        "agent_version": agent_version,
+        "current_url": f"https://example.com/page/{rnd.randrange(500)}",
+        "page_title": "Example page title",
+        "page_description": " ".join(rnd.choices(WORDS, k=40)),
+        "page_keywords": rnd.choices(WORDS, k=200),
+        "extra_data": {
+            "tab_count": rnd.randrange(30),
+            "scroll_ratio": rnd.random(),
+            "is_pinned": rnd.random() < 0.5,
+            "opened_at": utc.strftime("%Y-%m-%d %H:%M:%S"),
+            "referrer": "https://example.com/",
+        },
+    }
+
+
+def make_events(n: int, *, seed: int = 0) -> list[dict]:
+    return [make_event(i, seed=seed) for i in range(n)]
+
+
+def insert_events(run, table: str, n_rows: int) -> None:
+    """Fill a statistic_log shaped ``table`` with ``n_rows`` events generated by ClickHouse
+
+    Events spread over six months; each of 20000 conversations belongs to
+    one of 1000 users.
+    """
+    run(
+        f"INSERT INTO {table} (id, local_timestamp, time_zone, utc_timestamp, local_date, user_id, "
+        "conversation_id, msg_id, activity_type, detail, _source, current_url, page_title, "
+        "user_agent, extension_version, agent_name, agent_version, string_names, string_values, "
+        "integer_names, integer_values) "
+        "SELECT toString(generateUUIDv4()), utc + toIntervalHour(7), 'Asia/Ho_Chi_Minh', utc, "
+        "toDate(utc + toIntervalHour(7)), concat('user-', toString(conversation % 1000)), "
+        "concat('conversation-', toString(conversation)), concat('msg-', toString(number)), "
+        "['open_chat', 'send_message', 'receive_message', 'copy_answer', 'close_chat'][rand(2) % 5 + 1], "
+        "'detail of the event', concat('{\"page\": ', toString(rand(3) % 500), ', \"event\": \"chat\"}'), "
+        "concat('https://example.com/page/', toString(rand(3) % 500)), 'Example page title', "
+        "concat('Mozilla/5.0 ', agent, '/', version), ['1.4.2', '1.4.1', '1.3.0'][rand(4) % 3 + 1], "
+        "agent, version, ['referrer'], ['https://example.com/'], ['tab_count'], [toInt32(rand(5) % 30)] "
+        "FROM (SELECT number, rand(1) % 20000 AS conversation, "
+        "toDateTime64('2024-01-01 00:00:00', 3, 'UTC') "
+        f"+ toIntervalMillisecond(intDiv(number * 15552000000, {n_rows})) AS utc, "
+        "['Chrome', 'Edge', 'Firefox'][rand(6) % 3 + 1] AS agent, "
+        f"['124.0', '123.0', '125.0'][rand(7) % 3 + 1] AS version FROM numbers({n_rows}))"
+    )
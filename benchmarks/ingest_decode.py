@@ -0,0 +1,56 @@
+"""Compare the cost of decoding event bodies sent as JSON and as MessagePack.
+
+Each body is timed twice: decoding alone, and decoding plus validation into
+``StatisticLogRequest`` the way the /log endpoint does it.
+
+Usage:
+    python -m benchmarks.ingest_decode --events 20000
+"""
+import argparse
+import json
+import time
+from typing import Callable
+
+import msgpack
+
+from app.statistic_log.adapter.input.api.v1.request import StatisticLogRequest
+from benchmarks.fixtures import make_events
+from core.helpers import serializer
+
+
+def bench(decode: Callable[[bytes], object], bodies: list[bytes]) -> float:
+    started = time.perf_counter()
+    for body in bodies:
+        decode(body)
+    return (time.perf_counter() - started) / len(bodies)
+
+
+def main(n_events: int) -> None:
+    events = make_events(n_events)
+    json_bodies = [serializer.dumps(event) for event in events]
+    msgpack_bodies = [msgpack.packb(event) for event in events]
+
+    json_size = sum(map(len, json_bodies)) / n_events
+    msgpack_size = sum(map(len, msgpack_bodies)) / n_events
+    print(f"{n_events} events, json {json_size:.0f} bytes/event, msgpack {msgpack_size:.0f} bytes/event")
+
+    cases = [
+        ("json decode (stdlib)", json.loads, json_bodies),
+        (f"json decode ({serializer.BACKEND})", serializer.loads, json_bodies),
+        ("msgpack decode", serializer.unpackb, msgpack_bodies),
+        ("json validate", StatisticLogRequest.model_validate_json, json_bodies),
+        (
+            "msgpack validate",
+            lambda body: StatisticLogRequest.model_validate(serializer.unpackb(body)),
+            msgpack_bodies,
+        ),
+    ]
+    for name, decode, bodies in cases:
+        print(f"{name:<22}: {bench(decode, bodies) * 1e6:6.2f} us/event")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.events)
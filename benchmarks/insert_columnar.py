@@ -0,0 +1,106 @@
+"""Compare row-dict and columnar inserts into statistic_log.
+
+By default both paths are encoded by asynch's native block writer into an
+in-memory buffer, which isolates the client-side transposition and encoding
+cost. Pass ``--live`` to also time real inserts through ``clickhouse_manager``
+against the configured ClickHouse server.
+
+Usage:
+    python -m benchmarks.insert_columnar --rows 50000 [--live]
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from asynch.proto import constants
+from asynch.proto.block import ColumnOrientedBlock, RowOrientedBlock
+from asynch.proto.context import Context
+from asynch.proto.streams.block import BlockWriter
+from asynch.proto.streams.buffered import BufferedWriter
+
+from app.statistic_log.adapter.output.persistence.row_encoder import statistic_log_encoder
+from app.statistic_log.domain.command import command_adapter
+from benchmarks.fixtures import make_events
+from core.db.clickhouse_columns import rows_to_columns
+from core.db.clickhouse_db import clickhouse_manager
+from core.db.clickhouse_models import StatisticLog
+from core.db.clickhouse_session import clickhouse_engine
+
+
+def make_rows(n: int) -> list[dict]:
+    return [
+        statistic_log_encoder.to_dict(statistic_log_encoder.encode(command_adapter.validate_python(event)))
+        for event in make_events(n)
+    ]
+
+
+def make_block_writer() -> BlockWriter:
+    context = Context()
+    context.server_info = SimpleNamespace(revision=constants.CLIENT_REVISION, timezone="UTC")
+    context.client_settings = {
+        "strings_as_bytes": False,
+        "strings_encoding": constants.STRINGS_ENCODING,
+        "use_numpy": False,
+        "input_format_null_as_default": False,
+    }
+    return BlockWriter(reader=None, writer=BufferedWriter(), context=context)
+
+
+async def encode(block) -> int:
+    writer = make_block_writer()
+    await writer.write(block)
+    return len(writer.writer.buffer)
+
+
+async def bench_encoding(rows: list[dict], columns_with_types: list[tuple[str, str]]) -> None:
+    names = [name for name, _ in columns_with_types]
+    columns = rows_to_columns(rows, names)
+
+    started = time.perf_counter()
+    size = await encode(RowOrientedBlock(columns_with_types=columns_with_types, data=rows))
+    row_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await encode(ColumnOrientedBlock(columns_with_types=columns_with_types, data=columns))
+    column_elapsed = time.perf_counter() - started
+
+    n = len(rows)
+    print(f"encoded {n} rows, {size / n:.0f} bytes/row on the wire")
+    print(f"row dicts : {row_elapsed * 1000:8.1f} ms  {row_elapsed / n * 1e6:6.2f} us/row")
+    print(f"columnar  : {column_elapsed * 1000:8.1f} ms  {column_elapsed / n * 1e6:6.2f} us/row")
+    print(f"speedup   : {row_elapsed / column_elapsed:.2f}x")
+
+
+async def bench_live(rows: list[dict], names: list[str]) -> None:
+    columns = dict(zip(names, rows_to_columns(rows, names)))
+
+    started = time.perf_counter()
+    await clickhouse_manager.insert_many(StatisticLog.__tablename__, rows)
+    row_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await clickhouse_manager.insert_many(StatisticLog.__tablename__, columns, columnar=True)
+    column_elapsed = time.perf_counter() - started
+
+    print(f"live row dicts : {row_elapsed * 1000:8.1f} ms")
+    print(f"live columnar  : {column_elapsed * 1000:8.1f} ms")
+
+
+async def main(n_rows: int, live: bool) -> None:
+    rows = make_rows(n_rows)
+    columns_with_types = [
+        (column.name, column.type.compile(dialect=clickhouse_engine.dialect))
+        for column in StatisticLog.__table__.columns
+    ]
+    await bench_encoding(rows, columns_with_types)
+    if live:
+        await bench_live(rows, [name for name, _ in columns_with_types])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.live))
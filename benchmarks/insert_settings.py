@@ -0,0 +1,142 @@
+"""Compare wire bytes and latency of statistic_log inserts per insert setting.
+
+Offline, every compression method and insert block size combination is
+encoded by clickhouse_driver's native block streams into memory, which
+gives the bytes sent on the wire and the client CPU time. Pass ``--live``
+to also time real inserts against the configured ClickHouse server for each
+compression method with async_insert off, on and on without waiting.
+
+Usage:
+    python -m benchmarks.insert_settings --rows 20000 [--live]
+"""
+import argparse
+import time
+
+from clickhouse_driver import defines
+from clickhouse_driver.block import ColumnOrientedBlock
+from clickhouse_driver.bufferedwriter import BufferedSocketWriter
+from clickhouse_driver.compression import get_compressor_cls
+from clickhouse_driver.connection import ServerInfo
+from clickhouse_driver.context import Context
+from clickhouse_driver.streams.compressed import CompressedBlockOutputStream
+from clickhouse_driver.streams.native import BlockOutputStream
+
+from app.statistic_log.adapter.output.persistence.row_encoder import statistic_log_encoder
+from app.statistic_log.domain.command import command_adapter
+from benchmarks.fixtures import make_events
+from core.config import config
+from core.db.clickhouse_models import StatisticLog
+from core.db.clickhouse_session import clickhouse_engine, insert_columns, make_engine
+
+COMPRESSIONS = ("none", "lz4", "lz4hc", "zstd")
+BLOCK_SIZES = (1000, 10000, 100000)
+ASYNC_INSERTS = {
+    "sync": {},
+    "async_insert wait": {"async_insert": 1, "wait_for_async_insert": 1},
+    "async_insert nowait": {"async_insert": 1, "wait_for_async_insert": 0},
+}
+
+
+class ByteCounter:
+    """Socket stand-in counting the bytes the driver writes"""
+
+    def __init__(self):
+        self.size = 0
+
+    def sendall(self, data: bytes) -> None:
+        self.size += len(data)
+
+    write = sendall
+
+    def flush(self) -> None:
+        pass
+
+
+def make_context() -> Context:
+    context = Context()
+    context.server_info = ServerInfo(
+        "ClickHouse", 23, 8, 0, defines.CLIENT_REVISION, "UTC", "", defines.CLIENT_REVISION
+    )
+    context.settings = {}
+    context.client_settings = {
+        "strings_as_bytes": False,
+        "strings_encoding": defines.STRINGS_ENCODING,
+        "use_numpy": False,
+        "input_format_null_as_default": False,
+    }
+    return context
+
+
+def encoded_size(columns: list[list], columns_with_types, compression: str, block_size: int) -> int:
+    """Bytes of the data blocks an INSERT sends for ``columns``"""
+    n_rows = len(columns[0])
+    size = 0
+    for start in range(0, n_rows, block_size):
+        block = ColumnOrientedBlock(
+            columns_with_types=columns_with_types,
+            data=[column[start:start + block_size] for column in columns],
+        )
+        sink = ByteCounter()
+        if compression == "none":
+            fout = BufferedSocketWriter(sink, defines.BUFFER_SIZE)
+            stream = BlockOutputStream(fout, make_context())
+        else:
+            stream = CompressedBlockOutputStream(
+                get_compressor_cls(compression), defines.DEFAULT_COMPRESS_BLOCK_SIZE, sink, make_context()
+            )
+        stream.write(block)
+        stream.fout.flush()
+        size += sink.size
+    return size
+
+
+def bench_encoding(columns: list[list], columns_with_types) -> None:
+    n_rows = len(columns[0])
+    print(f"{'compression':<12}{'block size':>12}{'bytes/row':>12}{'ratio':>8}{'us/row':>10}")
+    for block_size in BLOCK_SIZES:
+        baseline = None
+        for compression in COMPRESSIONS:
+            started = time.perf_counter()
+            size = encoded_size(columns, columns_with_types, compression, block_size)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or size
+            print(
+                f"{compression:<12}{block_size:>12}{size / n_rows:>12.0f}"
+                f"{baseline / size:>8.2f}{elapsed / n_rows * 1e6:>10.2f}"
+            )
+
+
+def bench_live(columns: dict[str, list]) -> None:
+    node = f"{config.CLICK_HOUSE_HOST}:{config.CLICK_HOUSE_PORT}"
+    for compression in COMPRESSIONS:
+        engine = make_engine(node, compression if compression != "none" else False)
+        for name, settings in ASYNC_INSERTS.items():
+            settings = {"insert_block_size": config.CLICK_HOUSE_INSERT_BLOCK_SIZE, **settings}
+            started = time.perf_counter()
+            insert_columns(StatisticLog.__tablename__, columns, engine, settings)
+            elapsed = time.perf_counter() - started
+            print(f"live {compression:<6} {name:<20}: {elapsed * 1000:8.1f} ms")
+        engine.dispose()
+
+
+def main(n_rows: int, live: bool) -> None:
+    rows = statistic_log_encoder.encode_many(
+        command_adapter.validate_python(event) for event in make_events(n_rows)
+    )
+    columns = statistic_log_encoder.to_columns(rows)
+    columns = {name: list(values) for name, values in columns.items()}
+    columns_with_types = [
+        (column.name, column.type.compile(dialect=clickhouse_engine.dialect))
+        for column in StatisticLog.__table__.columns
+    ]
+    bench_encoding(list(columns.values()), columns_with_types)
+    if live:
+        bench_live(columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+    main(args.rows, args.live)
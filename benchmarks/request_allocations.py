@@ -0,0 +1,127 @@
+"""Measure per-request time and allocations on the /log hot path.
+
+The baseline reproduces the previous handler: the body is validated into
+``StatisticLogRequest``, dumped and validated again into a pydantic
+command, and the service graph is built by ``Factory`` providers on every
+request. The current path validates the body once into the slotted
+command and resolves the singleton service.
+
+Allocations are traced with tracemalloc: the peak is the transient memory
+of one request, and retained memory is what each command keeps alive.
+
+Usage:
+    python -m benchmarks.request_allocations --events 5000
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from dependency_injector.containers import DeclarativeContainer
+from dependency_injector.providers import Factory, Singleton
+from pydantic import BaseModel
+
+from app.container import Container
+from app.statistic_log.adapter.input.api.v1.request import StatisticLogRequest
+from app.statistic_log.adapter.output.persistence.repository_adapter import StatisticRepositoryAdapter
+from app.statistic_log.application.service.statistic import StatisticService
+from app.statistic_log.domain.command import command_adapter
+from benchmarks.fixtures import make_events
+from core.helpers import serializer
+
+
+class LegacyCommand(BaseModel):
+    local_timestamp: Optional[str] = None
+    time_zone: Optional[str] = None
+    utc_timestamp: Optional[str] = None
+    activity_type: Optional[str] = None
+    detail: Optional[str] = None
+    user_id: Optional[str] = None
+    conversation_id: Optional[str] = None
+    msg_id: Optional[str] = None
+    extension_version: Optional[str] = None
+    user_agent: Optional[str] = None
+    agent_name: Optional[str] = None
+    agent_version: Optional[str] = None
+    current_url: Optional[str] = None
+    page_title: Optional[str] = None
+    page_description: Optional[str] = None
+    page_keywords: Optional[List[str]] = None
+    extra_data: Optional[Dict[str, Any]] = None
+
+
+class LegacyContainer(DeclarativeContainer):
+    statistic_log_repo = Singleton(object)
+    statistic_repo_adapter = Factory(StatisticRepositoryAdapter, statistic_repo=statistic_log_repo)
+    statistic_service = Factory(StatisticService, repository=statistic_repo_adapter)
+
+
+def legacy_handler(container: LegacyContainer) -> Callable[[bytes], Any]:
+    def handle(body: bytes) -> Any:
+        request = StatisticLogRequest.model_validate_json(body)
+        command = LegacyCommand(**request.model_dump())
+        container.statistic_service()
+        return command
+
+    return handle
+
+
+def current_handler(container: Container) -> Callable[[bytes], Any]:
+    def handle(body: bytes) -> Any:
+        command = command_adapter.validate_json(body)
+        container.statistic_service()
+        return command
+
+    return handle
+
+
+def bench(handle: Callable[[bytes], Any], bodies: list[bytes]) -> dict:
+    started = time.perf_counter()
+    for body in bodies:
+        handle(body)
+    elapsed = time.perf_counter() - started
+
+    peaks = []
+    tracemalloc.start()
+    for body in bodies[:1000]:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        handle(body)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+
+    kept = []
+    before = tracemalloc.take_snapshot()
+    for body in bodies[:1000]:
+        kept.append(handle(body))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    diff = after.compare_to(before, "filename")
+    return {
+        "us": elapsed / len(bodies) * 1e6,
+        "peak": sum(peaks) / len(peaks),
+        "blocks": sum(stat.count_diff for stat in diff) / len(kept),
+        "retained": sum(stat.size_diff for stat in diff) / len(kept),
+    }
+
+
+def main(n_events: int) -> None:
+    bodies = [serializer.dumps(event) for event in make_events(n_events)]
+    results = {
+        "validate twice + Factory": bench(legacy_handler(LegacyContainer()), bodies),
+        "validate once + Singleton": bench(current_handler(Container()), bodies),
+    }
+    print(f"{n_events} requests")
+    for name, result in results.items():
+        print(
+            f"{name:<26}: {result['us']:6.2f} us/request, "
+            f"peak {result['peak']:7.0f} B/request, "
+            f"retained {result['blocks']:5.1f} blocks / {result['retained']:6.0f} B per command"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.events)
@@ -0,0 +1,114 @@
+"""Compare dashboard queries on raw statistic_log events and on the rollups.
+
+statistic_log and its rollups are created from the models with the
+rollups' materialized views, so the generated events fill the rollups as
+they are inserted. Each query is answered from raw events and from the
+rollup ``pick_rollup`` chooses, checked to give the same counts, and run
+``--repeat`` times. The rows read come from ``EXPLAIN ESTIMATE``, with the
+best time.
+
+The views read ``statistic_log`` by name, so on a server the benchmark
+runs in its own ``statistic_bench`` database. Runs in process with chdb
+when ``--chdb`` is given and chdb is installed.
+
+Usage:
+    python -m benchmarks.rollups --rows 2000000 [--chdb]
+"""
+import argparse
+from datetime import datetime
+
+from app.statistic_log.adapter.output.persistence.rollup import pick_rollup, stats_select
+from app.statistic_log.domain.command import StatisticStatsQuery
+from benchmarks.clickhouse import Runner, chdb_runner, rows_read, server_runner
+from benchmarks.fixtures import insert_events
+from core.db.clickhouse_models import STATISTIC_LOG_ROLLUPS, StatisticLog
+from core.db.clickhouse_session import clickhouse_engine
+from core.db.init_clickhouse import rollup_view_ddl, table_ddl
+
+QUERIES = {
+    "daily events by activity, a month": StatisticStatsQuery(
+        start=datetime(2024, 3, 1), end=datetime(2024, 4, 1), interval="day", group_by=("activity_type",)
+    ),
+    "hourly events by agent, a week": StatisticStatsQuery(
+        start=datetime(2024, 3, 4), end=datetime(2024, 3, 11), interval="hour", group_by=("agent_name",)
+    ),
+    "totals by version, six months": StatisticStatsQuery(
+        start=datetime(2024, 1, 1), end=datetime(2024, 7, 1), group_by=("extension_version",)
+    ),
+    "send_message per minute, 2 hours": StatisticStatsQuery(
+        start=datetime(2024, 3, 5, 9, 30),
+        end=datetime(2024, 3, 5, 11, 30),
+        interval="minute",
+        group_by=(),
+        activity_type="send_message",
+    ),
+}
+
+BUCKET_FUNCTIONS = {"minute": "toStartOfMinute", "hour": "toStartOfHour", "day": "toStartOfDay"}
+
+
+def raw_sql(query: StatisticStatsQuery) -> str:
+    keys = list(query.group_by)
+    if query.interval is not None:
+        keys.insert(0, f"{BUCKET_FUNCTIONS[query.interval]}(utc_timestamp) AS time")
+    conditions = [f"utc_timestamp >= '{query.start}'", f"utc_timestamp < '{query.end}'"]
+    if query.activity_type is not None:
+        conditions.append(f"activity_type = '{query.activity_type}'")
+    names = ", ".join(key.split(" AS ")[-1] for key in keys)
+    return (
+        f"SELECT {''.join(key + ', ' for key in keys)}count() AS events, uniq(user_id) AS users "
+        f"FROM statistic_log WHERE {' AND '.join(conditions)}"
+        + (f" GROUP BY {names} ORDER BY {names}" if keys else "")
+    )
+
+
+def rollup_sql(query: StatisticStatsQuery) -> tuple[str, str]:
+    table, start, end = pick_rollup(query.start, query.end, query.interval)
+    statement = stats_select(table, query, start, end)
+    return table.name, str(
+        statement.compile(dialect=clickhouse_engine.dialect, compile_kwargs={"literal_binds": True})
+    )
+
+
+def drop(run: Runner) -> None:
+    for table in STATISTIC_LOG_ROLLUPS:
+        run(f"DROP VIEW IF EXISTS {table.name}_mv")
+        run(f"DROP TABLE IF EXISTS {table.name}")
+    run(f"DROP TABLE IF EXISTS {StatisticLog.__tablename__}")
+
+
+def load(run: Runner, n_rows: int) -> None:
+    drop(run)
+    run(table_ddl(StatisticLog.__table__))
+    for table in STATISTIC_LOG_ROLLUPS:
+        run(table_ddl(table))
+        run(rollup_view_ddl(table))
+    # Several inserts, as ingestion does, each adding rows to the rollups
+    for _ in range(4):
+        insert_events(run, StatisticLog.__tablename__, n_rows // 4)
+    run(f"OPTIMIZE TABLE {StatisticLog.__tablename__} FINAL")
+
+
+def main(n_rows: int, repeat: int, use_chdb: bool) -> None:
+    run = chdb_runner() if use_chdb else server_runner("statistic_bench")
+    load(run, n_rows)
+    print(f"{n_rows} rows over 6 months")
+    print(f"{'query':<36}{'source':>24}{'rows read':>12}{'ms':>10}")
+    for name, query in QUERIES.items():
+        source, sql = rollup_sql(query)
+        raw = raw_sql(query)
+        if [row[-2] for row in run(sql)[0]] != [row[-2] for row in run(raw)[0]]:
+            raise AssertionError(f"{name}: rollup counts differ from raw events")
+        for label, statement in (("statistic_log", raw), (source, sql)):
+            best = min(run(statement)[1] for _ in range(repeat))
+            print(f"{name:<36}{label:>24}{rows_read(run, statement):>12}{best * 1000:>10.1f}")
+    drop(run)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chdb", action="store_true")
+    args = parser.parse_args()
+    main(args.rows, args.repeat, args.chdb)
@@ -0,0 +1,72 @@
+"""Compare conversation and message lookups on statistic_log with and without skip indexes.
+
+Both tables are compiled from the ``StatisticLog`` model, one with its
+declared skip indexes stripped. They get the same generated events, then
+each lookup is run ``--repeat`` times. The rows read come from
+``EXPLAIN ESTIMATE``, with the best time.
+
+Runs against the configured ClickHouse server, or in process with chdb
+when ``--chdb`` is given and chdb is installed.
+
+Usage:
+    python -m benchmarks.skip_indexes --rows 2000000 [--chdb]
+"""
+import argparse
+
+from benchmarks.clickhouse import Runner, chdb_runner, rows_read, server_runner
+from benchmarks.fixtures import insert_events
+from core.db.clickhouse_models import StatisticLog, skip_indexes
+from core.db.init_clickhouse import table_ddl
+
+UNINDEXED = "statistic_log_bench_unindexed"
+INDEXED = "statistic_log_bench_indexed"
+
+QUERIES = {
+    "one conversation": "SELECT * FROM {table} WHERE conversation_id = 'conversation-4242'",
+    "one conversation, one activity": (
+        "SELECT * FROM {table} WHERE conversation_id = 'conversation-4242' AND activity_type = 'send_message'"
+    ),
+    "one message": "SELECT * FROM {table} WHERE msg_id = 'msg-123456'",
+    "one activity, all users": "SELECT count() FROM {table} WHERE activity_type = 'copy_answer'",
+}
+
+
+def unindexed_ddl(name: str) -> str:
+    ddl = table_ddl(StatisticLog.__table__, name)
+    for index in skip_indexes(StatisticLog.__table__):
+        ddl = ddl.replace(f", \n\t{index.clause()}", "")
+    return ddl
+
+
+def load(run: Runner, n_rows: int) -> None:
+    for name in (UNINDEXED, INDEXED):
+        run(f"DROP TABLE IF EXISTS {name}")
+    run(unindexed_ddl(UNINDEXED))
+    run(table_ddl(StatisticLog.__table__, INDEXED))
+    insert_events(run, UNINDEXED, n_rows)
+    run(f"INSERT INTO {INDEXED} SELECT * FROM {UNINDEXED}")
+    run(f"OPTIMIZE TABLE {UNINDEXED} FINAL")
+    run(f"OPTIMIZE TABLE {INDEXED} FINAL")
+
+
+def main(n_rows: int, repeat: int, use_chdb: bool) -> None:
+    run = chdb_runner() if use_chdb else server_runner()
+    load(run, n_rows)
+    print(f"{n_rows} rows")
+    print(f"{'query':<34}{'indexes':>10}{'rows read':>12}{'ms':>10}")
+    for name, query in QUERIES.items():
+        for label, table in (("without", UNINDEXED), ("with", INDEXED)):
+            sql = query.format(table=table)
+            best = min(run(sql)[1] for _ in range(repeat))
+            print(f"{name:<34}{label:>10}{rows_read(run, sql):>12}{best * 1000:>10.1f}")
+    for name in (UNINDEXED, INDEXED):
+        run(f"DROP TABLE IF EXISTS {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chdb", action="store_true")
+    args = parser.parse_args()
+    main(args.rows, args.repeat, args.chdb)
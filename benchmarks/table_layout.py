@@ -0,0 +1,84 @@
+"""Compare typical statistic_log queries on the previous and the current table layout.
+
+The previous layout is the hand-written ``MergeTree ORDER BY id`` table; the
+current one is compiled from the ``StatisticLog`` model (monthly partitions
+of the event time, sorted by user, activity and time). Both tables get the
+same generated events, then each query is run ``--repeat`` times. The rows
+read come from ``EXPLAIN ESTIMATE``, with the best time.
+
+Runs against the configured ClickHouse server, or in process with chdb
+when ``--chdb`` is given and chdb is installed.
+
+Usage:
+    python -m benchmarks.table_layout --rows 2000000 [--chdb]
+"""
+import argparse
+
+from benchmarks.clickhouse import Runner, chdb_runner, rows_read, server_runner
+from core.db.clickhouse_models import StatisticLog
+from core.db.init_clickhouse import table_ddl
+
+BEFORE = "statistic_log_bench_before"
+AFTER = "statistic_log_bench_after"
+
+QUERIES = {
+    "one user": "SELECT count() FROM {table} WHERE user_id = 'user-42'",
+    "one user, one activity, one month": (
+        "SELECT count() FROM {table} WHERE user_id = 'user-42' AND activity_type = 'send_message' "
+        "AND utc_timestamp >= '2024-03-01 00:00:00' AND utc_timestamp < '2024-04-01 00:00:00'"
+    ),
+    "one user, daily buckets of a week": (
+        "SELECT toDate(utc_timestamp) AS day, count() FROM {table} WHERE user_id = 'user-42' "
+        "AND utc_timestamp >= '2024-03-01 00:00:00' AND utc_timestamp < '2024-03-08 00:00:00' GROUP BY day"
+    ),
+    "one user by activity": (
+        "SELECT activity_type, count() FROM {table} WHERE user_id = 'user-42' GROUP BY activity_type"
+    ),
+    "one month, all users": (
+        "SELECT uniq(user_id) FROM {table} "
+        "WHERE utc_timestamp >= '2024-03-01 00:00:00' AND utc_timestamp < '2024-04-01 00:00:00'"
+    ),
+}
+
+
+def load(run: Runner, n_rows: int) -> None:
+    table = StatisticLog.__table__
+    columns = ", ".join(f"{column.name} {column.type.compile()}" for column in table.columns)
+    for name in (BEFORE, AFTER):
+        run(f"DROP TABLE IF EXISTS {name}")
+    run(f"CREATE TABLE {BEFORE} ({columns}) ENGINE = MergeTree ORDER BY id")
+    run(table_ddl(table, AFTER))
+    run(
+        f"INSERT INTO {BEFORE} (id, user_id, activity_type, utc_timestamp, conversation_id, _source) "
+        "SELECT generateUUIDv4(), concat('user-', toString(rand() % 1000)), "
+        "['open_chat', 'send_message', 'receive_message', 'copy_answer', 'close_chat'][rand(1) % 5 + 1], "
+        f"formatDateTime(toDateTime('2024-01-01 00:00:00') + intDiv(number * 15552000, {n_rows}), "
+        "'%Y-%m-%d %H:%i:%S'), concat('conversation-', toString(rand(2) % 20000)), repeat('x', 200) "
+        f"FROM numbers({n_rows})"
+    )
+    run(f"INSERT INTO {AFTER} SELECT * FROM {BEFORE}")
+    run(f"OPTIMIZE TABLE {BEFORE} FINAL")
+    run(f"OPTIMIZE TABLE {AFTER} FINAL")
+
+
+def main(n_rows: int, repeat: int, use_chdb: bool) -> None:
+    run = chdb_runner() if use_chdb else server_runner()
+    load(run, n_rows)
+    print(f"{n_rows} rows over 6 months")
+    print(f"{'query':<36}{'layout':>8}{'rows read':>12}{'ms':>10}")
+    for name, query in QUERIES.items():
+        for layout, table in (("before", BEFORE), ("after", AFTER)):
+            sql = query.format(table=table)
+            best = min(run(sql)[1] for _ in range(repeat))
+            print(f"{name:<36}{layout:>8}{rows_read(run, sql):>12}{best * 1000:>10.1f}")
+    for name in (BEFORE, AFTER):
+        run(f"DROP TABLE IF EXISTS {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chdb", action="store_true")
+    args = parser.parse_args()
+    main(args.rows, args.repeat, args.chdb)
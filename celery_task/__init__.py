@@ -4,9 +4,22 @@ from core.config import config
 
 celery_app = Celery(
     "worker",
-    backend=config.CELERY_BACKEND_URL,
+    backend=config.CELERY_BACKEND_URL or None,
     broker=config.CELERY_BROKER_URL,
+    include=["celery_task.tasks.statistic"],
 )
 
-celery_app.conf.task_routes = {"worker.celery_worker.test_celery": "test-queue"}
-celery_app.conf.update(task_track_started=True)
+celery_app.conf.task_routes = {"celery_task.tasks.statistic.*": {"queue": config.CELERY_INGEST_QUEUE}}
+celery_app.conf.update(
+    task_track_started=True,
+    # Ingest tasks are fire and forget: the API never waits for a result
+    task_ignore_result=True,
+    task_serializer="msgpack",
+    accept_content=["msgpack", "json"],
+    # A chunk is acknowledged once it is in ClickHouse, so a killed worker's
+    # chunk is delivered again instead of lost
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=config.CELERY_PREFETCH_MULTIPLIER,
+    task_always_eager=config.CELERY_TASK_ALWAYS_EAGER,
+)
@@ -0,0 +1,49 @@
+import logging
+from collections import defaultdict
+
+from clickhouse_driver.errors import Error as ClickHouseError
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.statistic_log.adapter.output.persistence.event_time import parse_timestamp
+from app.statistic_log.adapter.output.persistence.row_encoder import statistic_log_encoder
+from app.statistic_log.domain.command import CreateStatisticLogCommand
+from celery_task import celery_app
+from core.config import config
+from core.db.clickhouse_session import clickhouse_shards, insert_columns
+
+logger = logging.getLogger(__name__)
+
+
+def _encode(event: dict) -> tuple:
+    # The API fixed the row id and arrival time, so a redelivered chunk
+    # writes the same rows
+    return statistic_log_encoder.encode(
+        CreateStatisticLogCommand.from_dict(event),
+        event.get("id"),
+        parse_timestamp(event.get("received_at")),
+    )
+
+
+@celery_app.task(bind=True, max_retries=config.CELERY_INGEST_MAX_RETRIES)
+def ingest_statistic_logs(self, events: list[dict]) -> int:
+    """Insert a chunk of events enqueued by the API, one columnar insert per shard
+
+    When some shards fail, only their events are retried, with backoff, so
+    rows already written to the other shards are not inserted twice.
+    """
+    by_shard = defaultdict(list)
+    for event in events:
+        by_shard[clickhouse_shards.shard_for(event.get("user_id") or "")].append(event)
+
+    failed = []
+    for engine, shard_events in by_shard.items():
+        rows = [_encode(event) for event in shard_events]
+        try:
+            insert_columns(statistic_log_encoder.table, statistic_log_encoder.to_columns(rows), engine)
+        except (SQLAlchemyError, ClickHouseError, OSError):
+            logger.warning("ClickHouse insert failed for %d events", len(shard_events), exc_info=True)
+            failed.extend(shard_events)
+
+    if failed:
+        raise self.retry(args=(failed,), countdown=min(2 ** self.request.retries, 60))
+    return len(events)
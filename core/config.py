@@ -15,18 +15,99 @@ class Config(BaseSettings):
     JWT_SECRET_KEY: str = "fastapi"
     JWT_ALGORITHM: str = "HS256"
     SENTRY_SDN: str = ""
+    # Server processes in production, 0 means one per available CPU
+    COUNT_WORKERS_UVICORN: int = int(os.getenv("COUNT_WORKERS_UVICORN", 0))
+    # Seconds a worker gets to finish in-flight requests on restart or shutdown
+    GRACEFUL_TIMEOUT: int = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+    # Seconds startup waits for ClickHouse while warming up
+    STARTUP_WARMUP_TIMEOUT: float = float(os.getenv("STARTUP_WARMUP_TIMEOUT", 10))
+    # Seconds shutdown spends flushing buffered events, below GRACEFUL_TIMEOUT
+    SHUTDOWN_DRAIN_TIMEOUT: float = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", 20))
 
     CLICK_HOUSE_HOST: str = os.getenv("CLICK_HOUSE_HOST", "localhost")
     CLICK_HOUSE_PORT: int = int(os.getenv("CLICK_HOUSE_PORT", 9000))
     CLICK_HOUSE_DB: str = os.getenv("CLICK_HOUSE_DB", "statistic")
     CLICK_HOUSE_USER: str = os.getenv("CLICK_HOUSE_USER", "default_user")
     CLICK_HOUSE_PASSWORD: str = os.getenv("CLICK_HOUSE_PASSWORD", "")
+    # Comma separated host:port of the nodes statistic_log is sharded over by
+    # user_id; empty means the single CLICK_HOUSE_HOST node
+    CLICK_HOUSE_SHARDS: str = os.getenv("CLICK_HOUSE_SHARDS", "")
+
+    # asynch connection pool
+    CLICK_HOUSE_POOL_MIN_SIZE: int = int(os.getenv("CLICK_HOUSE_POOL_MIN_SIZE", 1))
+    CLICK_HOUSE_POOL_MAX_SIZE: int = int(os.getenv("CLICK_HOUSE_POOL_MAX_SIZE", 10))
+    CLICK_HOUSE_POOL_MAX_IDLE_TIME: float = float(os.getenv("CLICK_HOUSE_POOL_MAX_IDLE_TIME", 300))
+    CLICK_HOUSE_POOL_PING_INTERVAL: float = float(os.getenv("CLICK_HOUSE_POOL_PING_INTERVAL", 30))
+    CLICK_HOUSE_POOL_ACQUIRE_TIMEOUT: float = float(os.getenv("CLICK_HOUSE_POOL_ACQUIRE_TIMEOUT", 5))
+
+    # Native protocol wire compression: none, lz4, lz4hc or zstd
+    CLICK_HOUSE_COMPRESSION: str = os.getenv("CLICK_HOUSE_COMPRESSION", "lz4")
+    # Server-side buffering of inserts
+    CLICK_HOUSE_ASYNC_INSERT: bool = os.getenv("CLICK_HOUSE_ASYNC_INSERT", "false").lower() == "true"
+    CLICK_HOUSE_WAIT_FOR_ASYNC_INSERT: bool = (
+        os.getenv("CLICK_HOUSE_WAIT_FOR_ASYNC_INSERT", "true").lower() == "true"
+    )
+    # Rows per block the driver sends an INSERT in
+    CLICK_HOUSE_INSERT_BLOCK_SIZE: int = int(os.getenv("CLICK_HOUSE_INSERT_BLOCK_SIZE", 1048576))
+
+    # Threads running blocking clickhouse_driver calls off the event loop
+    CLICK_HOUSE_EXECUTOR_WORKERS: int = int(os.getenv("CLICK_HOUSE_EXECUTOR_WORKERS", 4))
+
+    # Micro-batching of statistic_log inserts
+    CLICK_HOUSE_BATCH_SIZE: int = int(os.getenv("CLICK_HOUSE_BATCH_SIZE", 1000))
+    CLICK_HOUSE_BATCH_MAX_BYTES: int = int(os.getenv("CLICK_HOUSE_BATCH_MAX_BYTES", 8 * 1024 * 1024))
+    CLICK_HOUSE_FLUSH_INTERVAL: float = float(os.getenv("CLICK_HOUSE_FLUSH_INTERVAL", 1.0))
+
+    # On-disk spool for batches ClickHouse rejected or timed out on
+    SPOOL_ENABLED: bool = os.getenv("SPOOL_ENABLED", "true").lower() == "true"
+    SPOOL_DIR: str = os.getenv("SPOOL_DIR", "spool")
+    SPOOL_SEGMENT_BYTES: int = int(os.getenv("SPOOL_SEGMENT_BYTES", 64 * 1024 * 1024))
+    SPOOL_DRAIN_INTERVAL: float = float(os.getenv("SPOOL_DRAIN_INTERVAL", 5))
+    SPOOL_DRAIN_BATCH_ROWS: int = int(os.getenv("SPOOL_DRAIN_BATCH_ROWS", 50000))
+    # Failed replays of a batch before its rows go to a dead-letter file
+    SPOOL_MAX_ATTEMPTS: int = int(os.getenv("SPOOL_MAX_ATTEMPTS", 10))
+
+    STATISTIC_BATCH_MAX_ITEMS: int = int(os.getenv("STATISTIC_BATCH_MAX_ITEMS", 10000))
+    # Most events a conversation or message lookup returns
+    STATISTIC_LOOKUP_MAX_ROWS: int = int(os.getenv("STATISTIC_LOOKUP_MAX_ROWS", 1000))
+    # Most time buckets a stats request may ask for
+    STATISTIC_STATS_MAX_BUCKETS: int = int(os.getenv("STATISTIC_STATS_MAX_BUCKETS", 10000))
+
+    # Recently seen event keys remembered per worker to drop retries, 0 disables
+    STATISTIC_DEDUP_CACHE_SIZE: int = int(os.getenv("STATISTIC_DEDUP_CACHE_SIZE", 100000))
+    # statistic_log table engine: ReplacingMergeTree collapses duplicates
+    # written by different workers, MergeTree keeps every row
+    STATISTIC_LOG_ENGINE: str = os.getenv("STATISTIC_LOG_ENGINE", "ReplacingMergeTree")
+
+    # Where accepted events go: "direct" writes them to ClickHouse from the API
+    # process, "celery" enqueues them for the celery_task workers
+    STATISTIC_INGESTION_MODE: str = os.getenv("STATISTIC_INGESTION_MODE", "direct")
+
+    # Celery ingestion workers
+    CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+    CELERY_BACKEND_URL: str = os.getenv("CELERY_BACKEND_URL", "")
+    CELERY_INGEST_QUEUE: str = os.getenv("CELERY_INGEST_QUEUE", "statistic-ingest")
+    # Events per ingest task, and so per worker insert
+    CELERY_INGEST_CHUNK_SIZE: int = int(os.getenv("CELERY_INGEST_CHUNK_SIZE", 5000))
+    CELERY_INGEST_MAX_RETRIES: int = int(os.getenv("CELERY_INGEST_MAX_RETRIES", 10))
+    CELERY_PREFETCH_MULTIPLIER: int = int(os.getenv("CELERY_PREFETCH_MULTIPLIER", 4))
+    CELERY_TASK_ALWAYS_EAGER: bool = os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() == "true"
+    # Spool of events the broker did not take, and how often the queue length is read
+    CELERY_SPOOL_DIR: str = os.getenv("CELERY_SPOOL_DIR", "spool-celery")
+    CELERY_BACKLOG_INTERVAL: float = float(os.getenv("CELERY_BACKLOG_INTERVAL", 1.0))
+
+    # Admission control on rows queued or in flight to ClickHouse
+    INGESTION_HIGH_WATERMARK: int = int(os.getenv("INGESTION_HIGH_WATERMARK", 50000))
+    INGESTION_LOW_WATERMARK: int = int(os.getenv("INGESTION_LOW_WATERMARK", 25000))
+    INGESTION_RETRY_AFTER: int = int(os.getenv("INGESTION_RETRY_AFTER", 1))
 
 
 class TestConfig(Config):
     CLICK_HOUSE_HOST: str = "localhost"
     CLICK_HOUSE_PORT: int = 9000
     CLICK_HOUSE_DB: str = "statistic"
+    CELERY_BROKER_URL: str = "memory://"
+    CELERY_TASK_ALWAYS_EAGER: bool = True
 
 
 class LocalConfig(Config):
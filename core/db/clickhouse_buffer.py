@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class InsertBuffer:
+    """Collect rows in memory and write them as one multi-row insert.
+
+    A batch is flushed as soon as it holds ``max_rows`` rows, its estimated
+    payload reaches ``max_bytes``, or ``linger`` seconds have passed since the
+    first row of the batch was added, whichever happens first.
+    """
+
+    def __init__(
+        self,
+        *,
+        flush: Callable[[list], Awaitable[None]],
+        max_rows: int,
+        max_bytes: int,
+        linger: float,
+    ):
+        self._flush = flush
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.linger = linger
+
+        self._rows: list = []
+        self._bytes = 0
+        self._timer: asyncio.TimerHandle | None = None
+        # Rows of the flushes running in the background, by task
+        self._tasks: dict[asyncio.Task, list] = {}
+
+        self.flushed_batches = 0
+        self.flushed_rows = 0
+        self.failed_rows = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    async def put(self, row: Any, *, size: int = 0) -> None:
+        """Add a row to the current batch
+
+        Args:
+            row (Any): row accepted by the flush callable
+            size (int): estimated payload size of the row in bytes
+        """
+        self._rows.append(row)
+        self._bytes += size
+
+        if len(self._rows) >= self.max_rows or self._bytes >= self.max_bytes:
+            self._flush_in_background()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.linger, self._flush_in_background
+            )
+
+    async def flush(self) -> None:
+        """Write out the current batch and wait for in-flight flushes"""
+        rows = self._take()
+        if rows:
+            await self._write(rows)
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def drain(self, timeout: float) -> list:
+        """Flush everything, waiting at most ``timeout`` seconds
+
+        Returns the rows of the flushes still running at the deadline, which
+        may or may not end up written.
+        """
+        self._flush_in_background()
+        if not self._tasks:
+            return []
+        _, pending = await asyncio.wait(list(self._tasks), timeout=timeout)
+        return [row for task in pending for row in self._tasks.get(task, ())]
+
+    def stats(self) -> dict:
+        return {
+            "buffered_rows": len(self._rows),
+            "buffered_bytes": self._bytes,
+            "inflight_flushes": len(self._tasks),
+            "flushed_batches": self.flushed_batches,
+            "flushed_rows": self.flushed_rows,
+            "failed_rows": self.failed_rows,
+        }
+
+    def _take(self) -> list:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        rows, self._rows, self._bytes = self._rows, [], 0
+        return rows
+
+    def _flush_in_background(self) -> None:
+        rows = self._take()
+        if not rows:
+            return
+
+        task = asyncio.get_running_loop().create_task(self._write(rows))
+        self._tasks[task] = rows
+        task.add_done_callback(lambda done: self._tasks.pop(done, None))
+
+    async def _write(self, rows: list) -> None:
+        try:
+            await self._flush(rows)
+        except Exception:
+            self.failed_rows += len(rows)
+            logger.exception("Failed to flush %d buffered rows", len(rows))
+        else:
+            self.flushed_batches += 1
+            self.flushed_rows += len(rows)
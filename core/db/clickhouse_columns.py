@@ -0,0 +1,30 @@
+from typing import Sequence
+
+
+def as_column(values: Sequence) -> Sequence:
+    """Return column values in a form the native protocol writers consume
+
+    NumPy arrays are unpacked with ``tolist()``, which is far cheaper than
+    letting the driver pack numpy scalars one by one.
+
+    Args:
+        values (Sequence): list, tuple or numpy array of column values
+
+    Returns:
+        Sequence: column values
+    """
+    tolist = getattr(values, "tolist", None)
+    return tolist() if tolist is not None else values
+
+
+def rows_to_columns(rows: Sequence[dict], names: Sequence[str]) -> list[list]:
+    """Transpose row dicts into column lists ordered like ``names``
+
+    Args:
+        rows (Sequence[dict]): records keyed by column name
+        names (Sequence[str]): column names
+
+    Returns:
+        list[list]: one list of values per column
+    """
+    return [[row[name] for row in rows] for name in names]
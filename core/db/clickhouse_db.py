@@ -1,10 +1,54 @@
+import logging
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator
+
 from asynch import connect, connection
-from asynch.cursors import DictCursor
+from asynch.cursors import Cursor, DictCursor
 
 from core.config import config
+from core.db.clickhouse_columns import as_column
+from core.db.clickhouse_models import Base
+from core.db.clickhouse_pool import ClickHousePool
+from core.db.clickhouse_settings import compression, insert_settings
+from core.db.init_clickhouse import table_ddl
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=128)
+def insert_query(table: str, fields: tuple[str, ...]) -> str:
+    """ INSERT statement for the columns of a table, built once per column list
+
+    Args:
+        table (str): table name
+        fields (tuple[str, ...]): column names
+
+    Returns:
+        str: query the driver appends a native data block to
+    """
+    return f"INSERT INTO {table} ({', '.join(fields)}) VALUES"
+
+
+class ColumnarCursor(Cursor):
+    """Cursor sending INSERT data as columns instead of rows"""
+
+    def _prepare(self, context=None):
+        execute, execute_kwargs = super()._prepare(context)
+        execute_kwargs["columnar"] = True
+        return execute, execute_kwargs
 
 
 class ClickHouse:
+    pool = ClickHousePool(
+        connect=lambda: ClickHouse.conn(),
+        min_size=config.CLICK_HOUSE_POOL_MIN_SIZE,
+        max_size=config.CLICK_HOUSE_POOL_MAX_SIZE,
+        max_idle_time=config.CLICK_HOUSE_POOL_MAX_IDLE_TIME,
+        ping_interval=config.CLICK_HOUSE_POOL_PING_INTERVAL,
+        acquire_timeout=config.CLICK_HOUSE_POOL_ACQUIRE_TIMEOUT,
+    )
+
     @classmethod
     async def create_db(cls, db_name: str) -> bool:
         """Create clickhouse db on first run
@@ -28,50 +72,17 @@ class ClickHouse:
 
     @classmethod
     async def create_table(cls, table: str) -> bool:
-        """Create clickhouse table with table
+        """Create clickhouse table from its model in ``clickhouse_models``
 
         Args:
             table (str): name of table
         Returns:
             bool: result
         """
-        conn = await cls.conn()
-        query = """
-            CREATE TABLE IF NOT EXISTS statistic_log (
-                id UUID,
-                local_timestamp DateTime,
-                time_zone String,
-                utc_timestamp DateTime,
-                user_id String,
-                conversation_id String,
-                msg_id String,
-                activity_type String,
-                detail String,
-                _source Text,
-                current_url String,
-                page_title String,
-                page_description String,
-                page_keywords Array(String),
-                user_agent String,
-                extension_version String,
-                agent_name String,
-                agent_version String,
-                string_names Array(String),
-                string_values Array(String),
-                integer_names Array(String),
-                integer_values Array(Integer),
-                number_names Array(String),
-                number_values Array(Float32),
-                bool_names Array(String),
-                bool_values Array(Bool),
-                date_names Array(String),
-                date_values Array(DateTime)
-            ) ENGINE = MergeTree()
-            ORDER BY id;
-            """
-        async with conn.cursor(cursor=DictCursor) as cursor:
-            result = await cursor.execute(query)
-        await conn.close()
+        query = table_ddl(Base.metadata.tables[table])
+        async with cls.connection() as conn:
+            async with conn.cursor(cursor=DictCursor) as cursor:
+                result = await cursor.execute(query)
 
         if result:
             return True
@@ -86,17 +97,15 @@ class ClickHouse:
         Returns:
             bool: result
         """
-        conn = await cls.conn()
-        query = """
-                DROP TABLE  statistic_log
-                """
-        async with conn.cursor(cursor=DictCursor) as cursor:
-            result = await cursor.execute(query)
-        await conn.close()
+        query = f"DROP TABLE IF EXISTS {table}"
+        async with cls.connection() as conn:
+            async with conn.cursor(cursor=DictCursor) as cursor:
+                result = await cursor.execute(query)
 
         if result:
             return True
         return False
+
     @classmethod
     async def conn(cls, ) -> connection.Connection:
         """ click house connection
@@ -108,8 +117,30 @@ class ClickHouse:
             host=config.CLICK_HOUSE_HOST,
             port=config.CLICK_HOUSE_PORT,
             database=config.CLICK_HOUSE_DB,
+            compression=compression(),
+            settings=insert_settings(),
         )
 
+    @classmethod
+    @asynccontextmanager
+    async def connection(cls) -> AsyncIterator[connection.Connection]:
+        """ borrow a pooled click house connection
+
+        Returns:
+            AsyncIterator[connection.Connection]: Connection
+        """
+        async with cls.pool.acquire() as conn:
+            yield conn
+
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """ connection pool statistics
+
+        Returns:
+            dict: pool size, idle and in use connections, counters
+        """
+        return cls.pool.stats()
+
     @classmethod
     async def execute_sql(cls, query) -> bool:
         """execute sql
@@ -119,10 +150,9 @@ class ClickHouse:
         Returns:
             bool: result
         """
-        conn = await cls.conn()
-        async with conn.cursor(cursor=DictCursor) as cursor:
-            result = await cursor.execute(query)
-        await conn.close()
+        async with cls.connection() as conn:
+            async with conn.cursor(cursor=DictCursor) as cursor:
+                result = await cursor.execute(query)
 
         if result:
             return True
@@ -138,11 +168,10 @@ class ClickHouse:
         Returns:
             list: record dict
         """
-        conn = await cls.conn()
-        async with conn.cursor(cursor=DictCursor) as cursor:
-            await cursor.execute(query)
-            ret = cursor.fetchall()
-        await conn.close()
+        async with cls.connection() as conn:
+            async with conn.cursor(cursor=DictCursor) as cursor:
+                await cursor.execute(query)
+                ret = await cursor.fetchall()
         return ret
 
     @classmethod
@@ -155,32 +184,39 @@ class ClickHouse:
         Returns:
             dict: record
         """
-        conn = await cls.conn()
-        async with conn.cursor(cursor=DictCursor) as cursor:
-            await cursor.execute(query)
-            ret = cursor.fetchone()
-        await conn.close()
+        async with cls.connection() as conn:
+            async with conn.cursor(cursor=DictCursor) as cursor:
+                await cursor.execute(query)
+                ret = await cursor.fetchone()
         return ret
 
     @classmethod
-    async def insert_many(cls, table: str, values: list) -> bool:
+    async def insert_many(cls, table: str, values: list | dict, columnar: bool = False) -> bool:
         """ insert_many records
 
         Args:
             table (str): table name
 
-            values (list): dicts
+            values (list | dict): dicts, or a mapping of column name to
+                column values (list, tuple or numpy array) when columnar
+
+            columnar (bool): send values column by column, skipping the
+                row to column transposition in the driver
 
         Returns:
             bool: insert result
         """
-        insert_fields = ','.join([i for i in values[0].keys()])
-        conn = await cls.conn()
-        async with conn.cursor(cursor=DictCursor) as cursor:
-            result = await cursor.execute(
-                f"""INSERT INTO {table} ({insert_fields}) VALUES """, values
-            )
-        await conn.close()
+        if columnar:
+            query = insert_query(table, tuple(values))
+            data = [as_column(column) for column in values.values()]
+            cursor_cls = ColumnarCursor
+        else:
+            query = insert_query(table, tuple(values[0]))
+            data = values
+            cursor_cls = DictCursor
+        async with cls.connection() as conn:
+            async with conn.cursor(cursor=cursor_cls) as cursor:
+                result = await cursor.execute(query, data)
         if result:
             return True
         return False
@@ -197,32 +233,22 @@ class ClickHouse:
         Returns:
             bool: True if the insertion was successful, False otherwise.
         """
-        # Prepare field names and placeholders
-        insert_fields = ', '.join(value.keys())
-
-        # Prepare the values (retain their types)
-        insert_values = list(value.values())
+        # The statement only names the columns; values travel as a typed
+        # native-protocol data block instead of being rendered into the SQL
+        query = insert_query(table, tuple(value))
 
         try:
-            # Get a database connection
-            conn = await cls.conn()
-
-            # Execute the SQL query with parameterized values
-            query = f"INSERT INTO {table} ({insert_fields}) VALUES {tuple(insert_values)}"
-            print("query", query)
-            async with conn.cursor(cursor=DictCursor) as cursor:
-                result = await cursor.execute(query)
-
-            # Close the connection
-            await conn.close()
+            # Borrow a pooled database connection
+            async with cls.connection() as conn:
+                async with conn.cursor() as cursor:
+                    result = await cursor.execute(query, [tuple(value.values())])
 
             # Check if the insertion was successful
             if result:
                 return True
             return False
-        except Exception as e:
-            # Log the error for debugging purposes
-            print(f"Error inserting record into {table}: {e}")
+        except Exception:
+            logger.exception("Error inserting record into %s", table)
             return False
 
     @classmethod
@@ -233,10 +259,9 @@ class ClickHouse:
             bool: flag_connected
         """
         try:
-            conn = await cls.conn()
-            flag_connected = conn.connected
-            await conn.close()
-            return flag_connected
+            async with cls.connection() as conn:
+                await conn.ping()
+                return conn.connected
         except Exception as e:
             print(e, flush=True)
             return False
@@ -0,0 +1,47 @@
+from clickhouse_driver.errors import ErrorCodes, NetworkError, ServerException, SocketTimeoutError
+from sqlalchemy.exc import DBAPIError
+
+# Server errors an insert can succeed after: overload, lost replicas or
+# keeper, and network failures reported by the server
+TRANSIENT_SERVER_CODES = frozenset(
+    {
+        ErrorCodes.UNEXPECTED_END_OF_FILE,
+        ErrorCodes.TIMEOUT_EXCEEDED,
+        ErrorCodes.READONLY,
+        ErrorCodes.TOO_MANY_SIMULTANEOUS_QUERIES,
+        ErrorCodes.NO_FREE_CONNECTION,
+        ErrorCodes.SOCKET_TIMEOUT,
+        ErrorCodes.NETWORK_ERROR,
+        ErrorCodes.MEMORY_LIMIT_EXCEEDED,
+        ErrorCodes.TABLE_IS_READ_ONLY,
+        ErrorCodes.TOO_MANY_PARTS,
+        ErrorCodes.ALL_CONNECTION_TRIES_FAILED,
+        ErrorCodes.UNKNOWN_STATUS_OF_INSERT,
+        ErrorCodes.KEEPER_EXCEPTION,
+    }
+)
+
+
+def _unwrap(exc: BaseException) -> BaseException:
+    # SQLAlchemy wraps the driver errors raised while checking out a connection
+    if isinstance(exc, DBAPIError) and exc.orig is not None:
+        return exc.orig
+    return exc
+
+
+def is_unavailable(exc: BaseException) -> bool:
+    """Whether ``exc`` means ClickHouse could not be reached at all"""
+    exc = _unwrap(exc)
+    return isinstance(exc, (NetworkError, SocketTimeoutError, OSError))
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether writing the same rows again may succeed
+
+    Data the driver cannot encode, or the server rejects, fails the same
+    way on every attempt.
+    """
+    exc = _unwrap(exc)
+    if is_unavailable(exc):
+        return True
+    return isinstance(exc, ServerException) and exc.code in TRANSIENT_SERVER_CODES
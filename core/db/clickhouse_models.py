@@ -1,41 +1,189 @@
-from sqlalchemy import Column, String, DateTime, Integer
+from typing import NamedTuple
+
+from sqlalchemy import Column, String, DateTime
 from clickhouse_sqlalchemy import make_session, types, engines
-from sqlalchemy import create_engine
-import uuid
+from clickhouse_sqlalchemy.engines.base import Engine
+from sqlalchemy import create_engine, text
 
+from core.config import config
 from core.db.clickhouse_session import Base
+from core.helpers.event_id import uuid7
+
+
+# statistic_log is read by user first, then by activity and time
+STATISTIC_LOG_PRIMARY_KEY = ("user_id", "activity_type", "utc_timestamp")
+# Monthly partitions of the event time
+STATISTIC_LOG_PARTITION_BY = "toYYYYMM(utc_timestamp)"
+STATISTIC_LOG_ENGINES = ("MergeTree", "ReplacingMergeTree")
+
+
+def statistic_log_engine() -> Engine:
+    """Engine of statistic_log picked by ``STATISTIC_LOG_ENGINE``
+
+    Per-user and time-range queries skip other users' granules through the
+    primary key and other months through the partition key. ``id`` only
+    ends the sorting key to tell events apart: ReplacingMergeTree collapses
+    rows with an equal sorting key, which then share an id and an event
+    time. Those are replays of a written row and client retries of a keyed
+    event with a timestamp, see ``row_id``.
+    """
+    if config.STATISTIC_LOG_ENGINE not in STATISTIC_LOG_ENGINES:
+        raise ValueError(f"unsupported STATISTIC_LOG_ENGINE {config.STATISTIC_LOG_ENGINE!r}")
+    return getattr(engines, config.STATISTIC_LOG_ENGINE)(
+        partition_by=text(STATISTIC_LOG_PARTITION_BY),
+        order_by=STATISTIC_LOG_PRIMARY_KEY + ("id",),
+        primary_key=STATISTIC_LOG_PRIMARY_KEY,
+    )
+
+
+def dimension() -> types.LowCardinality:
+    """String with few distinct values, stored dictionary encoded"""
+    return types.LowCardinality(String)
+
+
+# Column codecs: timestamps are sorted within a user so their deltas are
+# small, long free text compresses far better with zstd than with lz4
+TIME_CODEC = ("Delta", "ZSTD(1)")
+TEXT_CODEC = ("ZSTD(3)",)
+
+
+class SkipIndex(NamedTuple):
+    """Data skipping index of a MergeTree table, declared in its ``info``
+
+    For each block of ``granularity`` granules ClickHouse stores a summary
+    of ``expression`` and skips the block when the summary rules out the
+    WHERE clause.
+    """
+
+    name: str
+    expression: str
+    type: str
+    granularity: int = 1
+
+    def clause(self) -> str:
+        return f"INDEX {self.name} {self.expression} TYPE {self.type} GRANULARITY {self.granularity}"
+
+
+def skip_indexes(table) -> tuple[SkipIndex, ...]:
+    """Skip indexes declared on a model table"""
+    return table.info.get("skip_indexes", ())
+
+
+# conversation_id and msg_id are not in the sorting key: lookups by them
+# only read the granules whose bloom filter may hold the value.
+# activity_type is, but after user_id, so a set index serves queries on an
+# activity across users.
+STATISTIC_LOG_SKIP_INDEXES = (
+    SkipIndex("conversation_id_bloom", "conversation_id", "bloom_filter(0.01)"),
+    SkipIndex("msg_id_bloom", "msg_id", "bloom_filter(0.01)"),
+    SkipIndex("activity_type_set", "activity_type", "set(100)", 4),
+)
+
 
 class StatisticLog(Base):
     __tablename__ = "statistic_log"
-    __table_args__ = (engines.Memory(),)
+    __table_args__ = (
+        statistic_log_engine(),
+        {"info": {"skip_indexes": STATISTIC_LOG_SKIP_INDEXES}},
+    )
 
-    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    local_timestamp = Column(String)
-    time_zone = Column(String)
-    utc_timestamp = Column(String)
+    id = Column(String, primary_key=True, default=lambda: uuid7())
+    # Wall clock time of the user, kept as written
+    local_timestamp = Column(types.DateTime64(3, "UTC"), clickhouse_codec=TIME_CODEC)
+    time_zone = Column(dimension())
+    utc_timestamp = Column(types.DateTime64(3, "UTC"), clickhouse_codec=TIME_CODEC)
+    # Date of the event in the user's time zone
+    local_date = Column(types.Date, clickhouse_codec=TIME_CODEC)
     user_id = Column(String)
     conversation_id = Column(String)
     msg_id = Column(String)
-    activity_type = Column(String)
-    detail = Column(String)
-    _source = Column(String)  # JSON stored as string in ClickHouse
-    current_url = Column(String)
-    page_title = Column(String)
-    page_description = Column(String)
-    page_keywords = Column(types.Array(String))
-    user_agent = Column(String)
-    extension_version = Column(String)
-    agent_name = Column(String)
-    agent_version = Column(String)
-    string_names = Column(types.Array(String))
-    string_values = Column(types.Array(String))
-    integer_names = Column(types.Array(String))
-    integer_values = Column(types.Array(Integer))
-    number_names = Column(types.Array(String))
+    activity_type = Column(dimension())
+    detail = Column(String, clickhouse_codec=TEXT_CODEC)
+    _source = Column(String, clickhouse_codec=TEXT_CODEC)  # JSON stored as string in ClickHouse
+    current_url = Column(String, clickhouse_codec=TEXT_CODEC)
+    page_title = Column(String, clickhouse_codec=TEXT_CODEC)
+    page_description = Column(String, clickhouse_codec=TEXT_CODEC)
+    page_keywords = Column(types.Array(String), clickhouse_codec=TEXT_CODEC)
+    user_agent = Column(dimension())
+    extension_version = Column(dimension())
+    agent_name = Column(dimension())
+    agent_version = Column(dimension())
+    # extra_data keys repeat across events like the dimensions
+    string_names = Column(types.Array(dimension()))
+    string_values = Column(types.Array(String), clickhouse_codec=TEXT_CODEC)
+    integer_names = Column(types.Array(dimension()))
+    integer_values = Column(types.Array(types.Int32))
+    number_names = Column(types.Array(dimension()))
     number_values = Column(types.Array(types.Float32))
-    bool_names = Column(types.Array(String))
+    bool_names = Column(types.Array(dimension()))
     bool_values = Column(
         types.Array(types.UInt8)
     )  # ClickHouse không có Boolean, dùng UInt8
-    date_names = Column(types.Array(String))
+    date_names = Column(types.Array(dimension()))
     date_values = Column(types.Array(DateTime))
+
+
+class Rollup(NamedTuple):
+    """Time granularity of a statistic_log rollup, declared in its table's ``info``"""
+
+    granularity: str
+    seconds: int
+    # ClickHouse function truncating utc_timestamp to the start of a bucket
+    bucket_function: str
+
+
+def rollup_of(table) -> Rollup | None:
+    return table.info.get("rollup")
+
+
+# Dimensions the rollups count events by
+ROLLUP_DIMENSIONS = ("activity_type", "agent_name", "extension_version")
+
+
+class StatisticLogRollupColumns:
+    """Columns of the statistic_log rollups
+
+    A materialized view adds one row per inserted block and bucket to the
+    rollup; AggregatingMergeTree merges rows of the same bucket and
+    dimensions, summing ``events`` and combining the ``users`` uniq states.
+    """
+
+    bucket = Column(types.DateTime("UTC"), primary_key=True)
+    activity_type = Column(dimension())
+    agent_name = Column(dimension())
+    extension_version = Column(dimension())
+    events = Column(types.SimpleAggregateFunction("sum", types.UInt64))
+    users = Column(types.AggregateFunction("uniq", String))
+
+
+def rollup_table_args(rollup: Rollup) -> tuple:
+    return (
+        engines.AggregatingMergeTree(
+            partition_by=text("toYYYYMM(bucket)"),
+            order_by=("bucket",) + ROLLUP_DIMENSIONS,
+        ),
+        {"info": {"rollup": rollup}},
+    )
+
+
+class StatisticLogMinutely(StatisticLogRollupColumns, Base):
+    __tablename__ = "statistic_log_minutely"
+    __table_args__ = rollup_table_args(Rollup("minute", 60, "toStartOfMinute"))
+
+
+class StatisticLogHourly(StatisticLogRollupColumns, Base):
+    __tablename__ = "statistic_log_hourly"
+    __table_args__ = rollup_table_args(Rollup("hour", 3600, "toStartOfHour"))
+
+
+class StatisticLogDaily(StatisticLogRollupColumns, Base):
+    __tablename__ = "statistic_log_daily"
+    __table_args__ = rollup_table_args(Rollup("day", 86400, "toStartOfDay"))
+
+
+# Coarsest first
+STATISTIC_LOG_ROLLUPS = (
+    StatisticLogDaily.__table__,
+    StatisticLogHourly.__table__,
+    StatisticLogMinutely.__table__,
+)
@@ -0,0 +1,160 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from core.exceptions import CustomException
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutException(CustomException):
+    code = 503
+    error_code = "CLICKHOUSE__POOL_TIMEOUT"
+    message = "timed out waiting for a clickhouse connection"
+
+
+class ClickHousePool:
+    """Bounded pool of ClickHouse connections shared by one event loop.
+
+    At most ``max_size`` connections are open at a time and callers wait up to
+    ``acquire_timeout`` seconds for one to be released. Connections idle for
+    longer than ``ping_interval`` are pinged before being handed out, and the
+    reaper closes connections idle for longer than ``max_idle_time`` while
+    keeping ``min_size`` of them open.
+    """
+
+    def __init__(
+        self,
+        *,
+        connect: Callable[[], Awaitable[Any]],
+        min_size: int,
+        max_size: int,
+        max_idle_time: float,
+        ping_interval: float,
+        acquire_timeout: float,
+    ):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self.ping_interval = ping_interval
+        self.acquire_timeout = acquire_timeout
+
+        self._slots = asyncio.Semaphore(max_size)
+        self._idle: deque[tuple[Any, float]] = deque()
+        self._in_use = 0
+        self._waiting = 0
+        self._reaper: asyncio.Task | None = None
+
+        self.created = 0
+        self.closed = 0
+        self.acquire_timeouts = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._idle) + self._in_use
+
+    async def open(self) -> None:
+        """Open ``min_size`` connections and start the idle reaper"""
+        while self.size < self.min_size:
+            self._idle.append((await self._new_connection(), time.monotonic()))
+        self._start_reaper()
+
+    async def close(self) -> None:
+        """Stop the reaper and close every idle connection"""
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        while self._idle:
+            conn, _ = self._idle.popleft()
+            await self._close_connection(conn)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[Any]:
+        """Borrow a connection, discarding it if the caller fails with it"""
+        conn = await self._acquire()
+        try:
+            yield conn
+        except BaseException:
+            self._in_use -= 1
+            self._slots.release()
+            await self._close_connection(conn)
+            raise
+        else:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "waiting": self._waiting,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "created": self.created,
+            "closed": self.closed,
+            "acquire_timeouts": self.acquire_timeouts,
+        }
+
+    async def _acquire(self) -> Any:
+        self._start_reaper()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.acquire_timeouts += 1
+            raise PoolTimeoutException
+        finally:
+            self._waiting -= 1
+
+        self._in_use += 1
+        try:
+            while self._idle:
+                conn, last_used = self._idle.pop()
+                if time.monotonic() - last_used < self.ping_interval:
+                    return conn
+                try:
+                    await conn.ping()
+                    return conn
+                except Exception:
+                    logger.warning("Dropping clickhouse connection that failed ping")
+                    await self._close_connection(conn)
+            return await self._new_connection()
+        except BaseException:
+            self._in_use -= 1
+            self._slots.release()
+            raise
+
+    async def _new_connection(self) -> Any:
+        conn = await self._connect()
+        self.created += 1
+        return conn
+
+    async def _close_connection(self, conn: Any) -> None:
+        self.closed += 1
+        try:
+            await conn.close()
+        except Exception:
+            logger.warning("Failed to close clickhouse connection", exc_info=True)
+
+    def _start_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(self.max_idle_time / 2)
+            now = time.monotonic()
+            # The oldest connections sit on the left of the deque
+            while (
+                self._idle
+                and self.size > self.min_size
+                and now - self._idle[0][1] > self.max_idle_time
+            ):
+                conn, _ = self._idle.popleft()
+                await self._close_connection(conn)
@@ -1,3 +1,8 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Sequence, TypeVar
+
 from clickhouse_sqlalchemy import (
     Table,
     make_session,
@@ -5,15 +10,49 @@ from clickhouse_sqlalchemy import (
     types,
     engines,
 )
-from sqlalchemy import create_engine, Column, MetaData
+from sqlalchemy import Engine, create_engine, Column, MetaData
 
 from core.config import config
+from core.db.clickhouse_columns import as_column
+from core.db.clickhouse_settings import compression, insert_settings
+from core.db.clickhouse_shards import ShardSet, parse_shards
+
+
+def make_engine(node: str, compression_method: str | bool | None = None) -> Engine:
+    """Engine for one ClickHouse node, compressing the wire with ``compression()`` by default"""
+    if compression_method is None:
+        compression_method = compression()
+    url = f"clickhouse+native://{config.CLICK_HOUSE_USER}:{config.CLICK_HOUSE_PASSWORD}@{node}/{config.CLICK_HOUSE_DB}"
+    if compression_method:
+        url += f"?compression={compression_method}"
+    return create_engine(url, pool_size=config.CLICK_HOUSE_EXECUTOR_WORKERS)
 
-# ClickHouse async engine với connection string đúng format
-clickhouse_engine = create_engine(
-    f"clickhouse+native://{config.CLICK_HOUSE_USER}:{config.CLICK_HOUSE_PASSWORD}@{config.CLICK_HOUSE_HOST}:{config.CLICK_HOUSE_PORT}/{config.CLICK_HOUSE_DB}",
+
+# One engine per shard; statistic_log rows are routed by user_id
+clickhouse_shards: ShardSet[Engine] = ShardSet(
+    {
+        node: make_engine(node)
+        for node in parse_shards(
+            config.CLICK_HOUSE_SHARDS, f"{config.CLICK_HOUSE_HOST}:{config.CLICK_HOUSE_PORT}"
+        )
+    }
 )
 
+# ClickHouse engine of the first shard, used for DDL and ORM sessions
+clickhouse_engine = clickhouse_shards.shards[0]
+
+
+def dispose_connections(*, close: bool = True) -> None:
+    """Drop the pooled connections of every shard engine
+
+    A forked worker passes ``close=False`` to forget the connections it
+    inherited while leaving the sockets open for its parent; new ones are
+    opened on first use.
+    """
+    for engine in clickhouse_shards.shards:
+        engine.dispose(close=close)
+
+
 # ClickHouse session factory
 session = make_session(clickhouse_engine)
 
@@ -21,3 +60,61 @@ metadata = MetaData()
 metadata.bind = clickhouse_engine
 
 Base = get_declarative_base(metadata=metadata)
+
+T = TypeVar("T")
+
+# The native driver is blocking, so its calls run on dedicated threads
+# instead of the event loop. Each thread checks out its own pooled connection.
+clickhouse_executor = ThreadPoolExecutor(
+    max_workers=config.CLICK_HOUSE_EXECUTOR_WORKERS,
+    thread_name_prefix="clickhouse",
+)
+
+
+async def run_in_executor(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking ClickHouse call without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(clickhouse_executor, partial(func, *args, **kwargs))
+
+
+async def fan_out(shards: ShardSet[Engine], func: Callable[..., T], *args: Any) -> list[T]:
+    """Run ``func(engine, *args)`` on every shard concurrently
+
+    Returns:
+        list: the result of each shard, in shard order
+    """
+    return list(
+        await asyncio.gather(*(run_in_executor(func, engine, *args) for engine in shards.shards))
+    )
+
+
+def insert_columns(
+    table: str,
+    columns: dict[str, Sequence],
+    engine: Engine = clickhouse_engine,
+    settings: dict | None = None,
+) -> int:
+    """Send column-oriented data straight to the native protocol
+
+    Blocking, so call it through ``run_in_executor``.
+
+    Args:
+        table (str): table name
+        columns (dict[str, Sequence]): column name to column values
+        engine (Engine): engine of the shard to write to
+        settings (dict | None): insert settings, ``insert_settings()`` by default
+
+    Returns:
+        int: number of inserted rows
+    """
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES"
+    conn = engine.raw_connection()
+    try:
+        return conn.driver_connection.transport.execute(
+            query,
+            [as_column(column) for column in columns.values()],
+            columnar=True,
+            settings=insert_settings() if settings is None else settings,
+        )
+    finally:
+        conn.close()
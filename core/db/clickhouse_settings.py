@@ -0,0 +1,28 @@
+from core.config import config
+
+COMPRESSION_METHODS = ("lz4", "lz4hc", "zstd")
+
+
+def compression() -> str | bool:
+    """Wire compression of native connections, False when disabled"""
+    method = config.CLICK_HOUSE_COMPRESSION.lower()
+    if not method or method == "none":
+        return False
+    if method not in COMPRESSION_METHODS:
+        raise ValueError(f"unsupported CLICK_HOUSE_COMPRESSION {method!r}")
+    return method
+
+
+def insert_settings() -> dict:
+    """Settings sent with every INSERT, whichever driver runs it
+
+    ``insert_block_size`` is a client setting: the driver splits the data in
+    blocks of that many rows. ``async_insert`` lets the server buffer small
+    inserts and write them as one part; without ``wait_for_async_insert`` the
+    insert returns before the data is flushed.
+    """
+    settings = {"insert_block_size": config.CLICK_HOUSE_INSERT_BLOCK_SIZE}
+    if config.CLICK_HOUSE_ASYNC_INSERT:
+        settings["async_insert"] = 1
+        settings["wait_for_async_insert"] = int(config.CLICK_HOUSE_WAIT_FOR_ASYNC_INSERT)
+    return settings
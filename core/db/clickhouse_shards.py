@@ -0,0 +1,66 @@
+import bisect
+import hashlib
+from collections import defaultdict
+from typing import Any, Generic, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+def parse_shards(spec: str, default: str) -> list[str]:
+    """Split a comma separated ``host:port`` list, falling back to ``default``"""
+    shards = [shard.strip() for shard in spec.split(",") if shard.strip()]
+    return shards or [default]
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping keys to node indexes.
+
+    Every node owns ``replicas`` points on the ring, and a key belongs to the
+    node of the first point at or after its hash. Adding a node only moves
+    the keys that land on its points.
+    """
+
+    def __init__(self, nodes: Sequence[str], replicas: int = 128):
+        if not nodes:
+            raise ValueError("a hash ring needs at least one node")
+        points = sorted(
+            (_hash(f"{node}#{replica}"), index)
+            for index, node in enumerate(nodes)
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [index for _, index in points]
+
+    def node_for(self, key: str) -> int:
+        position = bisect.bisect_left(self._hashes, _hash(key))
+        return self._nodes[position % len(self._nodes)]
+
+
+class ShardSet(Generic[T]):
+    """Named shards, e.g. one engine per ClickHouse node, routed by a hash ring"""
+
+    def __init__(self, shards: dict[str, T], replicas: int = 128):
+        self.names = list(shards)
+        self.shards = list(shards.values())
+        self.ring = HashRing(self.names, replicas)
+        self._single = len(self.shards) == 1
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def shard_for(self, key: str) -> T:
+        return self.shards[0 if self._single else self.ring.node_for(key)]
+
+    def partition(self, rows: Sequence[Any], key_index: int) -> list[tuple[T, list]]:
+        """Group rows by the shard owning ``row[key_index]``, keeping their order"""
+        if self._single:
+            return [(self.shards[0], list(rows))]
+        groups: dict[int, list] = defaultdict(list)
+        node_for = self.ring.node_for
+        for row in rows:
+            groups[node_for(row[key_index])].append(row)
+        return [(self.shards[index], group) for index, group in groups.items()]
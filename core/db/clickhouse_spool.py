@@ -0,0 +1,345 @@
+import asyncio
+import fcntl
+import logging
+import mmap
+import os
+import pickle
+import struct
+import uuid
+import zlib
+from pathlib import Path
+from typing import IO, Awaitable, Callable, Iterator
+
+from core.db.clickhouse_errors import is_retryable, is_unavailable
+
+logger = logging.getLogger(__name__)
+
+# Every record is a pickled batch of rows behind its length and crc32
+HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".seg"
+CHECKPOINT = "checkpoint"
+LOCK = "lock"
+# Files in the spool root holding records that could not be written, in the
+# segment format so ``read_segment`` reads them back
+DEAD_LETTER_PREFIX = "dead-letter-"
+
+
+def read_segment(path: Path, offset: int = 0) -> Iterator[tuple[int, list]]:
+    """Yield ``(end offset, rows)`` for every complete record after ``offset``
+
+    The segment is memory-mapped, so replaying it does not copy the file
+    through read buffers. A torn or corrupt tail, left by a crash in the
+    middle of an append, ends the segment.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= offset:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            while offset + HEADER.size <= size:
+                length, crc = HEADER.unpack_from(mm, offset)
+                start = offset + HEADER.size
+                end = start + length
+                if end > size:
+                    logger.warning("Ignoring torn record at %s:%d", path, offset)
+                    return
+                payload = mm[start:end]
+                if zlib.crc32(payload) != crc:
+                    logger.error("Ignoring corrupt record at %s:%d", path, offset)
+                    return
+                offset = end
+                yield offset, pickle.loads(payload)
+
+
+class Spool:
+    """Append-only on-disk queue for rows ClickHouse did not accept.
+
+    Batches are appended to the active segment, which is sealed once it
+    reaches ``segment_bytes`` or when a drain starts. The drainer replays
+    sealed segments in order, checkpointing the offset of every batch it
+    writes so a restart resumes where it stopped. Each worker process claims
+    its own directory under ``directory`` with a file lock, and directories
+    left by dead workers are drained by whichever worker can lock them.
+
+    A batch that fails for a reason other than ClickHouse being unreachable
+    counts an attempt in the checkpoint. Rows the server or the driver
+    reject outright, or that still fail after ``max_attempts``, are moved
+    to a dead-letter file, record by record, and draining goes on. Which
+    failures mean unreachable or retryable is decided by ``unavailable``
+    and ``retryable``, ClickHouse errors by default.
+
+    Records are pickled: the spool only reads files written by this service.
+    """
+
+    def __init__(
+        self,
+        *,
+        directory: str,
+        segment_bytes: int,
+        max_attempts: int = 10,
+        unavailable: Callable[[BaseException], bool] = is_unavailable,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+    ):
+        self.root = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_attempts = max_attempts
+        self.unavailable = unavailable
+        self.retryable = retryable
+
+        self._dir: Path | None = None
+        self._lock: IO | None = None
+        self._active: IO | None = None
+        self._active_size = 0
+        self._drainer: asyncio.Task | None = None
+        self._dead_letter: IO | None = None
+
+        self.spilled_rows = 0
+        self.replayed_rows = 0
+        self.dead_lettered_rows = 0
+
+    def append(self, rows: list) -> None:
+        """Persist a batch of rows at the end of the active segment
+
+        Args:
+            rows (list): rows accepted by the drain callable
+        """
+        if self._active is None:
+            self._open_segment()
+        self._active_size += self._write_record(self._active, rows)
+        self.spilled_rows += len(rows)
+
+        if self._active_size >= self.segment_bytes:
+            self._seal()
+
+    def dead_letter(self, rows: list, reason: BaseException | str) -> None:
+        """Keep rows that can never be written out of the replay path"""
+        if self._dead_letter is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            path = self.root / f"{DEAD_LETTER_PREFIX}{uuid.uuid4().hex}{SEGMENT_SUFFIX}"
+            self._dead_letter = open(path, "ab")
+        self._write_record(self._dead_letter, rows)
+        self.dead_lettered_rows += len(rows)
+        logger.error("Dead-lettered %d rows to %s: %s", len(rows), self._dead_letter.name, reason)
+
+    async def drain(self, write: Callable[[list], Awaitable[None]], *, batch_rows: int) -> int:
+        """Replay spooled rows through ``write`` in batches of ``batch_rows``
+
+        A write failing because ClickHouse is unreachable ends the drain; its
+        rows stay in the spool for the next one. Any other failure ends the
+        drain of that directory only.
+
+        Returns:
+            int: number of replayed rows
+        """
+        if not self.root.exists():
+            return 0
+
+        self._seal()
+        replayed = 0
+        if self._dir is not None:
+            replayed += await self._drain_or_skip(self._dir, write, batch_rows)
+
+        for directory in sorted(self.root.iterdir()):
+            if directory == self._dir or not directory.is_dir():
+                continue
+            lock = self._try_lock(directory)
+            if lock is None:
+                continue
+            try:
+                self._seal_leftovers(directory)
+                replayed += await self._drain_or_skip(directory, write, batch_rows)
+                if not any(directory.glob(f"*{SEGMENT_SUFFIX}")):
+                    for path in directory.iterdir():
+                        path.unlink()
+                    directory.rmdir()
+            finally:
+                lock.close()
+        return replayed
+
+    def start(self, write: Callable[[list], Awaitable[None]], *, interval: float, batch_rows: int) -> None:
+        """Drain the spool every ``interval`` seconds in the background"""
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.get_running_loop().create_task(
+                self._run(write, interval, batch_rows)
+            )
+
+    async def stop(self) -> None:
+        if self._drainer is not None:
+            self._drainer.cancel()
+            try:
+                await self._drainer
+            except asyncio.CancelledError:
+                pass
+            self._drainer = None
+        self._seal()
+
+    def stats(self) -> dict:
+        segments = list(self.root.glob(f"*/*{SEGMENT_SUFFIX}")) if self.root.exists() else []
+        dead_letters = list(self.root.glob(f"{DEAD_LETTER_PREFIX}*")) if self.root.exists() else []
+        return {
+            "spilled_rows": self.spilled_rows,
+            "replayed_rows": self.replayed_rows,
+            "dead_lettered_rows": self.dead_lettered_rows,
+            "segments": len(segments),
+            "bytes": sum(segment.stat().st_size for segment in segments),
+            "dead_letter_bytes": sum(path.stat().st_size for path in dead_letters),
+        }
+
+    async def _run(self, write: Callable[[list], Awaitable[None]], interval: float, batch_rows: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.drain(write, batch_rows=batch_rows)
+            except Exception:
+                logger.warning("Spool drain failed, retrying in %ss", interval, exc_info=True)
+
+    async def _drain_or_skip(
+        self,
+        directory: Path,
+        write: Callable[[list], Awaitable[None]],
+        batch_rows: int,
+    ) -> int:
+        try:
+            return await self._drain_directory(directory, write, batch_rows)
+        except Exception as e:
+            if self.unavailable(e):
+                raise
+            logger.warning("Spool drain of %s failed, retrying later", directory, exc_info=True)
+            return 0
+
+    async def _drain_directory(
+        self,
+        directory: Path,
+        write: Callable[[list], Awaitable[None]],
+        batch_rows: int,
+    ) -> int:
+        replayed = 0
+        checkpoint = self._read_checkpoint(directory)
+        for segment in self._sealed_segments(directory):
+            start, attempts = 0, 0
+            if checkpoint and checkpoint[0] == segment.name:
+                start, attempts = checkpoint[1], checkpoint[2]
+            records: list[tuple[int, list]] = []
+            n_rows = 0
+            for end, rows in read_segment(segment, start):
+                records.append((end, rows))
+                n_rows += len(rows)
+                if n_rows >= batch_rows:
+                    replayed += await self._replay(directory, segment.name, start, records, attempts, write)
+                    start, attempts, records, n_rows = end, 0, [], 0
+            if records:
+                replayed += await self._replay(directory, segment.name, start, records, attempts, write)
+            segment.unlink()
+            (directory / CHECKPOINT).unlink(missing_ok=True)
+            checkpoint = None
+        return replayed
+
+    async def _replay(
+        self,
+        directory: Path,
+        segment: str,
+        start: int,
+        records: list[tuple[int, list]],
+        attempts: int,
+        write: Callable[[list], Awaitable[None]],
+    ) -> int:
+        """Write the records following ``start`` as one batch, then checkpoint past them
+
+        Raises when the batch is to be retried by a later drain. A batch
+        failing for good is retried record by record so only the failing
+        records are dead-lettered.
+
+        Returns:
+            int: number of written rows
+        """
+        rows = [row for _, record in records for row in record]
+        try:
+            await write(rows)
+        except Exception as e:
+            if self.unavailable(e):
+                raise
+            if self.retryable(e) and attempts + 1 < self.max_attempts:
+                self._write_checkpoint(directory, segment, start, attempts + 1)
+                raise
+            if len(records) > 1:
+                replayed = 0
+                for end, record in records:
+                    replayed += await self._replay(directory, segment, start, [(end, record)], 0, write)
+                    start = end
+                return replayed
+            self.dead_letter(rows, e)
+            replayed = 0
+        else:
+            replayed = len(rows)
+            self.replayed_rows += replayed
+        self._write_checkpoint(directory, segment, records[-1][0], 0)
+        return replayed
+
+    def _open_segment(self) -> None:
+        if self._dir is None:
+            self._dir = self._claim_directory()
+        sequences = [int(path.stem.lstrip(".")) for path in self._dir.glob(f"*{SEGMENT_SUFFIX}")]
+        # Sealed segments are renamed, the active one keeps a leading dot
+        path = self._dir / f".{max(sequences, default=0) + 1:012d}{SEGMENT_SUFFIX}"
+        self._active = open(path, "ab")
+        self._active_size = 0
+
+    def _seal(self) -> None:
+        if self._active is None:
+            return
+        self._active.close()
+        path = Path(self._active.name)
+        path.rename(path.with_name(path.name.lstrip(".")))
+        self._active = None
+
+    def _sealed_segments(self, directory: Path) -> list[Path]:
+        return sorted(
+            path for path in directory.glob(f"*{SEGMENT_SUFFIX}") if not path.name.startswith(".")
+        )
+
+    def _seal_leftovers(self, directory: Path) -> None:
+        """Seal active segments left behind by a crashed process"""
+        for path in directory.glob(f".*{SEGMENT_SUFFIX}"):
+            path.rename(path.with_name(path.name.lstrip(".")))
+
+    def _claim_directory(self) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        for directory in sorted(self.root.iterdir()):
+            if directory.is_dir():
+                self._lock = self._try_lock(directory)
+                if self._lock is not None:
+                    self._seal_leftovers(directory)
+                    return directory
+        directory = self.root / uuid.uuid4().hex
+        directory.mkdir()
+        self._lock = self._try_lock(directory)
+        return directory
+
+    def _try_lock(self, directory: Path) -> IO | None:
+        lock = open(directory / LOCK, "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+        return lock
+
+    def _write_record(self, f: IO, rows: list) -> int:
+        payload = pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)
+        f.write(HEADER.pack(len(payload), zlib.crc32(payload)))
+        f.write(payload)
+        f.flush()
+        return HEADER.size + len(payload)
+
+    def _read_checkpoint(self, directory: Path) -> tuple[str, int, int] | None:
+        """Segment, offset and failed attempts of the next batch to replay"""
+        try:
+            name, offset, *attempts = (directory / CHECKPOINT).read_text().split()
+        except (FileNotFoundError, ValueError):
+            return None
+        return name, int(offset), int(attempts[0]) if attempts else 0
+
+    def _write_checkpoint(self, directory: Path, segment: str, offset: int, attempts: int = 0) -> None:
+        tmp = directory / f"{CHECKPOINT}.tmp"
+        tmp.write_text(f"{segment} {offset} {attempts}")
+        os.replace(tmp, directory / CHECKPOINT)
@@ -2,22 +2,46 @@
 Script to initialize ClickHouse database and tables
 """
 import asyncio
-from core.db.clickhouse_session import clickhouse_engine
-from core.db.clickhouse_models import Base,engines
+import sys
+from datetime import date, datetime
+from core.db.clickhouse_session import clickhouse_engine, clickhouse_shards
+from core.db.clickhouse_models import (
+    ROLLUP_DIMENSIONS,
+    STATISTIC_LOG_PARTITION_BY,
+    STATISTIC_LOG_PRIMARY_KEY,
+    STATISTIC_LOG_ROLLUPS,
+    Base,
+    StatisticLog,
+    engines,
+    rollup_of,
+    skip_indexes,
+)
 from core.config import config
-from sqlalchemy import text
+from sqlalchemy import Engine, Table, text
+from sqlalchemy.schema import CreateTable
 import logging
 from sqlalchemy.orm import Session
 
+logger = logging.getLogger(__name__)
+
 
 def create_clickhouse_tables():
-    """Create ClickHouse database and tables if they do not exist"""
+    """Create ClickHouse database and tables on every shard if they do not exist"""
     try:
-        with clickhouse_engine.begin() as conn:
-            print(f"Checking if ClickHouse database '{config.CLICK_HOUSE_DB}' exists...")
-            conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {config.CLICK_HOUSE_DB}"))
-            Base.metadata.create_all(bind=conn)  # Nếu cần ORM
-        print(f"✅ ClickHouse database initialized successfully in database: {config.CLICK_HOUSE_DB}")
+        for name, engine in zip(clickhouse_shards.names, clickhouse_shards.shards):
+            with engine.begin() as conn:
+                print(f"Checking if ClickHouse database '{config.CLICK_HOUSE_DB}' exists on {name}...")
+                conn.execute(text(f"CREATE DATABASE IF NOT EXISTS {config.CLICK_HOUSE_DB}"))
+                Base.metadata.create_all(bind=conn)  # Nếu cần ORM
+                if statistic_log_is_current(conn):
+                    add_skip_indexes(conn, name)
+                    create_rollup_views(conn)
+                else:
+                    print(
+                        f"⚠️ {StatisticLog.__tablename__} on {name} predates the model, "
+                        "run `python -m core.db.init_clickhouse migrate`"
+                    )
+            print(f"✅ ClickHouse database initialized successfully in database: {config.CLICK_HOUSE_DB} on {name}")
     except Exception as e:
         print(f"❌ Error initializing ClickHouse database and tables: {str(e)}")
         raise
@@ -36,6 +60,309 @@ async def drop_clickhouse_tables():
         raise
 
 
+# Layout system.tables reports for a statistic_log created from the model
+STATISTIC_LOG_LAYOUT = (
+    config.STATISTIC_LOG_ENGINE,
+    STATISTIC_LOG_PARTITION_BY,
+    ", ".join(STATISTIC_LOG_PRIMARY_KEY + ("id",)),
+    ", ".join(STATISTIC_LOG_PRIMARY_KEY),
+)
+
+
+def statistic_log_is_current(conn) -> bool:
+    """Whether statistic_log has the layout and column types of the model
+
+    Tables created by older releases, such as the first ``Memory`` table
+    with string timestamps, take no skip index: they are rebuilt by
+    ``migrate_table`` first.
+    """
+    table = StatisticLog.__table__
+    layout = _table_layout(conn, table.name)
+    if layout is None or tuple(layout) != STATISTIC_LOG_LAYOUT:
+        return False
+    existing = {name: column[0] for name, column in _table_columns(conn, table.name).items()}
+    return all(
+        existing.get(column.name) == column.type.compile(dialect=clickhouse_engine.dialect)
+        for column in table.columns
+    )
+
+
+def add_skip_indexes(conn, name: str) -> None:
+    """Add the declared skip indexes the tables of one node lack"""
+    for table in Base.metadata.sorted_tables:
+        for index in apply_skip_indexes(conn, table):
+            print(f"Added skip index {index} to {table.name} on {name}")
+
+
+def verify_clickhouse_schema() -> list[str]:
+    """List the tables and model columns each shard lacks, without changing anything
+
+    Tables are created and migrated by this script, not by every starting
+    worker. A statistic_log with an outdated layout still takes inserts, so
+    it is only logged.
+    """
+    problems = []
+    for name, engine in zip(clickhouse_shards.names, clickhouse_shards.shards):
+        with engine.connect() as conn:
+            for table in Base.metadata.sorted_tables:
+                layout = _table_layout(conn, table.name)
+                if layout is None:
+                    problems.append(f"{table.name} is missing on {name}")
+                    continue
+                if table is StatisticLog.__table__ and not statistic_log_is_current(conn):
+                    logger.warning(
+                        "%s on %s has layout %s instead of %s, run `python -m core.db.init_clickhouse migrate`",
+                        table.name, name, tuple(layout), STATISTIC_LOG_LAYOUT,
+                    )
+                existing = _table_columns(conn, table.name)
+                missing = [column.name for column in table.columns if column.name not in existing]
+                if missing:
+                    problems.append(f"{table.name} on {name} lacks columns {', '.join(missing)}")
+    return problems
+
+
+def table_ddl(table: Table, name: str | None = None) -> str:
+    """CREATE TABLE IF NOT EXISTS statement of a model table, optionally under another name"""
+    ddl = str(CreateTable(table, if_not_exists=True).compile(dialect=clickhouse_engine.dialect)).strip()
+    indexes = "".join(f", \n\t{index.clause()}" for index in skip_indexes(table))
+    ddl = ddl.replace("\n) ENGINE", f"{indexes}\n) ENGINE", 1)
+    if name is not None:
+        prefix = "CREATE TABLE IF NOT EXISTS "
+        ddl = ddl.replace(f"{prefix}{table.name} ", f"{prefix}{name} ", 1)
+    return ddl
+
+
+def apply_skip_indexes(conn, table: Table) -> list[str]:
+    """Add the skip indexes declared on ``table`` that its ClickHouse table lacks
+
+    An index whose definition changed is dropped and added again. Existing
+    parts are indexed by a background mutation, new parts as they are
+    written.
+
+    Returns:
+        list: names of the added indexes
+    """
+    existing = {
+        row[0]: tuple(row[1:])
+        for row in conn.execute(
+            text(
+                "SELECT name, type_full, expr, granularity FROM system.data_skipping_indices "
+                "WHERE database = currentDatabase() AND table = :table"
+            ),
+            {"table": table.name},
+        )
+    }
+    added = []
+    for index in skip_indexes(table):
+        definition = (index.type, index.expression, index.granularity)
+        if index.name in existing and tuple(existing[index.name]) == definition:
+            continue
+        if index.name in existing:
+            conn.execute(text(f"ALTER TABLE {table.name} DROP INDEX {index.name}"))
+        conn.execute(text(f"ALTER TABLE {table.name} ADD {index.clause()}"))
+        conn.execute(text(f"ALTER TABLE {table.name} MATERIALIZE INDEX {index.name}"))
+        added.append(index.name)
+    return added
+
+
+def _rollup_select(table: Table, source: str = StatisticLog.__tablename__) -> str:
+    dimensions = ", ".join(ROLLUP_DIMENSIONS)
+    return (
+        f"SELECT {rollup_of(table).bucket_function}(utc_timestamp) AS bucket, {dimensions}, "
+        f"count() AS events, uniqState(user_id) AS users FROM {source} "
+        f"GROUP BY bucket, {dimensions}"
+    )
+
+
+def rollup_view_ddl(table: Table) -> str:
+    """Materialized view feeding a rollup table from every insert into statistic_log"""
+    return f"CREATE MATERIALIZED VIEW IF NOT EXISTS {table.name}_mv TO {table.name} AS {_rollup_select(table)}"
+
+
+def create_rollup_views(conn) -> None:
+    """Create the views feeding the rollups, on a statistic_log with the model layout"""
+    for table in STATISTIC_LOG_ROLLUPS:
+        conn.execute(text(rollup_view_ddl(table)))
+
+
+def rebuild_rollup(conn, table: Table, since: date | None = None) -> None:
+    """Recompute a rollup from the rows of statistic_log, from the month of ``since`` on
+
+    The view only sees rows inserted after it was created, and counts every
+    inserted row, including the retries and replays ReplacingMergeTree
+    later collapses in statistic_log. Rebuilding reads statistic_log with
+    ``FINAL``, so it counts each event once. Events inserted while the
+    rollup is being rebuilt may be counted twice.
+    """
+    source = StatisticLog.__tablename__
+    if config.STATISTIC_LOG_ENGINE == "ReplacingMergeTree":
+        source += " FINAL"
+    if since is None:
+        conn.execute(text(f"TRUNCATE TABLE {table.name}"))
+    else:
+        month = since.replace(day=1)
+        partitions = conn.execute(
+            text(
+                "SELECT DISTINCT partition_id FROM system.parts "
+                "WHERE database = currentDatabase() AND table = :table AND active AND partition_id >= :month"
+            ),
+            {"table": table.name, "month": f"{month:%Y%m}"},
+        )
+        for (partition,) in list(partitions):
+            conn.execute(text(f"ALTER TABLE {table.name} DROP PARTITION ID '{partition}'"))
+        source += f" WHERE utc_timestamp >= '{month:%Y-%m-%d}'"
+    conn.execute(text(f"INSERT INTO {table.name} {_rollup_select(table, source)}"))
+
+
+def _table_layout(conn, name: str) -> tuple | None:
+    return conn.execute(
+        text(
+            "SELECT engine, partition_key, sorting_key, primary_key FROM system.tables "
+            "WHERE database = currentDatabase() AND name = :name"
+        ),
+        {"name": name},
+    ).first()
+
+
+def _table_columns(conn, name: str) -> dict[str, tuple]:
+    return {
+        row[0]: tuple(row[1:])
+        for row in conn.execute(
+            text(
+                "SELECT name, type, compression_codec FROM system.columns "
+                "WHERE database = currentDatabase() AND table = :table"
+            ),
+            {"table": name},
+        )
+    }
+
+
+def _active_parts(conn, name: str) -> list[str]:
+    return [
+        row[0]
+        for row in conn.execute(
+            text(
+                "SELECT name FROM system.parts "
+                "WHERE database = currentDatabase() AND table = :table AND active"
+            ),
+            {"table": name},
+        )
+    ]
+
+
+def migrate_table(engine: Engine, table: Table, conversions: dict[str, str] | None = None) -> bool:
+    """Rebuild ``table`` on one node when its layout or column types differ from the model
+
+    The rows are copied into a table created from the model, the two tables
+    are exchanged atomically, and rows inserted into the old table during the
+    copy are carried over. Merges of an old MergeTree table are stopped
+    during the rebuild, so those rows are the ones of the parts created
+    after the copy started; rows of other engines are carried over by id.
+    The old table is kept as ``<table>_before_<timestamp>`` until it is
+    dropped by hand.
+
+    Args:
+        engine (Engine): engine of the node
+        table (Table): model table
+        conversions (dict[str, str]): SELECT expressions filling model columns
+            from old rows, for columns whose type changed or that are new
+
+    Returns:
+        bool: whether the table was rebuilt
+    """
+    conversions = conversions or {}
+    staging = f"{table.name}__migrating"
+    with engine.connect() as conn:
+        current = _table_layout(conn, table.name)
+        if current is None:
+            conn.execute(text(table_ddl(table)))
+            return False
+
+        conn.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+        conn.execute(text(table_ddl(table, staging)))
+        existing = _table_columns(conn, table.name)
+        target = _table_layout(conn, staging)
+        if tuple(target) == tuple(current) and _table_columns(conn, staging) == existing:
+            conn.execute(text(f"DROP TABLE {staging}"))
+            return False
+
+        selected = {
+            column.name: conversions.get(column.name, column.name)
+            for column in table.columns
+            if column.name in conversions or column.name in existing
+        }
+        columns = ", ".join(selected)
+        expressions = ", ".join(selected.values())
+        logger.info("Rebuilding %s: %s -> %s", table.name, tuple(current), tuple(target))
+        merge_tree = current[0].endswith("MergeTree")
+        source = table.name
+        try:
+            if merge_tree:
+                conn.execute(text(f"SYSTEM STOP MERGES {source}"))
+                copied = _active_parts(conn, source)
+                # Part names are generated by the server, so they need no escaping
+                catch_up = f"_part NOT IN ({', '.join(repr(part) for part in copied)})" if copied else "1"
+            else:
+                # Tables without data parts, e.g. Memory, hold their rows in RAM already
+                catch_up = f"id NOT IN (SELECT id FROM {table.name})"
+            conn.execute(text(f"INSERT INTO {staging} ({columns}) SELECT {expressions} FROM {source}"))
+            conn.execute(text(f"EXCHANGE TABLES {table.name} AND {staging}"))
+            source = staging
+            conn.execute(
+                text(
+                    f"INSERT INTO {table.name} ({columns}) SELECT {expressions} FROM {source} "
+                    f"WHERE {catch_up}"
+                )
+            )
+            backup = f"{table.name}_before_{datetime.utcnow():%Y%m%d%H%M%S}"
+            conn.execute(text(f"RENAME TABLE {source} TO {backup}"))
+            source = backup
+        finally:
+            if merge_tree:
+                conn.execute(text(f"SYSTEM START MERGES {source}"))
+    return True
+
+
+# SELECT expressions turning rows of older statistic_log layouts into the
+# model's columns; timestamps used to be strings
+STATISTIC_LOG_CONVERSIONS = {
+    "utc_timestamp": "parseDateTime64BestEffortOrZero(toString(utc_timestamp), 3, 'UTC')",
+    "local_timestamp": "parseDateTime64BestEffortOrZero(toString(local_timestamp), 3, 'UTC')",
+    "local_date": "toDate(parseDateTime64BestEffortOrZero(toString(local_timestamp), 3, 'UTC'))",
+}
+
+
+def migrate_clickhouse_tables():
+    """Bring the statistic_log layout of every shard in line with the model
+
+    The skip indexes and rollup views ``create_clickhouse_tables`` left out
+    of an outdated table are added once it is rebuilt. The rows carried
+    over after the tables are exchanged reach the rollup views a second
+    time, so the rollups of a rebuilt shard are rebuilt too.
+    """
+    for name, engine in zip(clickhouse_shards.names, clickhouse_shards.shards):
+        rebuilt = migrate_table(engine, StatisticLog.__table__, STATISTIC_LOG_CONVERSIONS)
+        with engine.begin() as conn:
+            add_skip_indexes(conn, name)
+            create_rollup_views(conn)
+        if rebuilt:
+            print(f"✅ {StatisticLog.__tablename__} rebuilt on {name}")
+            rebuild_clickhouse_rollups(engine)
+        else:
+            print(f"✅ {StatisticLog.__tablename__} already up to date on {name}")
+
+
+def rebuild_clickhouse_rollups(engine: Engine | None = None, since: date | None = None):
+    """Rebuild the statistic_log rollups of one shard, or of every shard, from the month of ``since`` on"""
+    for name, shard in zip(clickhouse_shards.names, clickhouse_shards.shards):
+        if engine is not None and shard is not engine:
+            continue
+        with shard.connect() as conn:
+            for table in STATISTIC_LOG_ROLLUPS:
+                rebuild_rollup(conn, table, since)
+        print(f"✅ statistic_log rollups rebuilt on {name}")
+
+
 def check_clickhouse_connection():
     """Check if ClickHouse connection is successful"""
     try:
@@ -57,6 +384,10 @@ if __name__ == "__main__":
 
     if check_clickhouse_connection():
         create_clickhouse_tables()
+        if sys.argv[1:] == ["migrate"]:
+            migrate_clickhouse_tables()
+        elif sys.argv[1:2] == ["rollups"]:
+            rebuild_clickhouse_rollups(since=date.fromisoformat(sys.argv[2]) if sys.argv[2:] else None)
     else:
         print("❌ Cannot proceed without ClickHouse connection")
 
@@ -2,7 +2,10 @@ class CustomException(Exception):
     code = 400
     error_code = "BAD_GATEWAY"
     message = "BAD GATEWAY"
+    headers = None
 
-    def __init__(self, message=None):
+    def __init__(self, message=None, headers=None):
         if message:
             self.message = message
+        if headers:
+            self.headers = headers
@@ -0,0 +1,12 @@
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from core.helpers import serializer
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by the orjson/ujson serializer"""
+
+    def render(self, content: Any) -> bytes:
+        return serializer.dumps(content)
@@ -0,0 +1,70 @@
+import importlib.util
+import logging
+import os
+from typing import Any
+
+from gunicorn.app.base import BaseApplication
+from gunicorn.util import import_app
+
+from core.config import config
+from core.db.clickhouse_session import dispose_connections
+
+logger = logging.getLogger(__name__)
+
+# uvicorn picks these up on its own ("auto" loop and http) when installed
+SPEEDUPS = ("uvloop", "httptools")
+
+
+def worker_count() -> int:
+    """Configured number of workers, else one per CPU this process may run on"""
+    if config.COUNT_WORKERS_UVICORN > 0:
+        return config.COUNT_WORKERS_UVICORN
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def post_fork(server, worker) -> None:
+    # The app is imported once in the master, so each worker must drop the
+    # ClickHouse connections it inherited and open its own
+    dispose_connections(close=False)
+
+
+def gunicorn_options(*, host: str, port: int, workers: int) -> dict[str, Any]:
+    return {
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "post_fork": post_fork,
+        "graceful_timeout": config.GRACEFUL_TIMEOUT,
+        "keepalive": 5,
+    }
+
+
+class GunicornServer(BaseApplication):
+    """gunicorn master running the ASGI app in uvicorn worker processes
+
+    The app is preloaded so workers fork with the imported code shared
+    copy-on-write, and per-worker connections are opened after the fork.
+    """
+
+    def __init__(self, app_uri: str, options: dict[str, Any]):
+        self.app_uri = app_uri
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return import_app(self.app_uri)
+
+
+def serve(app_uri: str, *, host: str, port: int, workers: int | None = None) -> None:
+    workers = workers or worker_count()
+    speedups = [name for name in SPEEDUPS if importlib.util.find_spec(name) is not None]
+    logger.info("Starting %d workers on %s:%d, speedups: %s", workers, host, port, speedups or "none")
+    GunicornServer(app_uri, gunicorn_options(host=host, port=port, workers=workers)).run()
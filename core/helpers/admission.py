@@ -0,0 +1,39 @@
+class AdmissionControl:
+    """Admit or shed work based on the depth of a queue.
+
+    Once the depth reaches ``high_watermark`` every request is rejected until
+    it drains back down to ``low_watermark``. The gap between the two keeps
+    the gate from flapping open and closed around a single threshold.
+    """
+
+    def __init__(self, *, high_watermark: int, low_watermark: int):
+        if low_watermark > high_watermark:
+            raise ValueError("low_watermark must not exceed high_watermark")
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+
+        self.saturated = False
+        self.admitted = 0
+        self.rejected = 0
+
+    def admit(self, depth: int) -> bool:
+        """Return whether a request may be queued at the current ``depth``"""
+        if self.saturated:
+            self.saturated = depth > self.low_watermark
+        else:
+            self.saturated = depth >= self.high_watermark
+
+        if self.saturated:
+            self.rejected += 1
+            return False
+        self.admitted += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "saturated": self.saturated,
+            "high_watermark": self.high_watermark,
+            "low_watermark": self.low_watermark,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,37 @@
+from collections import OrderedDict
+
+
+class RecentKeys:
+    """Bounded LRU set of recently seen keys.
+
+    Used to drop retried events before they are buffered. Only the last
+    ``max_size`` keys are remembered, so a retry arriving after that many
+    newer events gets through and is left to the table engine to collapse.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._keys: OrderedDict[str, None] = OrderedDict()
+
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def seen(self, key: str) -> bool:
+        """Return whether ``key`` was seen recently, remembering it if not"""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            self.hits += 1
+            return True
+        self._keys[key] = None
+        if len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+        return False
+
+    def discard(self, key: str) -> None:
+        """Forget ``key``, so a retry of an event that failed is accepted"""
+        self._keys.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"size": len(self._keys), "max_size": self.max_size, "duplicates": self.hits}
@@ -0,0 +1,81 @@
+import hashlib
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+
+
+def _format(value: int) -> str:
+    h = f"{value:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def _worker_bits() -> int:
+    digest = hashlib.blake2b(f"{socket.gethostname()}:{os.getpid()}".encode(), digest_size=2).digest()
+    return int.from_bytes(digest, "big")
+
+
+class UUID7Generator:
+    """Monotonic UUIDv7 strings (RFC 9562), sortable by creation time.
+
+    Layout: 48 bits of unix milliseconds, the version, a 12 bit counter
+    ordering ids created in the same millisecond, the variant, 16 bits
+    identifying the process and 46 random bits. When the counter runs out,
+    or the clock steps back, the millisecond is carried forward so ids never
+    go backwards within a process. The process bits are recomputed after a
+    fork, so preforked workers do not share a sequence.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        self._ms = 0
+        self._counter = 0
+        self._worker = _worker_bits() << 46
+
+    def __call__(self) -> str:
+        with self._lock:
+            ms = time.time_ns() // 1_000_000
+            if ms > self._ms:
+                self._ms, self._counter = ms, 0
+            elif self._counter < 0xFFF:
+                self._counter += 1
+            else:
+                self._ms, self._counter = self._ms + 1, 0
+            ms, counter = self._ms, self._counter
+        return _format(
+            (ms << 80)
+            | (0x7 << 76)
+            | (counter << 64)
+            | (0b10 << 62)
+            | self._worker
+            | random.getrandbits(46)
+        )
+
+
+def derived_uuid(at: datetime, key: str) -> str:
+    """UUIDv8 string made of the milliseconds of ``at`` and a hash of ``key``
+
+    The same key and time always give the same id, and ids still sort by
+    time like UUIDv7. Naive datetimes are taken as UTC.
+    """
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    ms = int(at.timestamp() * 1000) & 0xFFFFFFFFFFFF
+    digest = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=10).digest(), "big")
+    return _format(
+        (ms << 80)
+        | (0x8 << 76)
+        | ((digest >> 68) << 64)
+        | (0b10 << 62)
+        | (digest & 0x3FFFFFFFFFFFFFFF)
+    )
+
+
+# Process wide generator of event ids
+uuid7 = UUID7Generator()
@@ -0,0 +1,45 @@
+from functools import lru_cache
+from typing import Any
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    orjson = None
+import msgpack
+import ujson
+
+# orjson when installed, ujson otherwise
+BACKEND = "orjson" if orjson is not None else "ujson"
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize ``obj`` to compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode()
+
+
+def loads(data: bytes | str) -> Any:
+    """Parse JSON, raising ``ValueError`` on malformed input"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return ujson.loads(data)
+
+
+@lru_cache(maxsize=None)
+def _adapter(cls: type) -> TypeAdapter:
+    return TypeAdapter(cls)
+
+
+def dump_model(model: Any) -> str:
+    """Serialize a pydantic model or dataclass straight to JSON, without an intermediate dict"""
+    if isinstance(model, BaseModel):
+        return model.model_dump_json()
+    return _adapter(type(model)).dump_json(model).decode()
+
+
+def unpackb(data: bytes) -> Any:
+    """Decode a MessagePack document, raising ``ValueError`` on malformed input"""
+    return msgpack.unpackb(data)
@@ -4,7 +4,7 @@ import click
 import uvicorn
 
 from core.config import config
-from core.db.init_clickhouse import create_clickhouse_tables, check_clickhouse_connection
+from core.fastapi.server import serve
 
 import asyncio
 import logging
@@ -31,20 +31,18 @@ logger = logging.getLogger(__name__)
 def main(env: str, debug: bool):
     os.environ["ENV"] = env
     os.environ["DEBUG"] = str(debug)
+    if env == "prod":
+        serve("app.server:app", host=config.APP_HOST, port=config.APP_PORT)
+        return
     uvicorn.run(
         app="app.server:app",
         host=config.APP_HOST,
         port=config.APP_PORT,
-        reload=True if config.ENV != "production" else False,
+        reload=True,
         workers=1,
     )
 
 
 if __name__ == "__main__":
-    print("🔧 Initializing ClickHouse...")
-
-    if check_clickhouse_connection():
-        create_clickhouse_tables()
-    else:
-        print("❌ Cannot proceed without ClickHouse connection")
+    # ClickHouse tables are created and checked by each worker on startup
     main()
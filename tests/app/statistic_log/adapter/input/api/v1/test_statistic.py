@@ -0,0 +1,257 @@
+from datetime import datetime
+from unittest.mock import AsyncMock
+
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+
+from app.container import Container
+from app.statistic_log.adapter.output.persistence.repository_adapter import StatisticRepositoryAdapter
+from app.statistic_log.adapter.output.persistence.sqlalchemy.statistic_sqlalchemy import (
+    StatisticLogSQLAlchemyRepo,
+)
+from app.statistic_log.application.service.statistic import StatisticService
+from app.statistic_log.domain.vo.outcome import LogOutcome
+from app.server import app
+from tests.support.token import USER_ID_1_TOKEN
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def container():
+    return Container()
+
+
+def test_logs_batch_json_array(container):
+    # Given
+    usecase = AsyncMock()
+    body = [{"user_id": "1"}, {"user_id": 2}]
+
+    # When
+    with container.statistic_service.override(usecase):
+        response = client.post("/api/v1/statistic/logs/batch", json=body)
+
+    # Then
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 1
+    assert [item["status"] for item in response.json()["items"]] == ["Success", "Failed"]
+    commands = usecase.create_logs.await_args.kwargs["commands"]
+    assert [command.user_id for command in commands] == ["1"]
+
+
+def test_logs_batch_reports_outcome_of_each_item(container):
+    # Given
+    usecase = AsyncMock()
+    usecase.create_logs.return_value = [LogOutcome.ACCEPTED, LogOutcome.DUPLICATE, LogOutcome.FAILED]
+    body = [{"msg_id": "a"}, {"msg_id": 1}, {"msg_id": "b"}, {"msg_id": "c"}]
+
+    # When
+    with container.statistic_service.override(usecase):
+        response = client.post("/api/v1/statistic/logs/batch", json=body)
+
+    # Then
+    assert response.status_code == 200
+    assert (response.json()["accepted"], response.json()["duplicates"], response.json()["rejected"]) == (1, 1, 2)
+    items = response.json()["items"]
+    assert [item["status"] for item in items] == ["Success", "Failed", "Duplicate", "Failed"]
+    assert [item["status_code"] for item in items] == [0, 1, 0, 1]
+    assert items[3]["message"] == "Rejected by storage"
+
+
+def test_logs_batch_ndjson(container):
+    # Given
+    usecase = AsyncMock()
+    body = b'{"msg_id": "a"}\n{invalid\n\n{"msg_id": "b"}'
+
+    # When
+    with container.statistic_service.override(usecase):
+        response = client.post(
+            "/api/v1/statistic/logs/batch",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+    # Then
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 2
+    assert response.json()["rejected"] == 1
+    commands = usecase.create_logs.await_args.kwargs["commands"]
+    assert [command.msg_id for command in commands] == ["a", "b"]
+
+
+def test_logs_batch_rejects_non_array_body():
+    # When
+    response = client.post("/api/v1/statistic/logs/batch", json={"user_id": "1"})
+
+    # Then
+    assert response.status_code == 400
+    assert response.json()["error_code"] == "STATISTIC__INVALID_BATCH_BODY"
+
+
+def test_log_rejected_when_ingestion_saturated(container):
+    # Given
+    repo = StatisticLogSQLAlchemyRepo()
+    repo.spool = None
+    repo.admission.saturated = True
+    repo.admission.low_watermark = -1
+    service = StatisticService(repository=StatisticRepositoryAdapter(statistic_repo=repo))
+
+    # When
+    with container.statistic_service.override(service):
+        response = client.post("/api/v1/statistic/log", json={"user_id": "1"})
+
+    # Then
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["error_code"] == "STATISTIC__INGESTION_OVERLOADED"
+    assert len(repo.buffer) == 0
+
+
+def test_log_msgpack(container):
+    # Given
+    usecase = AsyncMock()
+    body = msgpack.packb({"user_id": "1", "page_keywords": ["a", "b"]})
+
+    # When
+    with container.statistic_service.override(usecase):
+        response = client.post(
+            "/api/v1/statistic/log",
+            content=body,
+            headers={"Content-Type": "application/msgpack"},
+        )
+
+    # Then
+    assert response.status_code == 200
+    command = usecase.create_log.await_args.kwargs["command"]
+    assert command.user_id == "1"
+    assert command.page_keywords == ["a", "b"]
+
+
+def test_log_rejects_invalid_fields(container):
+    # Given
+    usecase = AsyncMock()
+
+    # When
+    with container.statistic_service.override(usecase):
+        response = client.post("/api/v1/statistic/log", json={"user_id": 1})
+
+    # Then
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "user_id"]
+    usecase.create_log.assert_not_awaited()
+
+
+def test_log_rejects_malformed_msgpack():
+    # When
+    response = client.post(
+        "/api/v1/statistic/log",
+        content=b"\xc1",
+        headers={"Content-Type": "application/msgpack"},
+    )
+
+    # Then
+    assert response.status_code == 400
+
+
+def test_logs_batch_msgpack(container):
+    # Given
+    usecase = AsyncMock()
+    body = msgpack.packb([{"msg_id": "a"}, {"msg_id": 1}])
+
+    # When
+    with container.statistic_service.override(usecase):
+        response = client.post(
+            "/api/v1/statistic/logs/batch",
+            content=body,
+            headers={"Content-Type": "application/msgpack"},
+        )
+
+    # Then
+    assert response.status_code == 200
+    assert response.json()["accepted"] == 1
+    commands = usecase.create_logs.await_args.kwargs["commands"]
+    assert [command.msg_id for command in commands] == ["a"]
+
+
+def test_conversation_logs(container):
+    # Given
+    usecase = AsyncMock()
+    usecase.get_conversation_logs.return_value = [{"id": "1", "activity_type": "send_message"}]
+
+    # When
+    with container.statistic_service.override(usecase):
+        response = client.get(
+            "/api/v1/statistic/conversations/conversation-1/logs",
+            params={"activity_type": "send_message", "limit": 10},
+            headers={"Authorization": f"Bearer {USER_ID_1_TOKEN}"},
+        )
+
+    # Then
+    assert response.status_code == 200
+    assert response.json() == {"count": 1, "items": [{"id": "1", "activity_type": "send_message"}]}
+    usecase.get_conversation_logs.assert_awaited_once_with(
+        conversation_id="conversation-1", activity_type="send_message", limit=10
+    )
+
+
+def test_message_logs_requires_authentication(container):
+    # Given
+    usecase = AsyncMock()
+
+    # When
+    with container.statistic_service.override(usecase):
+        response = client.get("/api/v1/statistic/messages/msg-1/logs")
+
+    # Then
+    assert response.status_code == 401
+    usecase.get_message_logs.assert_not_awaited()
+
+
+def test_stats(container):
+    # Given
+    usecase = AsyncMock()
+    usecase.get_stats.return_value = {
+        "granularity": "hour",
+        "start": datetime(2024, 3, 1),
+        "end": datetime(2024, 3, 2),
+        "items": [{"agent_name": "Chrome", "events": 3, "users": 2}],
+    }
+
+    # When
+    with container.statistic_service.override(usecase):
+        response = client.get(
+            "/api/v1/statistic/stats",
+            params={
+                "start": "2024-03-01T07:00:00+07:00",
+                "end": "2024-03-02T00:00:00",
+                "interval": "hour",
+                "group_by": ["agent_name", "agent_name"],
+            },
+            headers={"Authorization": f"Bearer {USER_ID_1_TOKEN}"},
+        )
+
+    # Then
+    assert response.status_code == 200
+    assert response.json()["granularity"] == "hour"
+    query = usecase.get_stats.await_args.kwargs["query"]
+    assert (query.start, query.end) == (datetime(2024, 3, 1), datetime(2024, 3, 2))
+    assert query.group_by == ("agent_name",)
+
+
+def test_stats_rejects_too_many_buckets(container):
+    # Given
+    usecase = AsyncMock()
+
+    # When
+    with container.statistic_service.override(usecase):
+        response = client.get(
+            "/api/v1/statistic/stats",
+            params={"start": "2020-01-01T00:00:00", "end": "2024-01-01T00:00:00", "interval": "minute"},
+            headers={"Authorization": f"Bearer {USER_ID_1_TOKEN}"},
+        )
+
+    # Then
+    assert response.status_code == 400
+    assert response.json()["error_code"] == "STATISTIC__INVALID_STATS_RANGE"
+    usecase.get_stats.assert_not_awaited()
@@ -0,0 +1,150 @@
+from unittest.mock import Mock
+
+import pytest
+from fastapi import HTTPException
+from kombu.exceptions import EncodeError, OperationalError
+
+from app.statistic_log.adapter.output.persistence.celery.statistic_celery import StatisticLogCeleryRepo
+from celery_task.tasks.statistic import ingest_statistic_logs
+from core.db.clickhouse_spool import Spool
+from app.statistic_log.application.exception import IngestionOverloadedException
+from app.statistic_log.domain.command import CreateStatisticLogCommand
+from app.statistic_log.domain.vo.outcome import LogOutcome
+
+
+@pytest.mark.asyncio
+async def test_create_logs_enqueues_chunks():
+    # Given
+    task = Mock()
+    repo = StatisticLogCeleryRepo(task=task)
+    repo.chunk_size = 2
+    commands = [CreateStatisticLogCommand(user_id=str(i)) for i in range(5)]
+
+    # When
+    await repo.create_logs(data=commands)
+
+    # Then
+    chunks = [call.args[0][0] for call in task.apply_async.call_args_list]
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert chunks[0][0]["user_id"] == "0"
+    assert repo.enqueued_tasks == 3
+
+
+@pytest.mark.asyncio
+async def test_create_log_buffers_until_close():
+    # Given
+    task = Mock()
+    repo = StatisticLogCeleryRepo(task=task)
+
+    # When
+    await repo.create_log(data=CreateStatisticLogCommand(msg_id="m"))
+    await repo.create_log(data=CreateStatisticLogCommand(msg_id="m"))
+    await repo.create_log(data=CreateStatisticLogCommand(msg_id="n"))
+    await repo.close()
+
+    # Then
+    task.apply_async.assert_called_once()
+    assert [event["msg_id"] for event in task.apply_async.call_args.args[0][0]] == ["m", "n"]
+
+
+@pytest.mark.asyncio
+async def test_create_log_is_shed_while_saturated():
+    # Given
+    task = Mock()
+    repo = StatisticLogCeleryRepo(task=task)
+    repo.admission.high_watermark = repo.admission.low_watermark = 1
+    await repo.create_log(data=CreateStatisticLogCommand(msg_id="m"))
+
+    # When, Then
+    with pytest.raises(IngestionOverloadedException):
+        await repo.create_log(data=CreateStatisticLogCommand(msg_id="n"))
+    assert repo.stats()["admission"]["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_enqueued_events_carry_row_id_and_arrival_time():
+    # Given
+    task = Mock()
+    repo = StatisticLogCeleryRepo(task=task)
+
+    # When
+    await repo.create_logs(data=[CreateStatisticLogCommand(user_id="1")])
+
+    # Then
+    event = task.apply_async.call_args.args[0][0][0]
+    assert event["id"]
+    assert event["received_at"]
+
+
+@pytest.mark.asyncio
+async def test_events_the_broker_refuses_are_spooled_and_published_later(tmp_path):
+    # Given
+    task = Mock()
+    task.apply_async.side_effect = [OperationalError("broker down"), None]
+    repo = StatisticLogCeleryRepo(task=task)
+    repo.spool = Spool(directory=str(tmp_path / "spool"), segment_bytes=1024 * 1024)
+    await repo.create_log(data=CreateStatisticLogCommand(msg_id="m"))
+
+    # When
+    await repo.close()
+    replayed = await repo.spool.drain(repo._enqueue, batch_rows=10)
+
+    # Then
+    assert replayed == 1
+    assert task.apply_async.call_args.args[0][0][0]["msg_id"] == "m"
+
+
+@pytest.mark.asyncio
+async def test_create_logs_reports_dead_lettered_and_duplicate_events():
+    # Given
+    task = Mock()
+    task.apply_async.side_effect = [None, EncodeError("cannot encode")]
+    repo = StatisticLogCeleryRepo(task=task)
+    repo.chunk_size = 2
+    repo.spool = Mock()
+    commands = [CreateStatisticLogCommand(msg_id=f"m-{i}") for i in range(3)]
+
+    # When
+    outcomes = await repo.create_logs(data=commands + [CreateStatisticLogCommand(msg_id="m-0")])
+
+    # Then
+    assert outcomes == [LogOutcome.ACCEPTED, LogOutcome.ACCEPTED, LogOutcome.FAILED, LogOutcome.DUPLICATE]
+    assert repo.spool.dead_letter.call_args.args[0][0]["msg_id"] == "m-2"
+
+
+@pytest.mark.asyncio
+async def test_failed_publish_without_spool_accepts_retry():
+    # Given
+    task = Mock()
+    task.apply_async.side_effect = [OperationalError("broker down"), None]
+    repo = StatisticLogCeleryRepo(task=task)
+    repo.spool = None
+    command = CreateStatisticLogCommand(msg_id="m", activity_type="send_message")
+
+    # When
+    with pytest.raises(HTTPException):
+        await repo.create_logs(data=[command])
+    await repo.create_logs(data=[command])
+
+    # Then
+    assert task.apply_async.call_count == 2
+
+
+def test_depth_counts_broker_backlog_as_full_chunks():
+    # Given
+    repo = StatisticLogCeleryRepo(task=Mock())
+    repo.chunk_size = 100
+
+    # When
+    repo.backlog_tasks = 3
+
+    # Then
+    assert repo.depth == 300
+
+
+def test_queue_length_of_undeclared_queue_is_zero():
+    # Given
+    repo = StatisticLogCeleryRepo(task=ingest_statistic_logs)
+
+    # When, Then
+    assert repo._queue_length() == 0
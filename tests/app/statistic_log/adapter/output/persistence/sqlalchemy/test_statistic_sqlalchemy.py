@@ -0,0 +1,243 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from clickhouse_driver.errors import Error as ClickHouseError, NetworkError
+from fastapi import HTTPException
+
+from app.statistic_log.adapter.output.persistence.sqlalchemy.statistic_sqlalchemy import (
+    StatisticLogSQLAlchemyQueryRepo,
+    StatisticLogSQLAlchemyRepo,
+)
+from app.statistic_log.adapter.output.persistence.sqlalchemy import statistic_sqlalchemy
+from app.statistic_log.adapter.output.persistence.sqlalchemy.statistic_sqlalchemy import SHARD_KEY_INDEX
+from app.statistic_log.domain.command import CreateStatisticLogCommand, StatisticStatsQuery
+from app.statistic_log.domain.vo.outcome import LogOutcome
+from core.db.clickhouse_shards import ShardSet
+
+
+@pytest.fixture
+def repo():
+    repo = StatisticLogSQLAlchemyRepo()
+    repo.spool = None
+    return repo
+
+
+@pytest.mark.asyncio
+async def test_create_log_drops_retries(repo):
+    # Given
+    command = CreateStatisticLogCommand(msg_id="m", activity_type="send_message")
+
+    # When
+    await repo.create_log(data=command)
+    await repo.create_log(data=CreateStatisticLogCommand(msg_id="m", activity_type="send_message"))
+    await repo.create_log(data=CreateStatisticLogCommand(msg_id="m", activity_type="copy_answer"))
+
+    # Then
+    assert len(repo.buffer) == 2
+    assert repo.recent_keys.hits == 1
+
+
+@pytest.mark.asyncio
+async def test_create_logs_drops_retries(repo):
+    # Given
+    repo._insert_shard = AsyncMock()
+    commands = [CreateStatisticLogCommand() for _ in range(3)]
+    for i, command in enumerate(commands):
+        command.idempotency_key = f"k:{i}"
+
+    # When
+    await repo.create_logs(data=commands[:2])
+    outcomes = await repo.create_logs(data=commands)
+
+    # Then
+    assert outcomes == [LogOutcome.DUPLICATE, LogOutcome.DUPLICATE, LogOutcome.ACCEPTED]
+    rows = [row for call in repo._insert_shard.await_args_list for row in call.args[1]]
+    assert len(rows) == 3
+    assert len({row[0] for row in rows}) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_create_logs_accepts_retry(repo):
+    # Given
+    repo._insert_shard = AsyncMock(side_effect=[ClickHouseError("down"), None])
+    command = CreateStatisticLogCommand(msg_id="m")
+
+    # When
+    with pytest.raises(HTTPException):
+        await repo.create_logs(data=[command])
+    await repo.create_logs(data=[command])
+
+    # Then
+    assert repo._insert_shard.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_create_logs_writes_each_shard(repo):
+    # Given
+    repo.shards = ShardSet({"a:9000": "engine-a", "b:9000": "engine-b", "c:9000": "engine-c"})
+    commands = [CreateStatisticLogCommand(user_id=f"user-{i}") for i in range(30)]
+
+    # When
+    with patch.object(statistic_sqlalchemy, "insert_columns") as insert_columns:
+        await repo.create_logs(data=commands)
+
+    # Then
+    assert insert_columns.call_count == 3
+    for call in insert_columns.call_args_list:
+        table, columns, engine = call.args
+        assert {repo.shards.shard_for(user_id) for user_id in columns["user_id"]} == {engine}
+    assert sum(len(call.args[1]["user_id"]) for call in insert_columns.call_args_list) == 30
+
+
+@pytest.mark.asyncio
+async def test_failed_shard_is_spooled(repo):
+    # Given
+    repo.shards = ShardSet({"a:9000": "engine-a", "b:9000": "engine-b"})
+    repo.spool = Mock()
+    commands = [CreateStatisticLogCommand(user_id=f"user-{i}") for i in range(20)]
+
+    def insert_columns(table, columns, engine):
+        if engine == "engine-b":
+            raise NetworkError("down")
+
+    # When
+    with patch.object(statistic_sqlalchemy, "insert_columns", insert_columns):
+        await repo.create_logs(data=commands)
+
+    # Then
+    spooled = repo.spool.append.call_args.args[0]
+    assert spooled
+    assert {repo.shards.shard_for(row[statistic_sqlalchemy.SHARD_KEY_INDEX]) for row in spooled} == {"engine-b"}
+
+
+@pytest.mark.asyncio
+async def test_rejected_rows_are_dead_lettered_not_spooled(repo):
+    # Given
+    repo.spool = Mock()
+    commands = [CreateStatisticLogCommand(user_id=f"user-{i}") for i in range(3)]
+
+    def insert_columns(table, columns, engine):
+        raise ClickHouseError("cannot encode")
+
+    # When
+    with patch.object(statistic_sqlalchemy, "insert_columns", insert_columns):
+        outcomes = await repo.create_logs(data=commands)
+
+    # Then
+    repo.spool.append.assert_not_called()
+    assert [len(call.args[0]) for call in repo.spool.dead_letter.call_args_list] == [1, 1, 1]
+    assert outcomes == [LogOutcome.FAILED] * 3
+
+
+@pytest.mark.asyncio
+async def test_only_rejected_rows_of_a_batch_are_dead_lettered(repo):
+    # Given
+    repo.spool = Mock()
+    commands = [CreateStatisticLogCommand(user_id=f"user-{i}") for i in range(5)]
+    commands[3].idempotency_key = "k"
+    written = []
+
+    def insert_columns(table, columns, engine):
+        if "user-3" in columns["user_id"]:
+            raise ClickHouseError("cannot encode")
+        written.extend(columns["user_id"])
+
+    # When
+    with patch.object(statistic_sqlalchemy, "insert_columns", insert_columns):
+        outcomes = await repo.create_logs(data=commands)
+    with patch.object(statistic_sqlalchemy, "insert_columns", Mock()):
+        retried = await repo.create_logs(data=[commands[3]])
+
+    # Then
+    assert sorted(written) == ["user-0", "user-1", "user-2", "user-4"]
+    dead_lettered = repo.spool.dead_letter.call_args.args[0]
+    assert [row[SHARD_KEY_INDEX] for row in dead_lettered] == ["user-3"]
+    assert outcomes == [LogOutcome.ACCEPTED] * 3 + [LogOutcome.FAILED, LogOutcome.ACCEPTED]
+    assert retried == [LogOutcome.ACCEPTED]
+
+
+@pytest.mark.asyncio
+async def test_count_by_user_id_fans_out(repo):
+    # Given
+    repo.shards = ShardSet({"a:9000": "engine-a", "b:9000": "engine-b"})
+    counts = {"engine-a": 2, "engine-b": 3}
+
+    # When
+    with patch.object(statistic_sqlalchemy, "_fetch_scalar", lambda engine, query: counts[engine]):
+        count = await repo.count_by_user_id("user-1")
+
+    # Then
+    assert count == 5
+
+
+@pytest.mark.asyncio
+async def test_close_spools_rows_unwritten_at_deadline(repo):
+    # Given
+    async def slow_insert(engine, rows):
+        await asyncio.sleep(1)
+
+    repo.spool = Mock(stop=AsyncMock())
+    repo._insert_shard = slow_insert
+    await repo.create_log(data=CreateStatisticLogCommand(user_id="1"))
+
+    # When
+    await repo.close(timeout=0.01)
+
+    # Then
+    spooled = repo.spool.append.call_args.args[0]
+    assert [row[SHARD_KEY_INDEX] for row in spooled] == ["1"]
+    repo.spool.stop.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_find_by_conversation_id_merges_shards():
+    # Given
+    repo = StatisticLogSQLAlchemyQueryRepo()
+    repo.shards = ShardSet({"a:9000": "engine-a", "b:9000": "engine-b"})
+    rows = {
+        "engine-a": [{"id": "1", "utc_timestamp": 1}, {"id": "3", "utc_timestamp": 3}],
+        "engine-b": [{"id": "2", "utc_timestamp": 2}, {"id": "1", "utc_timestamp": 1}],
+    }
+    queries = []
+
+    def fetch_all(engine, query):
+        queries.append(str(query))
+        return rows[engine]
+
+    # When
+    with patch.object(statistic_sqlalchemy, "_fetch_all", fetch_all):
+        found = await repo.find_by_conversation_id("conversation-1", activity_type="send_message", limit=2)
+
+    # Then
+    assert [row["id"] for row in found] == ["1", "2"]
+    assert "statistic_log.conversation_id = " in queries[0]
+    assert "statistic_log.activity_type = " in queries[0]
+    assert "LIMIT" in queries[0]
+
+
+@pytest.mark.asyncio
+async def test_stats_adds_up_shards():
+    # Given
+    repo = StatisticLogSQLAlchemyQueryRepo()
+    repo.shards = ShardSet({"a:9000": "engine-a", "b:9000": "engine-b"})
+    rows = {
+        "engine-a": [
+            {"activity_type": "open_chat", "events": 5, "users": 2},
+            {"activity_type": "send_message", "events": 7, "users": 3},
+        ],
+        "engine-b": [{"activity_type": "open_chat", "events": 4, "users": 1}],
+    }
+    query = StatisticStatsQuery(start=datetime(2024, 3, 1), end=datetime(2024, 3, 2))
+
+    # When
+    with patch.object(statistic_sqlalchemy, "_fetch_all", lambda engine, statement: rows[engine]):
+        stats = await repo.stats(query)
+
+    # Then
+    assert stats["granularity"] == "day"
+    assert stats["items"] == [
+        {"activity_type": "open_chat", "events": 9, "users": 3},
+        {"activity_type": "send_message", "events": 7, "users": 3},
+    ]
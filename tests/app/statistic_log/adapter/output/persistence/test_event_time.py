@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+from app.statistic_log.adapter.output.persistence.event_time import event_times, time_zone_for
+
+
+def test_event_times_normalizes_utc_and_keeps_local_wall_clock():
+    # When
+    utc, local, local_date = event_times(
+        "2024-03-18T02:30:00+07:00", "2024-03-18 02:30:00", "Asia/Ho_Chi_Minh"
+    )
+
+    # Then
+    assert utc == datetime(2024, 3, 17, 19, 30)
+    assert local == datetime(2024, 3, 18, 2, 30)
+    assert local_date == date(2024, 3, 18)
+
+
+def test_event_times_derives_missing_side_from_time_zone():
+    # When
+    from_utc = event_times("2024-03-17 19:30:00", None, "Asia/Ho_Chi_Minh")
+    from_local = event_times("", "2024-03-18 02:30:00", "Asia/Ho_Chi_Minh")
+
+    # Then
+    assert from_utc == (datetime(2024, 3, 17, 19, 30), datetime(2024, 3, 18, 2, 30), date(2024, 3, 18))
+    assert from_local == from_utc
+
+
+def test_event_times_without_usable_time_uses_arrival_time():
+    # Given
+    before = datetime.utcnow()
+
+    # When
+    utc, local, _ = event_times("not a date", None, "Nowhere/Unknown")
+
+    # Then
+    assert utc >= before
+    assert local == utc
+    assert time_zone_for("Nowhere/Unknown") is None
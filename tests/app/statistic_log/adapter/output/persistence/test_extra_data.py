@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import pytest
+
+from app.statistic_log.adapter.output.persistence.extra_data import (
+    classify_value,
+    fill_extra_data,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (True, ("bool", True)),
+        (3, ("integer", 3)),
+        (1.5, ("number", 1.5)),
+        ("2024-03-18 09:15:00", ("date", datetime(2024, 3, 18, 9, 15))),
+        ("2024-02-30 09:15:00", ("string", "2024-02-30 09:15:00")),
+        ("2024-03-18T09:15:00", ("string", "2024-03-18T09:15:00")),
+        ("2024-03-18", ("string", "2024-03-18")),
+        ([1, 2], ("string", "[1, 2]")),
+        # Out of the Int32, Float32 and DateTime column ranges
+        (2**31, ("string", "2147483648")),
+        (-(2**31), ("integer", -(2**31))),
+        (1e39, ("string", "1e+39")),
+        ("1960-01-01 00:00:00", ("string", "1960-01-01 00:00:00")),
+        (datetime(2200, 1, 1), ("string", "2200-01-01 00:00:00")),
+    ],
+)
+def test_classify_value(value, expected):
+    # When
+    result = classify_value(value)
+
+    # Then
+    assert result == expected
+
+
+def test_fill_extra_data_skips_none():
+    # Given
+    record = {"integer_names": [], "integer_values": [], "string_names": [], "string_values": []}
+
+    # When
+    fill_extra_data(record, {"tabs": 2, "missing": None, 1: "x"})
+
+    # Then
+    assert record == {
+        "integer_names": ["tabs"],
+        "integer_values": [2],
+        "string_names": ["1"],
+        "string_values": ["x"],
+    }
+
+
+
+def test_fill_extra_data_stores_out_of_range_integer_as_string():
+    # Given
+    record = {"integer_names": [], "integer_values": [], "string_names": [], "string_values": []}
+
+    # When
+    fill_extra_data(record, {"tabs": 2, "bytes": 2**40})
+
+    # Then
+    assert record == {
+        "integer_names": ["tabs"],
+        "integer_values": [2],
+        "string_names": ["bytes"],
+        "string_values": ["1099511627776"],
+    }
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, timezone
+
+from app.statistic_log.adapter.output.persistence.rollup import pick_rollup, stats_select
+from app.statistic_log.domain.command import StatisticStatsQuery
+from core.db.clickhouse_session import clickhouse_engine
+
+
+def test_pick_rollup_uses_coarsest_aligned_granularity():
+    # When
+    daily = pick_rollup(datetime(2024, 3, 1), datetime(2024, 3, 8))
+    hourly = pick_rollup(datetime(2024, 3, 1, 6), datetime(2024, 3, 8))
+    by_minute = pick_rollup(datetime(2024, 3, 1), datetime(2024, 3, 8), "minute")
+
+    # Then
+    assert daily[0].name == "statistic_log_daily"
+    assert hourly[0].name == "statistic_log_hourly"
+    assert by_minute[0].name == "statistic_log_minutely"
+
+
+def test_pick_rollup_widens_unaligned_range_to_minutes():
+    # Given
+    start = datetime(2024, 3, 1, 6, 0, 30, tzinfo=timezone(timedelta(hours=7)))
+
+    # When
+    table, covered_start, covered_end = pick_rollup(start, datetime(2024, 3, 1, 1, 5, 0, 1))
+
+    # Then
+    assert table.name == "statistic_log_minutely"
+    assert covered_start == datetime(2024, 2, 29, 23, 0)
+    assert covered_end == datetime(2024, 3, 1, 1, 6)
+
+
+
+def test_pick_rollup_treats_fractional_seconds_as_unaligned():
+    # When
+    table, covered_start, covered_end = pick_rollup(
+        datetime(2024, 1, 1, 0, 0, 0, 500000), datetime(2024, 1, 3, 0, 0, 0, 500000)
+    )
+
+    # Then
+    assert table.name == "statistic_log_minutely"
+    assert covered_start == datetime(2024, 1, 1)
+    assert covered_end == datetime(2024, 1, 3, 0, 1)
+
+def test_stats_select_groups_by_interval_and_dimensions():
+    # Given
+    query = StatisticStatsQuery(
+        start=datetime(2024, 3, 1),
+        end=datetime(2024, 3, 2),
+        interval="hour",
+        group_by=("agent_name",),
+        activity_type="send_message",
+    )
+    table, start, end = pick_rollup(query.start, query.end, query.interval)
+
+    # When
+    sql = str(
+        stats_select(table, query, start, end).compile(
+            dialect=clickhouse_engine.dialect, compile_kwargs={"literal_binds": True}
+        )
+    )
+
+    # Then
+    assert sql.startswith(
+        "SELECT toStartOfHour(statistic_log_hourly.bucket) AS time, statistic_log_hourly.agent_name, "
+        "sum(statistic_log_hourly.events) AS events, uniqMerge(statistic_log_hourly.users) AS users"
+    )
+    assert "statistic_log_hourly.activity_type = 'send_message'" in sql
+    assert "GROUP BY toStartOfHour(statistic_log_hourly.bucket), statistic_log_hourly.agent_name" in sql
@@ -0,0 +1,84 @@
+import json
+from datetime import date, datetime
+
+import pytest
+from clickhouse_sqlalchemy import types
+from sqlalchemy import Column, MetaData, String, Table
+
+from app.statistic_log.adapter.output.persistence.row_encoder import (
+    RowEncoder,
+    statistic_log_encoder,
+)
+from app.statistic_log.domain.command import CreateStatisticLogCommand
+from core.db.clickhouse_models import StatisticLog
+
+
+def test_encode_follows_table_columns():
+    # Given
+    command = CreateStatisticLogCommand(
+        user_id="1",
+        utc_timestamp="2024-03-18 02:15:00",
+        time_zone="Asia/Ho_Chi_Minh",
+        page_keywords=None,
+        extra_data={"tabs": 2, "opened_at": "2024-03-18 09:15:00"},
+    )
+
+    # When
+    row = statistic_log_encoder.to_dict(statistic_log_encoder.encode(command))
+
+    # Then
+    assert tuple(row) == tuple(column.name for column in StatisticLog.__table__.columns)
+    assert row["user_id"] == "1"
+    assert row["msg_id"] == ""
+    assert row["page_keywords"] == []
+    assert row["utc_timestamp"] == datetime(2024, 3, 18, 2, 15)
+    assert row["local_date"] == date(2024, 3, 18)
+    assert json.loads(row["_source"])["user_id"] == "1"
+    assert row["integer_names"] == ["tabs"]
+    assert row["date_values"] == [datetime(2024, 3, 18, 9, 15)]
+
+
+def test_to_columns():
+    # Given
+    rows = statistic_log_encoder.encode_many(
+        [CreateStatisticLogCommand(msg_id="a"), CreateStatisticLogCommand(msg_id="b")]
+    )
+
+    # When
+    columns = statistic_log_encoder.to_columns(rows)
+
+    # Then
+    assert list(columns) == list(statistic_log_encoder.columns)
+    assert columns["msg_id"] == ("a", "b")
+    assert columns["id"][0] != columns["id"][1]
+
+
+def test_unknown_column_is_rejected():
+    # Given
+    table = Table(
+        "t",
+        MetaData(),
+        Column("_source", String),
+        Column("tags", types.Array(String)),
+    )
+
+    # When, Then
+    with pytest.raises(ValueError, match="t.tags"):
+        RowEncoder(table, fields={"user_id"})
+
+
+def test_retries_share_row_id():
+    # Given
+    payload = {"msg_id": "m", "activity_type": "send_message", "utc_timestamp": "2024-01-01 00:00:00"}
+
+    # When
+    first, second = statistic_log_encoder.encode_many(
+        [CreateStatisticLogCommand(**payload), CreateStatisticLogCommand(**payload)]
+    )
+    anonymous = statistic_log_encoder.encode_many(
+        [CreateStatisticLogCommand(), CreateStatisticLogCommand()]
+    )
+
+    # Then
+    assert first[0] == second[0]
+    assert anonymous[0][0] != anonymous[1][0]
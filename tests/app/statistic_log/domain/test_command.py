@@ -0,0 +1,34 @@
+import pytest
+from pydantic import ValidationError
+
+from app.statistic_log.domain.command import command_adapter
+from core.helpers.serializer import dump_model
+
+
+def test_command_adapter_validates_json():
+    # When
+    command = command_adapter.validate_json(b'{"user_id": "1", "unknown": 1}')
+
+    # Then
+    assert command.user_id == "1"
+    assert command.extra_data is None
+    assert not hasattr(command, "__dict__")
+
+
+def test_command_adapter_rejects_invalid_types():
+    # When, Then
+    with pytest.raises(ValidationError):
+        command_adapter.validate_python({"page_keywords": "not a list"})
+
+
+def test_idempotency_key_is_not_read_from_body_nor_dumped():
+    # Given
+    command = command_adapter.validate_json(b'{"user_id": "1", "idempotency_key": "x"}')
+
+    # When
+    no_key = command.idempotency_key
+    command.idempotency_key = "from-header"
+
+    # Then
+    assert no_key is None
+    assert "idempotency_key" not in dump_model(command)
@@ -0,0 +1,14 @@
+from app.container import Container
+
+
+def test_statistic_service_is_shared():
+    # Given
+    container = Container()
+
+    # When
+    first = container.statistic_service()
+    second = container.statistic_service()
+
+    # Then
+    assert first is second
+    assert first.repository.statistic_repo is container.statistic_log_repo()
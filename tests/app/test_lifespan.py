@@ -0,0 +1,37 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import lifespan
+from app.server import create_app
+from core.config import config
+
+
+def test_lifespan_starts_without_clickhouse_and_drains_on_shutdown():
+    # Given
+    app_ = create_app()
+    repo = AsyncMock()
+    app_.state.container.statistic_log_repo.override(repo)
+
+    # When
+    with patch.object(lifespan, "verify_clickhouse_schema", side_effect=ConnectionError), \
+            patch.object(lifespan, "dispose_connections") as dispose:
+        with TestClient(app_):
+            repo.start.assert_awaited_once()
+            repo.close.assert_not_awaited()
+
+    # Then
+    repo.close.assert_awaited_once_with(timeout=config.SHUTDOWN_DRAIN_TIMEOUT)
+    dispose.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_fails_on_missing_columns():
+    # Given
+    problems = ["statistic_log on a:9000 lacks columns page_title"]
+
+    # When, Then
+    with patch.object(lifespan, "verify_clickhouse_schema", return_value=problems), \
+            pytest.raises(RuntimeError, match="page_title"):
+        await lifespan.warm_up_clickhouse()
@@ -0,0 +1,60 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from clickhouse_driver.errors import Error as ClickHouseError
+
+from celery_task.tasks import statistic
+from core.db.clickhouse_shards import ShardSet
+
+
+def test_ingest_statistic_logs_inserts_each_shard():
+    # Given
+    shards = ShardSet({"a:9000": "engine-a", "b:9000": "engine-b"})
+    events = [{"user_id": f"user-{i}", "msg_id": str(i)} for i in range(20)]
+
+    # When
+    with patch.object(statistic, "clickhouse_shards", shards), \
+            patch.object(statistic, "insert_columns") as insert_columns:
+        result = statistic.ingest_statistic_logs.apply(args=(events,))
+
+    # Then
+    assert result.get() == 20
+    assert {call.args[2] for call in insert_columns.call_args_list} == {"engine-a", "engine-b"}
+    assert sum(len(call.args[1]["id"]) for call in insert_columns.call_args_list) == 20
+
+
+def test_ingest_statistic_logs_retries_only_failed_shard():
+    # Given
+    shards = ShardSet({"a:9000": "engine-a", "b:9000": "engine-b"})
+    events = [{"user_id": f"user-{i}"} for i in range(20)]
+    failed_once = []
+
+    def insert_columns(table, columns, engine):
+        if engine == "engine-b" and not failed_once:
+            failed_once.append(len(columns["id"]))
+            raise ClickHouseError("down")
+
+    # When
+    with patch.object(statistic, "clickhouse_shards", shards), \
+            patch.object(statistic, "insert_columns", side_effect=insert_columns) as insert:
+        statistic.ingest_statistic_logs.apply(args=(events,))
+
+    # Then
+    rows = [len(call.args[1]["id"]) for call in insert.call_args_list]
+    assert len(rows) == 3
+    assert sum(rows) == 20 + failed_once[0]
+
+
+def test_ingest_statistic_logs_keeps_id_and_arrival_time_of_redelivered_events():
+    # Given
+    event = {"user_id": "1", "id": "0190e0e8-0000-7000-8000-000000000000", "received_at": "2024-03-17T19:30:00"}
+
+    # When
+    with patch.object(statistic, "insert_columns") as insert_columns:
+        statistic.ingest_statistic_logs.apply(args=([event],))
+        statistic.ingest_statistic_logs.apply(args=([event],))
+
+    # Then
+    columns = [call.args[1] for call in insert_columns.call_args_list]
+    assert {column["id"] for column in columns} == {(event["id"],)}
+    assert {column["utc_timestamp"] for column in columns} == {(datetime(2024, 3, 17, 19, 30),)}
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from core.db.clickhouse_buffer import InsertBuffer
+
+
+def make_buffer(batches: list, **kwargs) -> InsertBuffer:
+    async def flush(rows: list) -> None:
+        batches.append(rows)
+
+    options = {"max_rows": 3, "max_bytes": 1024, "linger": 60}
+    options.update(kwargs)
+    return InsertBuffer(flush=flush, **options)
+
+
+@pytest.mark.asyncio
+async def test_put_flushes_when_max_rows_reached():
+    # Given
+    batches = []
+    buffer = make_buffer(batches)
+
+    # When
+    for i in range(3):
+        await buffer.put({"id": i})
+    await asyncio.sleep(0)
+
+    # Then
+    assert batches == [[{"id": 0}, {"id": 1}, {"id": 2}]]
+    assert len(buffer) == 0
+
+
+@pytest.mark.asyncio
+async def test_put_flushes_when_max_bytes_reached():
+    # Given
+    batches = []
+    buffer = make_buffer(batches, max_bytes=10)
+
+    # When
+    await buffer.put({"id": 0}, size=4)
+    await buffer.put({"id": 1}, size=6)
+    await asyncio.sleep(0)
+
+    # Then
+    assert batches == [[{"id": 0}, {"id": 1}]]
+
+
+@pytest.mark.asyncio
+async def test_put_flushes_after_linger():
+    # Given
+    batches = []
+    buffer = make_buffer(batches, linger=0.01)
+
+    # When
+    await buffer.put({"id": 0})
+    await asyncio.sleep(0.05)
+
+    # Then
+    assert batches == [[{"id": 0}]]
+
+
+@pytest.mark.asyncio
+async def test_flush_counts_failed_rows():
+    # Given
+    async def flush(rows: list) -> None:
+        raise ConnectionError
+
+    buffer = InsertBuffer(flush=flush, max_rows=10, max_bytes=1024, linger=60)
+    await buffer.put({"id": 0})
+
+    # When
+    await buffer.flush()
+
+    # Then
+    assert buffer.stats()["failed_rows"] == 1
+    assert buffer.stats()["flushed_rows"] == 0
+
+
+@pytest.mark.asyncio
+async def test_drain_returns_rows_still_in_flight_at_deadline():
+    # Given
+    release = asyncio.Event()
+
+    async def flush(rows: list) -> None:
+        await release.wait()
+
+    buffer = InsertBuffer(flush=flush, max_rows=10, max_bytes=1024, linger=60)
+    await buffer.put({"id": 0})
+    await buffer.put({"id": 1})
+
+    # When
+    leftover = await buffer.drain(timeout=0.01)
+    release.set()
+    await buffer.flush()
+
+    # Then
+    assert leftover == [{"id": 0}, {"id": 1}]
+    assert buffer.stats()["inflight_flushes"] == 0
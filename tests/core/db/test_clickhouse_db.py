@@ -0,0 +1,94 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from asynch.cursors import Cursor
+
+from core.db.clickhouse_db import ClickHouse
+
+
+class FakeConnection:
+    echo = False
+
+    def __init__(self):
+        self._connection = Mock(is_query_executing=False)
+        self._connection.execute = AsyncMock(return_value=2)
+
+    def cursor(self, cursor=Cursor):
+        return cursor(self)
+
+
+def patch_connection(conn: FakeConnection):
+    @asynccontextmanager
+    async def connection():
+        yield conn
+
+    return patch.object(ClickHouse, "connection", connection)
+
+
+@pytest.mark.asyncio
+async def test_insert_many_rows():
+    # Given
+    conn = FakeConnection()
+    rows = [{"id": "1", "user_id": "a"}, {"id": "2", "user_id": "b"}]
+
+    # When
+    with patch_connection(conn):
+        sut = await ClickHouse.insert_many("statistic_log", rows)
+
+    # Then
+    assert sut is True
+    query, = conn._connection.execute.await_args.args
+    assert query == "INSERT INTO statistic_log (id, user_id) VALUES"
+    assert conn._connection.execute.await_args.kwargs["args"] == rows
+    assert "columnar" not in conn._connection.execute.await_args.kwargs
+
+
+@pytest.mark.asyncio
+async def test_insert_many_columnar():
+    # Given
+    conn = FakeConnection()
+    columns = {"id": ["1", "2"], "user_id": ("a", "b")}
+
+    # When
+    with patch_connection(conn):
+        sut = await ClickHouse.insert_many("statistic_log", columns, columnar=True)
+
+    # Then
+    assert sut is True
+    assert conn._connection.execute.await_args.kwargs["args"] == [["1", "2"], ("a", "b")]
+    assert conn._connection.execute.await_args.kwargs["columnar"] is True
+
+
+@pytest.mark.asyncio
+async def test_insert_one_sends_values_as_data():
+    # Given
+    conn = FakeConnection()
+    row = {"id": "1", "detail": "it's \"quoted\"", "page_keywords": ["a", "b"]}
+
+    # When
+    with patch_connection(conn):
+        sut = await ClickHouse.insert_one("statistic_log", row)
+
+    # Then
+    assert sut is True
+    query, = conn._connection.execute.await_args.args
+    assert query == "INSERT INTO statistic_log (id, detail, page_keywords) VALUES"
+    assert conn._connection.execute.await_args.kwargs["args"] == [
+        ("1", "it's \"quoted\"", ["a", "b"])
+    ]
+
+
+@pytest.mark.asyncio
+async def test_insert_one_returns_false_on_error(capsys):
+    # Given
+    conn = FakeConnection()
+    conn._connection.execute.side_effect = ConnectionError
+
+    # When
+    with patch_connection(conn):
+        sut = await ClickHouse.insert_one("statistic_log", {"id": "1"})
+
+    # Then
+    assert sut is False
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from core.db.clickhouse_pool import ClickHousePool, PoolTimeoutException
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.pings = 0
+        self.alive = True
+
+    async def ping(self) -> None:
+        self.pings += 1
+        if not self.alive:
+            raise ConnectionError
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def make_pool(**kwargs) -> ClickHousePool:
+    async def connect() -> FakeConnection:
+        return FakeConnection()
+
+    options = {
+        "min_size": 0,
+        "max_size": 2,
+        "max_idle_time": 60,
+        "ping_interval": 60,
+        "acquire_timeout": 0.05,
+    }
+    options.update(kwargs)
+    return ClickHousePool(connect=connect, **options)
+
+
+@pytest.mark.asyncio
+async def test_acquire_reuses_released_connection():
+    # Given
+    pool = make_pool()
+    async with pool.acquire() as first:
+        pass
+
+    # When
+    async with pool.acquire() as second:
+        stats = pool.stats()
+
+    # Then
+    assert second is first
+    assert stats["created"] == 1
+    assert stats["in_use"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_acquire_times_out_when_pool_is_exhausted():
+    # Given
+    pool = make_pool(max_size=1)
+
+    # When, Then
+    async with pool.acquire():
+        with pytest.raises(PoolTimeoutException):
+            async with pool.acquire():
+                pass
+    assert pool.stats()["acquire_timeouts"] == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_acquire_replaces_connection_failing_ping():
+    # Given
+    pool = make_pool(ping_interval=0)
+    async with pool.acquire() as first:
+        first.alive = False
+
+    # When
+    async with pool.acquire() as second:
+        pass
+
+    # Then
+    assert second is not first
+    assert first.closed is True
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_connection_is_discarded_on_error():
+    # Given
+    pool = make_pool()
+
+    # When
+    with pytest.raises(RuntimeError):
+        async with pool.acquire() as conn:
+            raise RuntimeError
+
+    # Then
+    assert conn.closed is True
+    assert pool.stats()["size"] == 0
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_reaper_closes_idle_connections_above_min_size():
+    # Given
+    pool = make_pool(min_size=1, max_idle_time=0.02)
+    async with pool.acquire() as first:
+        async with pool.acquire() as second:
+            pass
+
+    # When
+    await asyncio.sleep(0.05)
+
+    # Then
+    assert pool.stats()["size"] == 1
+    assert first.closed != second.closed
+    await pool.close()
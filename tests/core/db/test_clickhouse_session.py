@@ -0,0 +1,24 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.db.clickhouse_session import run_in_executor
+
+
+@pytest.mark.asyncio
+async def test_run_in_executor_runs_off_the_event_loop():
+    # Given
+    def blocking_call() -> str:
+        time.sleep(0.1)
+        return threading.current_thread().name
+
+    # When
+    started = time.monotonic()
+    names = await asyncio.gather(run_in_executor(blocking_call), run_in_executor(blocking_call))
+    elapsed = time.monotonic() - started
+
+    # Then
+    assert all(name.startswith("clickhouse") for name in names)
+    assert elapsed < 0.2
@@ -0,0 +1,36 @@
+from unittest.mock import patch
+
+import pytest
+
+from core.config import config
+from core.db.clickhouse_settings import compression, insert_settings
+
+
+def test_compression():
+    # When, Then
+    with patch.object(config, "CLICK_HOUSE_COMPRESSION", "LZ4"):
+        assert compression() == "lz4"
+    with patch.object(config, "CLICK_HOUSE_COMPRESSION", "none"):
+        assert compression() is False
+    with patch.object(config, "CLICK_HOUSE_COMPRESSION", "gzip"), pytest.raises(ValueError):
+        compression()
+
+
+def test_insert_settings_async_insert():
+    # Given
+    with patch.object(config, "CLICK_HOUSE_ASYNC_INSERT", False):
+        # When
+        settings = insert_settings()
+
+    # Then
+    assert settings == {"insert_block_size": config.CLICK_HOUSE_INSERT_BLOCK_SIZE}
+
+    # Given
+    with patch.object(config, "CLICK_HOUSE_ASYNC_INSERT", True), \
+            patch.object(config, "CLICK_HOUSE_WAIT_FOR_ASYNC_INSERT", False):
+        # When
+        settings = insert_settings()
+
+    # Then
+    assert settings["async_insert"] == 1
+    assert settings["wait_for_async_insert"] == 0
@@ -0,0 +1,38 @@
+from core.db.clickhouse_shards import HashRing, ShardSet, parse_shards
+
+
+def test_parse_shards():
+    # When, Then
+    assert parse_shards(" a:9000, b:9000 ,", "localhost:9000") == ["a:9000", "b:9000"]
+    assert parse_shards("", "localhost:9000") == ["localhost:9000"]
+
+
+def test_hash_ring_moves_few_keys_when_a_node_is_added():
+    # Given
+    keys = [f"user-{i}" for i in range(3000)]
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+
+    # When
+    owners = [before.node_for(key) for key in keys]
+    moved = [key for key, owner in zip(keys, owners) if after.node_for(key) != owner]
+
+    # Then
+    assert set(owners) == {0, 1, 2}
+    assert all(after.node_for(key) == 3 for key in moved)
+    assert len(moved) < len(keys) / 3
+
+
+def test_shard_set_partition_keeps_row_order():
+    # Given
+    shards = ShardSet({"a": "A", "b": "B"})
+    rows = [(f"user-{i}", i) for i in range(20)]
+
+    # When
+    groups = shards.partition(rows, 0)
+
+    # Then
+    assert sorted(row for _, group in groups for row in group) == sorted(rows)
+    for shard, group in groups:
+        assert [row[1] for row in group] == sorted(row[1] for row in group)
+        assert {shards.shard_for(row[0]) for row in group} == {shard}
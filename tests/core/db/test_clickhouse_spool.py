@@ -0,0 +1,145 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from clickhouse_driver.errors import ErrorCodes, ServerException
+
+from core.db.clickhouse_spool import DEAD_LETTER_PREFIX, HEADER, Spool, read_segment
+
+
+def make_spool(tmp_path, segment_bytes=1024 * 1024, max_attempts=10):
+    return Spool(directory=str(tmp_path / "spool"), segment_bytes=segment_bytes, max_attempts=max_attempts)
+
+
+def dead_lettered(spool):
+    return [
+        row["id"]
+        for path in sorted(spool.root.glob(f"{DEAD_LETTER_PREFIX}*"))
+        for _, rows in read_segment(path)
+        for row in rows
+    ]
+
+
+@pytest.mark.asyncio
+async def test_drain_replays_rows_in_order(tmp_path):
+    # Given
+    spool = make_spool(tmp_path, segment_bytes=64)
+    spool.append([{"id": 1}, {"id": 2}])
+    spool.append([{"id": 3}])
+    write = AsyncMock()
+
+    # When
+    replayed = await spool.drain(write, batch_rows=10)
+
+    # Then
+    assert replayed == 3
+    assert [row["id"] for call in write.await_args_list for row in call.args[0]] == [1, 2, 3]
+    assert spool.stats()["segments"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_drain_keeps_rows(tmp_path):
+    # Given
+    spool = make_spool(tmp_path)
+    spool.append([{"id": 1}])
+    spool.append([{"id": 2}])
+
+    # When
+    with pytest.raises(ConnectionError):
+        await spool.drain(AsyncMock(side_effect=ConnectionError), batch_rows=1)
+    write = AsyncMock()
+    replayed = await spool.drain(write, batch_rows=10)
+
+    # Then
+    assert replayed == 2
+    write.assert_awaited_once_with([{"id": 1}, {"id": 2}])
+
+
+@pytest.mark.asyncio
+async def test_drain_resumes_from_checkpoint(tmp_path):
+    # Given
+    spool = make_spool(tmp_path)
+    for i in range(3):
+        spool.append([{"id": i}])
+    write = AsyncMock(side_effect=[None, ConnectionError])
+
+    # When
+    with pytest.raises(ConnectionError):
+        await spool.drain(write, batch_rows=1)
+    write = AsyncMock()
+    await spool.drain(write, batch_rows=10)
+
+    # Then
+    write.assert_awaited_once_with([{"id": 1}, {"id": 2}])
+
+
+@pytest.mark.asyncio
+async def test_drain_dead_letters_rejected_record_and_goes_on(tmp_path):
+    # Given
+    spool = make_spool(tmp_path)
+    for i in range(3):
+        spool.append([{"id": i}])
+
+    async def write(rows):
+        if {"id": 1} in rows:
+            raise ValueError("cannot encode")
+
+    # When
+    replayed = await spool.drain(write, batch_rows=10)
+
+    # Then
+    assert replayed == 2
+    assert dead_lettered(spool) == [1]
+    assert spool.stats()["dead_lettered_rows"] == 1
+    assert spool.stats()["segments"] == 0
+
+
+@pytest.mark.asyncio
+async def test_drain_dead_letters_batch_after_max_attempts(tmp_path):
+    # Given
+    spool = make_spool(tmp_path, max_attempts=2)
+    spool.append([{"id": 1}])
+    write = AsyncMock(side_effect=ServerException("Too many parts", ErrorCodes.TOO_MANY_PARTS))
+
+    # When
+    first = await spool.drain(write, batch_rows=10)
+    second = await spool.drain(write, batch_rows=10)
+
+    # Then
+    assert (first, second) == (0, 0)
+    assert write.await_count == 2
+    assert dead_lettered(spool) == [1]
+    assert spool.stats()["segments"] == 0
+
+
+def test_read_segment_stops_at_torn_record(tmp_path):
+    # Given
+    spool = make_spool(tmp_path)
+    spool.append([{"id": 1}])
+    path = spool._active.name
+    with open(path, "ab") as f:
+        f.write(HEADER.pack(100, 0) + b"partial")
+
+    # When
+    records = list(read_segment(path))
+
+    # Then
+    assert [rows for _, rows in records] == [[{"id": 1}]]
+
+
+@pytest.mark.asyncio
+async def test_drain_adopts_directory_of_dead_worker(tmp_path):
+    # Given
+    crashed = make_spool(tmp_path)
+    crashed.append([{"id": 1}])
+    survivor = make_spool(tmp_path)
+    survivor.append([{"id": 2}])
+    crashed._lock.close()
+    write = AsyncMock()
+
+    # When
+    replayed = await survivor.drain(write, batch_rows=10)
+
+    # Then
+    assert replayed == 2
+    assert survivor.stats()["segments"] == 0
+    assert not crashed._dir.exists()
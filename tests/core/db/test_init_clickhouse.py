@@ -0,0 +1,252 @@
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+from core.db import init_clickhouse
+from core.db.clickhouse_models import STATISTIC_LOG_ROLLUPS, StatisticLog, StatisticLogHourly, skip_indexes
+from core.db.clickhouse_shards import ShardSet
+from core.db.init_clickhouse import (
+    STATISTIC_LOG_LAYOUT,
+    apply_skip_indexes,
+    migrate_table,
+    rebuild_rollup,
+    migrate_clickhouse_tables,
+    rollup_view_ddl,
+    statistic_log_is_current,
+    table_ddl,
+    verify_clickhouse_schema,
+)
+from tests.support.local_clickhouse import local_clickhouse  # noqa: F401
+
+# statistic_log as the first release created it
+BASELINE_STATISTIC_LOG = (
+    "CREATE TABLE statistic_log (id String, local_timestamp String, time_zone String, "
+    "utc_timestamp String, user_id String, conversation_id String, msg_id String, "
+    "activity_type String, detail String, _source String, current_url String, page_title String, "
+    "page_description String, page_keywords Array(String), user_agent String, "
+    "extension_version String, agent_name String, agent_version String, "
+    "string_names Array(String), string_values Array(String), integer_names Array(String), "
+    "integer_values Array(Int32), number_names Array(String), number_values Array(Float32), "
+    "bool_names Array(String), bool_values Array(UInt8), date_names Array(String), "
+    "date_values Array(DateTime)) ENGINE = Memory"
+)
+
+
+def make_engine(layouts: dict, columns: list[str]) -> tuple[MagicMock, list[str]]:
+    statements = []
+
+    def execute(clause, params=None):
+        sql = str(clause)
+        statements.append(sql)
+        result = MagicMock()
+        if "FROM system.tables" in sql:
+            result.first.return_value = layouts.get(params["name"])
+        elif "FROM system.columns" in sql:
+            result.__iter__.return_value = iter([(column, "String", "") for column in columns])
+        elif "FROM system.parts" in sql:
+            result.__iter__.return_value = iter([("all_1_1_0",), ("all_2_2_0",)])
+        return result
+
+    engine = MagicMock()
+    engine.connect.return_value.__enter__.return_value.execute.side_effect = execute
+    return engine, statements
+
+
+def test_table_ddl():
+    # When
+    ddl = table_ddl(StatisticLog.__table__, "statistic_log__migrating")
+
+    # Then
+    assert ddl.startswith("CREATE TABLE IF NOT EXISTS statistic_log__migrating (")
+    assert "PARTITION BY toYYYYMM(utc_timestamp)" in ddl
+    assert "ORDER BY (user_id, activity_type, utc_timestamp, id)" in ddl
+    assert "activity_type LowCardinality(String)," in ddl
+    assert "string_names Array(LowCardinality(String))," in ddl
+    assert "utc_timestamp DateTime64(3, 'UTC') CODEC(Delta, ZSTD(1))," in ddl
+    assert "_source String CODEC(ZSTD(3))," in ddl
+    assert "INDEX msg_id_bloom msg_id TYPE bloom_filter(0.01) GRANULARITY 1" in ddl
+
+
+def test_verify_clickhouse_schema_only_reads():
+    # Given
+    layouts = {"statistic_log": STATISTIC_LOG_LAYOUT, "statistic_log_hourly": ("AggregatingMergeTree",)}
+    engine, statements = make_engine(layouts, ["id", "user_id"])
+
+    # When
+    with patch.object(init_clickhouse, "clickhouse_shards", ShardSet({"a:9000": engine})):
+        problems = verify_clickhouse_schema()
+
+    # Then
+    assert "statistic_log_daily is missing on a:9000" in problems
+    assert any(problem.startswith("statistic_log on a:9000 lacks columns") for problem in problems)
+    assert all(statement.lstrip().startswith("SELECT") for statement in statements)
+
+
+def test_apply_skip_indexes_adds_missing_and_changed():
+    # Given
+    conn = MagicMock()
+    statements = []
+    existing = [
+        ("conversation_id_bloom", "bloom_filter(0.01)", "conversation_id", 1),
+        ("msg_id_bloom", "bloom_filter(0.05)", "msg_id", 1),
+    ]
+
+    def execute(clause, params=None):
+        statements.append(str(clause))
+        return iter(existing if "system.data_skipping_indices" in str(clause) else [])
+
+    conn.execute.side_effect = execute
+
+    # When
+    added = apply_skip_indexes(conn, StatisticLog.__table__)
+
+    # Then
+    assert added == ["msg_id_bloom", "activity_type_set"]
+    assert statements[1:] == [
+        "ALTER TABLE statistic_log DROP INDEX msg_id_bloom",
+        "ALTER TABLE statistic_log ADD INDEX msg_id_bloom msg_id TYPE bloom_filter(0.01) GRANULARITY 1",
+        "ALTER TABLE statistic_log MATERIALIZE INDEX msg_id_bloom",
+        "ALTER TABLE statistic_log ADD INDEX activity_type_set activity_type TYPE set(100) GRANULARITY 4",
+        "ALTER TABLE statistic_log MATERIALIZE INDEX activity_type_set",
+    ]
+
+
+def test_migrate_table_rebuilds_outdated_layout():
+    # Given
+    layouts = {
+        "statistic_log": ("MergeTree", "", "id", "id"),
+        "statistic_log__migrating": ("ReplacingMergeTree", "toYYYYMM(...)", "user_id, ...", "user_id, ..."),
+    }
+    engine, statements = make_engine(layouts, ["id", "user_id", "utc_timestamp"])
+
+    # When
+    rebuilt = migrate_table(engine, StatisticLog.__table__, {"utc_timestamp": "parse(utc_timestamp)"})
+
+    # Then
+    assert rebuilt is True
+    assert "INSERT INTO statistic_log__migrating (id, utc_timestamp, user_id) " \
+           "SELECT id, parse(utc_timestamp), user_id FROM statistic_log" in statements
+    assert "EXCHANGE TABLES statistic_log AND statistic_log__migrating" in statements
+    assert "INSERT INTO statistic_log (id, utc_timestamp, user_id) " \
+           "SELECT id, parse(utc_timestamp), user_id FROM statistic_log__migrating " \
+           "WHERE _part NOT IN ('all_1_1_0', 'all_2_2_0')" in statements
+    stop_merges = statements.index("SYSTEM STOP MERGES statistic_log")
+    assert statements[stop_merges + 1].startswith("SELECT name FROM system.parts")
+    assert statements[-2].startswith("RENAME TABLE statistic_log__migrating TO statistic_log_before_")
+    assert statements[-1] == "SYSTEM START MERGES " + statements[-2].split()[-1]
+
+
+def test_migrate_table_keeps_current_layout():
+    # Given
+    layout = ("ReplacingMergeTree", "toYYYYMM(...)", "user_id, ...", "user_id, ...")
+    engine, statements = make_engine({"statistic_log": layout, "statistic_log__migrating": layout}, [])
+
+    # When
+    rebuilt = migrate_table(engine, StatisticLog.__table__)
+
+    # Then
+    assert rebuilt is False
+    assert statements[-1] == "DROP TABLE statistic_log__migrating"
+
+
+def test_rollup_view_feeds_rollup_from_statistic_log():
+    # When
+    ddl = rollup_view_ddl(StatisticLogHourly.__table__)
+
+    # Then
+    assert ddl == (
+        "CREATE MATERIALIZED VIEW IF NOT EXISTS statistic_log_hourly_mv TO statistic_log_hourly AS "
+        "SELECT toStartOfHour(utc_timestamp) AS bucket, activity_type, agent_name, extension_version, "
+        "count() AS events, uniqState(user_id) AS users FROM statistic_log "
+        "GROUP BY bucket, activity_type, agent_name, extension_version"
+    )
+
+
+def test_rebuild_rollup_recounts_statistic_log():
+    # Given
+    conn = MagicMock()
+
+    # When
+    rebuild_rollup(conn, StatisticLogHourly.__table__)
+
+    # Then
+    statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert statements[0] == "TRUNCATE TABLE statistic_log_hourly"
+    assert statements[1].startswith("INSERT INTO statistic_log_hourly SELECT toStartOfHour(utc_timestamp)")
+    assert "FROM statistic_log FINAL " in statements[1]
+
+
+def test_rebuild_rollup_since_recounts_later_months_only():
+    # Given
+    conn = MagicMock()
+    conn.execute.side_effect = lambda clause, params=None: iter([("202403",), ("202404",)])
+
+    # When
+    rebuild_rollup(conn, StatisticLogHourly.__table__, date(2024, 3, 17))
+
+    # Then
+    statements = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert conn.execute.call_args_list[0].args[1]["month"] == "202403"
+    assert statements[1:3] == [
+        "ALTER TABLE statistic_log_hourly DROP PARTITION ID '202403'",
+        "ALTER TABLE statistic_log_hourly DROP PARTITION ID '202404'",
+    ]
+    assert "FROM statistic_log FINAL WHERE utc_timestamp >= '2024-03-01' GROUP BY" in statements[3]
+
+
+def test_migrate_clickhouse_tables_upgrades_baseline_table(local_clickhouse):
+    # Given
+    local_clickhouse.query(BASELINE_STATISTIC_LOG)
+    local_clickhouse.query(
+        "INSERT INTO statistic_log (id, user_id, activity_type, utc_timestamp, local_timestamp) "
+        "VALUES ('e-1', 'user-1', 'send_message', '2024-03-17T19:30:00Z', '2024-03-18T02:30:00')"
+    )
+    for table in STATISTIC_LOG_ROLLUPS:
+        local_clickhouse.query(table_ddl(table))
+    shards = ShardSet({"local": local_clickhouse})
+
+    # When
+    with patch.object(init_clickhouse, "clickhouse_shards", shards), \
+            patch.object(init_clickhouse.Base.metadata, "create_all"):
+        init_clickhouse.create_clickhouse_tables()
+        migrate_clickhouse_tables()
+
+    # Then
+    assert statistic_log_is_current(local_clickhouse)
+    assert local_clickhouse.query("SELECT id, toString(utc_timestamp), local_date FROM statistic_log") == [
+        ("e-1", "2024-03-17 19:30:00.000", "2024-03-18")
+    ]
+    indexes = local_clickhouse.query(
+        "SELECT name FROM system.data_skipping_indices "
+        "WHERE database = currentDatabase() AND table = 'statistic_log' ORDER BY name"
+    )
+    assert [name for name, in indexes] == sorted(index.name for index in skip_indexes(StatisticLog.__table__))
+    assert local_clickhouse.query("SELECT sum(events) FROM statistic_log_daily") == [(1,)]
+    views = local_clickhouse.query(
+        "SELECT name FROM system.tables WHERE database = currentDatabase() AND engine = 'MaterializedView'"
+    )
+    assert len(views) == len(STATISTIC_LOG_ROLLUPS)
+
+
+def test_migrate_table_carries_over_rows_inserted_during_copy(local_clickhouse):
+    # Given
+    local_clickhouse.query(BASELINE_STATISTIC_LOG.replace("ENGINE = Memory", "ENGINE = MergeTree ORDER BY id"))
+    local_clickhouse.query(
+        "INSERT INTO statistic_log (id, utc_timestamp) VALUES ('e-1', '2024-03-17T19:30:00Z')"
+    )
+    execute = local_clickhouse.execute
+
+    def execute_with_concurrent_insert(clause, params=None):
+        if str(clause).startswith("EXCHANGE TABLES"):
+            execute("INSERT INTO statistic_log (id, utc_timestamp) VALUES ('e-2', '2024-03-17T19:31:00Z')")
+        return execute(clause, params)
+
+    local_clickhouse.execute = execute_with_concurrent_insert
+
+    # When
+    rebuilt = migrate_table(
+        local_clickhouse, StatisticLog.__table__, init_clickhouse.STATISTIC_LOG_CONVERSIONS
+    )
+
+    # Then
+    assert rebuilt is True
+    assert local_clickhouse.query("SELECT id FROM statistic_log ORDER BY id") == [("e-1",), ("e-2",)]
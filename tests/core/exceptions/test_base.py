@@ -10,3 +10,15 @@ def test_custom_exception():
 
     # Then
     assert exc.message == message
+
+
+def test_custom_exception_headers():
+    # Given
+    headers = {"Retry-After": "1"}
+
+    # When
+    exc = CustomException(headers=headers)
+
+    # Then
+    assert exc.headers == headers
+    assert CustomException().headers is None
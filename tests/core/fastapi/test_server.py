@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from core.config import config
+from core.fastapi import server
+
+
+def test_worker_count():
+    # When, Then
+    with patch.object(config, "COUNT_WORKERS_UVICORN", 3):
+        assert server.worker_count() == 3
+    with patch.object(config, "COUNT_WORKERS_UVICORN", 0):
+        assert server.worker_count() >= 1
+
+
+def test_gunicorn_server_preloads_uvicorn_workers():
+    # Given
+    options = server.gunicorn_options(host="0.0.0.0", port=8000, workers=2)
+
+    # When
+    gunicorn_server = server.GunicornServer("app.server:app", options)
+
+    # Then
+    assert gunicorn_server.cfg.bind == ["0.0.0.0:8000"]
+    assert gunicorn_server.cfg.workers == 2
+    assert gunicorn_server.cfg.worker_class_str == "uvicorn.workers.UvicornWorker"
+    assert gunicorn_server.cfg.preload_app is True
+
+
+def test_post_fork_disposes_inherited_connections():
+    # When
+    with patch.object(server, "dispose_connections") as dispose:
+        server.post_fork(None, None)
+
+    # Then
+    dispose.assert_called_once_with(close=False)
@@ -0,0 +1,14 @@
+from core.helpers.admission import AdmissionControl
+
+
+def test_admission_control_hysteresis():
+    # Given
+    admission = AdmissionControl(high_watermark=10, low_watermark=5)
+
+    # When
+    results = [admission.admit(depth) for depth in (9, 10, 8, 6, 5, 9)]
+
+    # Then
+    assert results == [True, False, False, False, True, True]
+    assert admission.stats()["rejected"] == 3
+    assert admission.saturated is False
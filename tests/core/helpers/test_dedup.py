@@ -0,0 +1,14 @@
+from core.helpers.dedup import RecentKeys
+
+
+def test_recent_keys_evicts_least_recently_seen():
+    # Given
+    keys = RecentKeys(max_size=2)
+
+    # When
+    results = [keys.seen(key) for key in ("a", "b", "a", "c", "a", "b")]
+
+    # Then
+    assert results == [False, False, True, False, True, False]
+    assert len(keys) == 2
+    assert keys.hits == 2
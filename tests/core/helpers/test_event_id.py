@@ -0,0 +1,53 @@
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from core.helpers import event_id
+from core.helpers.event_id import UUID7Generator, derived_uuid
+
+
+def test_uuid7_is_monotonic_within_a_millisecond():
+    # Given
+    generator = UUID7Generator()
+
+    # When
+    with patch.object(event_id.time, "time_ns", return_value=1_700_000_000_000_000_000):
+        ids = [generator() for _ in range(5000)]
+
+    # Then
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 5000
+    parsed = uuid.UUID(ids[0])
+    assert parsed.version == 7
+    assert parsed.variant == uuid.RFC_4122
+    assert parsed.int >> 80 == 1_700_000_000_000
+
+
+def test_uuid7_does_not_go_back_with_the_clock():
+    # Given
+    generator = UUID7Generator()
+
+    # When
+    with patch.object(event_id.time, "time_ns", return_value=2_000_000_000):
+        first = generator()
+    with patch.object(event_id.time, "time_ns", return_value=1_000_000_000):
+        second = generator()
+
+    # Then
+    assert second > first
+
+
+def test_derived_uuid_is_stable_and_time_ordered():
+    # Given
+    at = datetime(2024, 1, 1)
+
+    # When
+    first = derived_uuid(at, "msg-1")
+    again = derived_uuid(at, "msg-1")
+    later = derived_uuid(at + timedelta(milliseconds=1), "msg-0")
+
+    # Then
+    assert first == again
+    assert first != derived_uuid(at, "msg-2")
+    assert later > first
+    assert uuid.UUID(first).version == 8
@@ -0,0 +1,35 @@
+import pytest
+
+from app.statistic_log.domain.command import CreateStatisticLogCommand
+from core.helpers import serializer
+
+
+def test_dumps_loads_round_trip():
+    # Given
+    obj = {"url": "https://example.com/ả", "items": [1, 2.5, True, None]}
+
+    # When
+    data = serializer.dumps(obj)
+
+    # Then
+    assert isinstance(data, bytes)
+    assert serializer.loads(data) == obj
+
+
+def test_loads_rejects_malformed_json():
+    # When, Then
+    with pytest.raises(ValueError):
+        serializer.loads(b"{invalid")
+
+
+def test_dump_model():
+    # Given
+    command = CreateStatisticLogCommand(user_id="1", extra_data={"tabs": 2})
+
+    # When
+    data = serializer.dump_model(command)
+
+    # Then
+    expected = command.to_dict()
+    del expected["idempotency_key"]
+    assert serializer.loads(data) == expected
@@ -0,0 +1,67 @@
+import json
+import uuid
+from contextlib import contextmanager
+
+import pytest
+
+
+class Result:
+    def __init__(self, rows: list[tuple]):
+        self.rows = rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def scalar(self):
+        return self.rows[0][0] if self.rows else None
+
+
+class LocalClickHouse:
+    """Engine and connection stand-in running statements on an in-process chdb database
+
+    Covers what ``core.db.init_clickhouse`` calls on engines and
+    connections: ``connect``/``begin`` and ``execute`` of text clauses with
+    ``:name`` parameters.
+    """
+
+    def __init__(self, session, database: str):
+        self.session = session
+        self.database = database
+
+    @contextmanager
+    def connect(self):
+        yield self
+
+    begin = connect
+
+    def execute(self, clause, params: dict | None = None) -> Result:
+        sql = str(clause)
+        for name, value in sorted((params or {}).items(), key=lambda item: -len(item[0])):
+            sql = sql.replace(f":{name}", "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'")
+        output = str(self.session.query(sql, "JSONCompact"))
+        if not output.strip():
+            return Result([])
+        return Result([tuple(row) for row in json.loads(output)["data"]])
+
+    def query(self, sql: str) -> list[tuple]:
+        return self.execute(sql).rows
+
+
+_session = None
+
+
+@pytest.fixture
+def local_clickhouse():
+    """Fresh database on a chdb session, skipping the test when chdb is not installed"""
+    global _session
+    session = pytest.importorskip("chdb.session")
+    if _session is None:
+        _session = session.Session()
+    database = f"test_{uuid.uuid4().hex}"
+    _session.query(f"CREATE DATABASE {database} ENGINE = Atomic")
+    _session.query(f"USE {database}")
+    yield LocalClickHouse(_session, database)
+    _session.query(f"DROP DATABASE {database}")